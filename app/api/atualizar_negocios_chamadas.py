@@ -1,20 +1,47 @@
-import csv
+import argparse
 import os
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
-import requests
+from functools import lru_cache
+import hashlib
 import json
-from bs4 import BeautifulSoup
-import re
-from dotenv import load_dotenv
+import threading
 
-load_dotenv()
-API_KEY = os.getenv("HUBSPOT_API_KEY")
-HEADERS = {"Authorization": f"Bearer {API_KEY}"}
+import numpy as np
+
+from app.api import cliente_hubspot
+from app.api.cliente_hubspot import HUBSPOT_BASE_URL
+from app.services import armazenamento, metricas, perfil, snapshots
+from app.services.texto_html import html_para_texto
 
 BR_TZ = timezone(timedelta(hours=-3))
 
+# Timestamps da HubSpot tratados em lote por formata_datas: AAAA-MM-DDTHH:MM:SS[.mmm]Z (UTC)
+POSICOES_DIGITOS_TIMESTAMP = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]
+POSICOES_SEPARADORES_TIMESTAMP = [4, 7, 10, 13, 16]
+SEPARADORES_TIMESTAMP = np.array([ord(c) for c in "--T::"])
+DIAS_NO_MES = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+DESLOCAMENTO_BR_MINUTOS = -180
+MINIMO_LOTE_DATAS = 64  # abaixo disso o custo fixo do NumPy não compensa
+
+# Cursor de sincronização incremental (maior hs_lastmodifieddate já sincronizado por tipo)
+CURSOR_SINCRONIZACAO = "data/atualizado/cursor_sincronizacao.json"
+SOBREPOSICAO_CURSOR = timedelta(minutes=15)
+DIAS_RECUPERACAO = 4
+
+# Busca fatiada: a search API da HubSpot devolve no máximo 10.000 resultados por consulta
+LIMITE_BUSCA_HUBSPOT = 10000
+FATIA_MINIMA = timedelta(minutes=1)
+MAX_WORKERS_BUSCA = 4
+
+# Cache LRU de limpa_html, indexado pelo hash do corpo da chamada
+TAMANHO_CACHE_HTML = 20000
+_CACHE_HTML = OrderedDict()
+_LOCK_CACHE_HTML = threading.Lock()
+
 # Negócios
-NEGOCIOS_URL = "https://api.hubapi.com/crm/v3/objects/deals"
+NEGOCIOS_URL = f"{HUBSPOT_BASE_URL}/crm/v3/objects/deals"
 NEGOCIOS_CSV = "data/atualizado/negocios.csv"
 PROPERTIES_NEGOCIOS = [
     "hs_object_id", "dealname", "dealstage", "hubspot_owner_id", "createdate",
@@ -250,7 +277,7 @@ FOI_CONECTADO_MAP = {
 }
 
 # Chamadas
-CHAMADAS_URL = "https://api.hubapi.com/crm/v3/objects/calls"
+CHAMADAS_URL = f"{HUBSPOT_BASE_URL}/crm/v3/objects/calls"
 CHAMADAS_CSV = "data/atualizado/chamadas.csv"
 PROPERTIES_CHAMADAS = [
     "hs_object_id", "hs_call_title", "hs_timestamp", "hs_call_direction",
@@ -281,6 +308,15 @@ CALL_DISPOSITION_MAP = {
     "8d94ac64-195e-43ba-8dc5-cbf810b56281": "Caixa postal"
 }
 
+# Colunas que o processamento sempre preenche, além das que vêm da API (na ordem em que entram na linha)
+COLUNAS_DERIVADAS = {
+    "negocios": ["Proprietário do negócio", "Momento de Compra"],
+    "chamadas": [
+        "Atividade atribuída a", "Resultado da chamada", "Observações de chamada",
+        "Duração da chamada (HH:mm:ss)", "Associated Deal IDs", "Associated Deal",
+    ],
+}
+
 def mapeia_valores(mapa: dict, propriedade_id: str):
     """
     Traduz o valor original com base em um dicionário de mapeamento.
@@ -302,31 +338,119 @@ def formata_data(data_iso):
         return data_iso
 
 
-def limpa_html(html: str) -> str:
+def formata_datas(valores: list) -> list:
     """
-    Remove tags HTML e retorna texto limpo, com quebras de linha entre blocos e frases grudadas.
+    Versão em lote de formata_data: mesmo resultado de [formata_data(v) for v in valores].
+
+    Os timestamps no formato da HubSpot (2025-03-10T14:23:45.123Z ou sem milissegundos) são
+    lidos como uma matriz de caracteres de largura fixa: os campos saem por aritmética sobre os
+    dígitos, o fuso de -3h é uma subtração de minutos e o texto é montado no molde
+    AAAA-MM-DD HH:MM. Valores em outro formato ou com data impossível passam por formata_data.
     """
-    if not html:
-        return ""
+    valores = list(valores)
+    if len(valores) < MINIMO_LOTE_DATAS:
+        return [formata_data(valor) for valor in valores]
 
-    soup = BeautifulSoup(html, "html.parser")
+    # Matriz de caracteres (uma linha por valor). Valores que não são texto viram algo como "None"
+    # e textos com mais de 24 caracteres ocupam a 25ª coluna: nenhum dos dois passa na validação
+    try:
+        caracteres = np.array(valores, dtype="U25").view(np.uint32).reshape(-1, 25).astype(np.int64)
+    except (TypeError, ValueError):
+        return [formata_data(valor) for valor in valores]
+    digitos = caracteres - ord("0")
+
+    def numero(inicio: int, fim: int) -> np.ndarray:
+        valor = np.zeros(len(valores), dtype=np.int64)
+        for coluna in range(inicio, fim):
+            valor = valor * 10 + digitos[:, coluna]
+        return valor
+
+    eh_digito = (digitos >= 0) & (digitos <= 9)
+    validos = eh_digito[:, POSICOES_DIGITOS_TIMESTAMP].all(axis=1)
+    validos &= (caracteres[:, POSICOES_SEPARADORES_TIMESTAMP] == SEPARADORES_TIMESTAMP).all(axis=1)
+    validos &= np.where(
+        caracteres[:, 19] == ord("."),
+        eh_digito[:, 20:23].all(axis=1) & (caracteres[:, 23] == ord("Z")) & (caracteres[:, 24] == 0),
+        (caracteres[:, 19] == ord("Z")) & (caracteres[:, 20:] == 0).all(axis=1),
+    )
+
+    ano, mes, dia = numero(0, 4), numero(5, 7), numero(8, 10)
+    hora, minuto, segundo = numero(11, 13), numero(14, 16), numero(17, 19)
+    bissexto = (ano % 4 == 0) & ((ano % 100 != 0) | (ano % 400 == 0))
+    dias_no_mes = DIAS_NO_MES[np.clip(mes, 1, 12) - 1] + ((mes == 2) & bissexto)
+    validos &= (ano >= 1900) & (mes >= 1) & (mes <= 12) & (dia >= 1) & (dia <= dias_no_mes)
+    validos &= (hora <= 23) & (minuto <= 59) & (segundo <= 59)
+
+    minutos = _dias_desde_epoca(ano, mes, dia) * 1440 + hora * 60 + minuto + DESLOCAMENTO_BR_MINUTOS
+    dias, minuto_do_dia = np.divmod(minutos, 1440)
+    ano, mes, dia = _data_civil(dias)
+    hora, minuto = np.divmod(minuto_do_dia, 60)
+
+    # Molde AAAA-MM-DD HH:MM preenchido dígito a dígito
+    saida = np.empty((len(valores), 16), dtype=np.uint32)
+    for coluna, separador in zip((4, 7, 10, 13), "-- :"):
+        saida[:, coluna] = ord(separador)
+    for campo, inicio, largura in ((ano, 0, 4), (mes, 5, 2), (dia, 8, 2), (hora, 11, 2), (minuto, 14, 2)):
+        for coluna in range(inicio + largura - 1, inicio - 1, -1):
+            campo, digito = np.divmod(campo, 10)
+            saida[:, coluna] = digito + ord("0")
+    resultado = saida.view("U16").ravel().tolist()
+
+    for posicao in np.flatnonzero(~validos).tolist():
+        resultado[posicao] = formata_data(valores[posicao])
+    return resultado
+
+
+def _dias_desde_epoca(ano: np.ndarray, mes: np.ndarray, dia: np.ndarray) -> np.ndarray:
+    """
+    Dias desde 1970-01-01 no calendário gregoriano (algoritmo days_from_civil), para anos >= 0.
+    """
+    ano = ano - (mes <= 2)
+    era = ano // 400
+    ano_da_era = ano - era * 400
+    dia_do_ano = (153 * np.where(mes > 2, mes - 3, mes + 9) + 2) // 5 + dia - 1
+    dia_da_era = ano_da_era * 365 + ano_da_era // 4 - ano_da_era // 100 + dia_do_ano
+    return era * 146097 + dia_da_era - 719468
+
+
+def _data_civil(dias: np.ndarray) -> tuple:
+    """
+    Inverso de _dias_desde_epoca: (ano, mês, dia) de cada contagem de dias.
+    """
+    dias = dias + 719468
+    era = dias // 146097
+    dia_da_era = dias - era * 146097
+    ano_da_era = (dia_da_era - dia_da_era // 1460 + dia_da_era // 36524 - dia_da_era // 146096) // 365
+    dia_do_ano = dia_da_era - (365 * ano_da_era + ano_da_era // 4 - ano_da_era // 100)
+    mes_deslocado = (5 * dia_do_ano + 2) // 153
+    dia = dia_do_ano - (153 * mes_deslocado + 2) // 5 + 1
+    mes = np.where(mes_deslocado < 10, mes_deslocado + 3, mes_deslocado - 9)
+    ano = ano_da_era + era * 400 + (mes <= 2)
+    return ano, mes, dia
 
-    # Substitui <br> por quebras de linha
-    for br in soup.find_all("br"):
-        br.replace_with("\n")
 
-    # Adiciona \n após parágrafos <p>
-    for p in soup.find_all("p"):
-        if p.text and not p.text.endswith("\n"):
-            p.append("\n")
+def limpa_html(html: str) -> str:
+    """
+    Remove tags HTML e retorna texto limpo, com quebras de linha entre frases grudadas.
+    Usa um tokenizador em streaming (sem montar a árvore) e memoriza os últimos resultados pelo
+    hash do corpo, já que a mesma chamada volta em várias páginas/execuções.
+    """
+    if not html:
+        return ""
 
-    # Extrai texto limpo
-    texto = soup.get_text(separator='', strip=True)
+    chave = hashlib.blake2b(html.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    with _LOCK_CACHE_HTML:
+        if chave in _CACHE_HTML:
+            _CACHE_HTML.move_to_end(chave)
+            return _CACHE_HTML[chave]
 
-    # Adiciona quebra de linha entre letras minúsculas seguidas de maiúsculas
-    texto_formatado = re.sub(r'(?<=[a-z])(?=[A-Z])', '\n', texto)
+    texto = html_para_texto(html)
 
-    return texto_formatado.strip()
+    with _LOCK_CACHE_HTML:
+        _CACHE_HTML[chave] = texto
+        if len(_CACHE_HTML) > TAMANHO_CACHE_HTML:
+            _CACHE_HTML.popitem(last=False)
+    return texto
 
 
 def converte_ms_para_hms(ms):
@@ -348,13 +472,117 @@ def limpa_associated_deal_id(valor):
     return valor
 
 
-def coleta_dados_da_api(url: str, props: list, after_date: str) -> list:
+def converte_data_corte(after_date: str) -> datetime:
+    """
+    Aceita uma data simples (YYYY-MM-DD) ou um timestamp ISO completo e devolve um datetime em UTC.
+    """
+    try:
+        return datetime.strptime(after_date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    except ValueError:
+        data_corte = datetime.fromisoformat(after_date.replace("Z", "+00:00"))
+        if data_corte.tzinfo is None:
+            data_corte = data_corte.replace(tzinfo=timezone.utc)
+        return data_corte.astimezone(timezone.utc)
+
+
+def le_cursor(tipo: str):
+    """
+    Retorna o último hs_lastmodifieddate sincronizado para o tipo (negocios/chamadas), ou None.
+    """
+    if not os.path.exists(CURSOR_SINCRONIZACAO):
+        return None
+
+    with open(CURSOR_SINCRONIZACAO, encoding="utf-8") as f:
+        cursores = json.load(f)
+    return cursores.get(tipo)
+
+
+# As duas sincronizações rodam em paralelo no orquestrador e regravam o mesmo arquivo de cursor
+_lock_cursor = threading.Lock()
+
+
+def salva_cursor(tipo: str, ultima_modificacao: str):
+    """
+    Persiste o cursor do tipo, sem nunca retroceder. A escrita é atômica (arquivo temporário + rename)
+    e serializada entre threads (ler, alterar e regravar o arquivo sem perder o cursor do outro tipo).
+    """
+    with _lock_cursor:
+        cursores = {}
+        if os.path.exists(CURSOR_SINCRONIZACAO):
+            with open(CURSOR_SINCRONIZACAO, encoding="utf-8") as f:
+                cursores = json.load(f)
+
+        atual = cursores.get(tipo)
+        if atual and converte_data_corte(atual) >= converte_data_corte(ultima_modificacao):
+            return
+
+        cursores[tipo] = ultima_modificacao
+        os.makedirs(os.path.dirname(CURSOR_SINCRONIZACAO), exist_ok=True)
+        caminho_tmp = f"{CURSOR_SINCRONIZACAO}.tmp"
+        with open(caminho_tmp, "w", encoding="utf-8") as f:
+            json.dump(cursores, f, indent=2, sort_keys=True)
+        os.replace(caminho_tmp, CURSOR_SINCRONIZACAO)
+    print(f"📌 Cursor de {tipo} avançado para {ultima_modificacao}")
+
+
+def define_data_inicio(tipo: str, recuperacao: bool = False) -> str:
+    """
+    Define a partir de quando buscar: cursor salvo menos a sobreposição de segurança.
+    Sem cursor, volta para a janela larga de DIAS_RECUPERACAO dias. Em modo de recuperação, usa
+    o que for mais antigo entre o cursor e essa janela: depois de uma parada mais longa que a
+    janela, nada modificado desde o último cursor fica para trás.
+    """
+    cursor = le_cursor(tipo)
+    inicio_cursor = converte_data_corte(cursor) - SOBREPOSICAO_CURSOR if cursor else None
+    if inicio_cursor and not recuperacao:
+        return inicio_cursor.isoformat()
+
+    janela = (datetime.now(timezone.utc) - timedelta(days=DIAS_RECUPERACAO)).strftime("%Y-%m-%d")
+    if inicio_cursor and inicio_cursor < converte_data_corte(janela):
+        return inicio_cursor.isoformat()
+    return janela
+
+
+def maior_modificacao(dados_brutos: list):
+    """
+    Retorna o maior hs_lastmodifieddate (ISO, como veio da API) entre os registros, ou None.
+    """
+    maior, maior_dt = None, None
+    for item in dados_brutos:
+        valor = item.get("properties", {}).get("hs_lastmodifieddate")
+        if not valor:
+            continue
+        try:
+            dt = converte_data_corte(valor)
+        except ValueError:
+            continue
+        if maior_dt is None or dt > maior_dt:
+            maior, maior_dt = valor, dt
+    return maior
+
+
+def busca_pagina_api(url: str, payload: dict) -> dict:
+    # Métricas de coleta por tipo: páginas, registros recebidos e tempo somado das buscas
+    with metricas.mede(f"coleta_{'negocios' if url == NEGOCIOS_URL else 'chamadas'}", paginas=1) as medida:
+        response = cliente_hubspot.post(f"{url}/search", json=payload)
+        if not response.ok:
+            raise Exception(f"Erro na API: {response.text}")
+        data = response.json()
+        medida["registros_saida"] = len(data.get("results", []))
+    return data
+
+
+def itera_paginas_api(url: str, props: list, after_date: str):
+    """
+    Gera as páginas (listas de até 100 registros brutos) modificadas após after_date, uma por vez.
+    Se a primeira página informar LIMITE_BUSCA_HUBSPOT resultados ou mais (a search API não pagina
+    além disso), passa para a busca fatiada antes de gerar qualquer página.
+    """
     print(f"📥 Buscando dados da API após {after_date}...")
 
-    data_corte = datetime.strptime(after_date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    data_corte = converte_data_corte(after_date)
     iso_date = data_corte.isoformat()
 
-    resultados_brutos = []
     after = None
 
     while True:
@@ -372,14 +600,14 @@ def coleta_dados_da_api(url: str, props: list, after_date: str) -> list:
         if after:
             payload["after"] = after
 
-        response = requests.post(f"{url}/search", headers={**HEADERS, "Content-Type": "application/json"}, data=json.dumps(payload))
-        if not response.ok:
-            raise Exception(f"Erro na API: {response.text}")
-
-        data = response.json()
+        data = busca_pagina_api(url, payload)
+        if after is None and data.get("total", 0) >= LIMITE_BUSCA_HUBSPOT:
+            print(f"⚠️  {data['total']} registros modificados desde {iso_date}: acima do limite da busca simples, usando a busca fatiada.")
+            yield from itera_paginas_fatiadas(url, props, after_date)
+            return
         registros = data.get("results", [])
         print(f"↪ Página com {len(registros)} registros")
-        resultados_brutos.extend(registros)
+        yield registros
 
         paging = data.get("paging", {}).get("next", {}).get("after")
         if paging:
@@ -388,139 +616,344 @@ def coleta_dados_da_api(url: str, props: list, after_date: str) -> list:
             print("[3] Fim da paginação")
             break
 
+
+def coleta_dados_da_api(url: str, props: list, after_date: str) -> list:
+    resultados_brutos = []
+    for registros in itera_paginas_api(url, props, after_date):
+        resultados_brutos.extend(registros)
     return resultados_brutos
 
 
-def processa_dados(tipo: str, dados_brutos: list, mapa_api_to_csv: dict) -> list:
+def monta_payload_intervalo(props: list, inicio: datetime, fim: datetime, limit: int = 100) -> dict:
+    """
+    Payload de busca restrito a hs_lastmodifieddate em [inicio, fim), ordenado para paginação estável.
+    """
+    return {
+        "filterGroups": [{
+            "filters": [
+                {"propertyName": "hs_lastmodifieddate", "operator": "GTE", "value": inicio.isoformat()},
+                {"propertyName": "hs_lastmodifieddate", "operator": "LT", "value": fim.isoformat()},
+            ]
+        }],
+        "sorts": [{"propertyName": "hs_lastmodifieddate", "direction": "ASCENDING"}],
+        "properties": props,
+        "limit": limit
+    }
+
+
+def divide_intervalo(url: str, inicio: datetime, fim: datetime) -> list:
+    """
+    Divide [inicio, fim) ao meio até cada fatia caber no limite de resultados da search API.
+    Usa o campo "total" de uma consulta com limit=1 para decidir se a fatia precisa ser dividida.
+    """
+    total = busca_pagina_api(url, monta_payload_intervalo(["hs_object_id"], inicio, fim, limit=1)).get("total", 0)
+
+    if total == 0:
+        return []
+    if total < LIMITE_BUSCA_HUBSPOT or fim - inicio <= FATIA_MINIMA:
+        if total >= LIMITE_BUSCA_HUBSPOT:
+            print(f"⚠️  Fatia {inicio.isoformat()} → {fim.isoformat()} tem {total} registros e não pode ser mais dividida.")
+        return [(inicio, fim)]
+
+    meio = inicio + (fim - inicio) / 2
+    return divide_intervalo(url, inicio, meio) + divide_intervalo(url, meio, fim)
+
+
+def coleta_fatia(url: str, props: list, inicio: datetime, fim: datetime) -> list:
     resultados = []
+    after = None
 
-    for item in dados_brutos:
-        props_api = item.get("properties", {})
-        props_csv = {mapa_api_to_csv.get(k, k): v for k, v in props_api.items()}
-
-        if tipo == "negocios":
-            # Traduzir dealstage
-            dealstage_id = props_api.get("dealstage")
-            if dealstage_id in DEALSTAGE_MAP:
-                props_csv["Etapa do negócio"] = DEALSTAGE_MAP[dealstage_id]
-
-            # Traduzir ids para nomes
-            props_csv["Proprietário do negócio"] = mapeia_valores(OWNER_MAP, props_api.get("hubspot_owner_id"))
-            props_csv["Momento de Compra"] = mapeia_valores(PURCHASE_MOMENT_MAP, props_api.get("purchase_moment"))
-
-            # Traduzir foi_conectado
-            foi_conectado_valor = props_api.get("foi_conectado")
-            if foi_conectado_valor is not None:
-                props_csv["Foi conectado"] = FOI_CONECTADO_MAP.get(str(foi_conectado_valor).lower(), "Não informado")
-
-        if tipo == "chamadas":
-            # Traduzir ids para nomes
-            props_csv["Atividade atribuída a"] = mapeia_valores(OWNER_MAP, props_api.get("hubspot_owner_id"))
-            props_csv["Resultado da chamada"] = mapeia_valores(CALL_DISPOSITION_MAP, props_api.get("hs_call_disposition"))
-
-            # Formatação
-            props_csv["Observações de chamada"] = limpa_html(props_api.get("hs_call_body"))
-            props_csv["Duração da chamada (HH:mm:ss)"] = converte_ms_para_hms(props_api.get("hs_call_duration"))
-            props_csv["Associated Deal IDs"] = limpa_associated_deal_id(props_api.get("hs_call_primary_deal"))
-
-            # Remove "Chamada com" do título da chamada
-            titulo_chamada = props_csv.get("Título da chamada", "")
-            props_csv["Associated Deal"] = titulo_chamada.replace("Chamada com ", "").strip()
-
-        # Formatar datas, limpar valores inválidos
-        for campo_api in props_api:
-            if "date" in campo_api.lower() or "timestamp" in campo_api.lower():
-                valor_bruto = props_api[campo_api]
-                nome_csv = mapa_api_to_csv.get(campo_api, campo_api)
-
-                if isinstance(valor_bruto, str) and ("T" in valor_bruto or "-" in valor_bruto):
-                    props_csv[nome_csv] = formata_data(valor_bruto)
-                else:
-                    props_csv[nome_csv] = ""
-
-        # Garantir que todas as colunas existem, mesmo vazias
-        for col in mapa_api_to_csv.values():
-            props_csv.setdefault(col, "")
-
-        resultados.append(props_csv)
+    while True:
+        payload = monta_payload_intervalo(props, inicio, fim)
+        if after:
+            payload["after"] = after
+
+        data = busca_pagina_api(url, payload)
+        resultados.extend(data.get("results", []))
+
+        after = data.get("paging", {}).get("next", {}).get("after")
+        if not after:
+            return resultados
+
+
+def itera_paginas_fatiadas(url: str, props: list, after_date: str, before_date: str = None, max_workers: int = MAX_WORKERS_BUSCA):
+    """
+    Busca registros modificados entre after_date e before_date (padrão: agora) dividindo o intervalo
+    em fatias de hs_lastmodifieddate que cabem no limite da search API e paginando as fatias em paralelo.
+    Gera uma lista por fatia, em ordem cronológica, deduplicada por hs_object_id (fica a versão mais
+    recente) e ordenada por (hs_lastmodifieddate, hs_object_id). No máximo max_workers fatias ficam
+    em memória ao mesmo tempo.
+    """
+    inicio = converte_data_corte(after_date)
+    fim = converte_data_corte(before_date) if before_date else datetime.now(timezone.utc) + timedelta(minutes=1)
+    print(f"📥 Buscando dados da API (fatiado) entre {inicio.isoformat()} e {fim.isoformat()}...")
+
+    fatias = divide_intervalo(url, inicio, fim)
+    print(f"🧩 {len(fatias)} fatias, até {max_workers} em paralelo")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pendentes = deque()
+        for fatia in fatias:
+            pendentes.append(executor.submit(coleta_fatia, url, props, *fatia))
+            if len(pendentes) >= max_workers:
+                yield _deduplica(pendentes.popleft().result())
+        while pendentes:
+            yield _deduplica(pendentes.popleft().result())
+
+    print("[3] Fim da paginação")
+
+
+def coleta_dados_da_api_fatiada(url: str, props: list, after_date: str, before_date: str = None, max_workers: int = MAX_WORKERS_BUSCA) -> list:
+    registros = []
+    for fatia in itera_paginas_fatiadas(url, props, after_date, before_date, max_workers):
+        registros.extend(fatia)
+
+    resultados = _deduplica(registros)
+    print(f"✅ {len(resultados)} registros únicos")
+    return resultados
 
+
+def _deduplica(registros: list) -> list:
+    por_id = {}
+    for item in registros:
+        hs_id = item.get("properties", {}).get("hs_object_id") or item.get("id")
+        atual = por_id.get(hs_id)
+        if atual is None or _chave_modificacao(item) >= _chave_modificacao(atual):
+            por_id[hs_id] = item
+
+    return sorted(por_id.values(), key=lambda item: (_chave_modificacao(item), _chave_id(item)))
+
+
+def _chave_modificacao(item: dict) -> datetime:
+    valor = item.get("properties", {}).get("hs_lastmodifieddate")
+    try:
+        return converte_data_corte(valor)
+    except (TypeError, ValueError):
+        return datetime.min.replace(tzinfo=timezone.utc)
+
+
+def _chave_id(item: dict) -> tuple:
+    hs_id = str(item.get("properties", {}).get("hs_object_id") or item.get("id") or "")
+    return (len(hs_id), hs_id)
+
+
+def processa_dados(tipo: str, dados_brutos: list, mapa_api_to_csv: dict) -> list:
+    resultados = processa_pagina(tipo, dados_brutos, mapa_api_to_csv)
     print(f"✅ Total processado ({tipo}): {len(resultados)}")
     return resultados
 
 
-def ler_csv_existente(caminho_csv: str, mapa_api_to_csv: dict):
-    print(f"📂 Carregando dados do CSV existente: {caminho_csv}...")
-    if not os.path.exists(caminho_csv):
-        print("⚠️  CSV ainda não existe. Criando novo.")
-        return [], list(mapa_api_to_csv.values())  # usa nomes legíveis
+def processa_pagina(tipo: str, dados_brutos: list, mapa_api_to_csv: dict) -> list:
+    """
+    Transforma uma página de resultados da API em linhas do CSV, em lote: os registros são
+    agrupados pelo conjunto de propriedades (o "esquema"), cada propriedade vira uma coluna e as
+    traduções/formatações são aplicadas coluna a coluna. As linhas saem na mesma ordem, com as
+    mesmas chaves e valores da transformação registro a registro.
+    """
+    with metricas.mede(f"processa_{tipo}", registros_entrada=len(dados_brutos)) as medida:
+        resultados = _processa_pagina(tipo, dados_brutos, mapa_api_to_csv)
+        medida["registros_saida"] = len(resultados)
+    return resultados
 
-    with open(caminho_csv, newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
-        print(f"✅ {len(rows)} registros carregados do CSV.")
-        return rows, reader.fieldnames
 
+def _processa_pagina(tipo: str, dados_brutos: list, mapa_api_to_csv: dict) -> list:
+    grupos = {}
+    for posicao, item in enumerate(dados_brutos):
+        props_api = item.get("properties", {})
+        grupos.setdefault(tuple(props_api), []).append((posicao, props_api))
 
-def atualiza_csv(tipo: str, caminho_csv: str, after_date: str, props: list, mapa_api_to_csv: dict, id_coluna: str):
-    print(f"🚀 Iniciando atualização do CSV {tipo}...\n")
+    resultados = [None] * len(dados_brutos)
+    mapa_itens = tuple(mapa_api_to_csv.items())
+    for chaves, registros in grupos.items():
+        linhas = transforma_lote(tipo, chaves, [props_api for _, props_api in registros], mapa_itens)
+        for (posicao, _), linha in zip(registros, linhas):
+            resultados[posicao] = linha
 
-    # Coletar dados da API diretamente
-    url = NEGOCIOS_URL if tipo == "negocios" else CHAMADAS_URL
-    dados_brutos = coleta_dados_da_api(url, props, after_date)
-    novos_dados = processa_dados(tipo, dados_brutos, mapa_api_to_csv)
+    return resultados
 
-    # Carregar CSV existente
-    existentes, colunas = ler_csv_existente(caminho_csv, mapa_api_to_csv)
-    colunas = list(colunas or [])
 
-    if not colunas: 
-        colunas = list(mapa_api_to_csv.values())
+@lru_cache(maxsize=64)
+def plano_colunas(tipo: str, chaves: tuple, mapa_itens: tuple) -> tuple:
+    """
+    Calculado uma vez por esquema: a ordem final das colunas de cada linha (propriedades
+    recebidas, colunas derivadas e colunas faltantes do mapa) e as colunas de data a formatar.
+    """
+    mapa_api_to_csv = dict(mapa_itens)
+    linha = {mapa_api_to_csv.get(campo, campo): None for campo in chaves}
+    for nome in COLUNAS_DERIVADAS.get(tipo, []):
+        linha.setdefault(nome)
+    for nome in mapa_api_to_csv.values():
+        linha.setdefault(nome)
+
+    colunas_data = tuple(
+        (campo, mapa_api_to_csv.get(campo, campo))
+        for campo in chaves
+        if "date" in campo.lower() or "timestamp" in campo.lower()
+    )
+    return tuple(linha), colunas_data
+
+
+def transforma_lote(tipo: str, chaves: tuple, registros: list, mapa_itens: tuple) -> list:
+    colunas_saida, colunas_data = plano_colunas(tipo, chaves, mapa_itens)
+    mapa_api_to_csv = dict(mapa_itens)
+    total = len(registros)
+    nulos = [None] * total
+
+    brutos = {campo: [props_api[campo] for props_api in registros] for campo in chaves}
+    colunas = {}
+    for campo in chaves:
+        colunas[mapa_api_to_csv.get(campo, campo)] = brutos[campo]
+
+    if tipo == "negocios":
+        # Traduzir dealstage
+        if "dealstage" in brutos:
+            colunas["Etapa do negócio"] = [
+                DEALSTAGE_MAP.get(etapa, atual) for etapa, atual in zip(brutos["dealstage"], colunas["Etapa do negócio"])
+            ]
+
+        # Traduzir ids para nomes
+        colunas["Proprietário do negócio"] = traduz_coluna(OWNER_MAP, brutos.get("hubspot_owner_id", nulos))
+        colunas["Momento de Compra"] = traduz_coluna(PURCHASE_MOMENT_MAP, brutos.get("purchase_moment", nulos))
+
+        # Traduzir foi_conectado
+        if "foi_conectado" in brutos:
+            colunas["Foi conectado"] = [
+                atual if valor is None else FOI_CONECTADO_MAP.get(str(valor).lower(), "Não informado")
+                for valor, atual in zip(brutos["foi_conectado"], colunas["Foi conectado"])
+            ]
+
+    if tipo == "chamadas":
+        # Traduzir ids para nomes
+        colunas["Atividade atribuída a"] = traduz_coluna(OWNER_MAP, brutos.get("hubspot_owner_id", nulos))
+        colunas["Resultado da chamada"] = traduz_coluna(CALL_DISPOSITION_MAP, brutos.get("hs_call_disposition", nulos))
+
+        # Formatação
+        colunas["Observações de chamada"] = [limpa_html(corpo) for corpo in brutos.get("hs_call_body", nulos)]
+        colunas["Duração da chamada (HH:mm:ss)"] = [converte_ms_para_hms(ms) for ms in brutos.get("hs_call_duration", nulos)]
+        colunas["Associated Deal IDs"] = [limpa_associated_deal_id(valor) for valor in brutos.get("hs_call_primary_deal", nulos)]
+
+        # Remove "Chamada com" do título da chamada
+        titulos = colunas.get("Título da chamada", [""] * total)
+        colunas["Associated Deal"] = [titulo.replace("Chamada com ", "").strip() for titulo in titulos]
+
+    # Formatar datas, limpar valores inválidos (todas as colunas de data do lote numa chamada só)
+    if colunas_data:
+        datas = formata_datas([
+            valor if isinstance(valor, str) and ("T" in valor or "-" in valor) else ""
+            for campo, _ in colunas_data
+            for valor in brutos[campo]
+        ])
+        for indice, (_, nome_csv) in enumerate(colunas_data):
+            colunas[nome_csv] = datas[indice * total:(indice + 1) * total]
+
+    # Colunas do mapa que não vieram na página ficam vazias
+    vazias = [""] * total
+    valores = [colunas.get(nome, vazias) for nome in colunas_saida]
+    return [dict(zip(colunas_saida, linha)) for linha in zip(*valores)]
+
+
+def traduz_coluna(mapa: dict, valores: list) -> list:
+    """
+    mapeia_valores aplicado a uma coluna inteira.
+    """
+    return [mapa.get(valor, valor) if valor else None for valor in valores]
 
-    id_map = {linha[id_coluna]: linha for linha in existentes}
-    novos_count = 0
-    atualizados_count = 0
 
-    for novo in novos_dados:
-        hs_id = novo.get(id_coluna)
-        if hs_id in id_map:
-            id_map[hs_id].update(novo)
-            atualizados_count += 1
-        else:
-            existentes.insert(0, novo)
-            novos_count += 1
+def atualiza_csv(tipo: str, caminho_csv: str, after_date: str, props: list, mapa_api_to_csv: dict, id_coluna: str, fatiado: bool = False):
+    """
+    Pipeline em streaming: página da API → processamento → upsert no banco local (SQLite). Cada
+    página é gravada e liberada antes da próxima e o upsert custa proporcional ao delta. Os
+    estágios seguintes leem o banco (ou o snapshot Parquet, atualizado ao final só nos meses que
+    mudaram); os CSVs legados só são gerados sob demanda (python -m app.services.armazenamento).
+    O CSV existente só é lido para carregar um banco ainda vazio.
+    """
+    print(f"🚀 Iniciando atualização do CSV {tipo}...\n")
 
-    print(f"\n🧾 Atualizações concluídas:")
-    print(f"🔁 {tipo} atualizados: {atualizados_count}")
-    print(f"➕ Novos {tipo} adicionados: {novos_count} → {caminho_csv}")
+    conn = armazenamento.conecta()
+    if armazenamento.esta_vazio(conn, tipo):
+        armazenamento.importa_csv(conn, tipo, caminho_csv)
+    if not armazenamento.le_colunas(conn, tipo):
+        armazenamento.adiciona_colunas(conn, tipo, list(mapa_api_to_csv.values()))
 
-    for row in existentes:
-        for col in row:
-            if col not in colunas:
-                if col == "Associated Deal":
-                    colunas.append(col)
+    # Coletar dados da API diretamente (fatiado e em paralelo para janelas grandes)
+    url = NEGOCIOS_URL if tipo == "negocios" else CHAMADAS_URL
+    if fatiado:
+        paginas = itera_paginas_fatiadas(url, props, after_date)
+    else:
+        paginas = itera_paginas_api(url, props, after_date)
 
-    print(f"\n💾 Salvando dados no arquivo: {caminho_csv}...")
-    with open(caminho_csv, "w", newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=colunas, quoting=csv.QUOTE_ALL)
-        writer.writeheader()
-        for row in existentes:
-            linha_completa = {col: str(row.get(col, "") or "") for col in colunas}
-            writer.writerow(linha_completa)
+    ultima_modificacao = None
+    processados = novos_count = atualizados_count = 0
+    try:
+        for pagina in paginas:
+            maior = maior_modificacao(pagina)
+            if maior and (ultima_modificacao is None or converte_data_corte(maior) > converte_data_corte(ultima_modificacao)):
+                ultima_modificacao = maior
+
+            novos_dados = processa_pagina(tipo, pagina, mapa_api_to_csv)
+            if any("Associated Deal" in novo for novo in novos_dados):
+                armazenamento.adiciona_colunas(conn, tipo, ["Associated Deal"])
+
+            with metricas.mede(f"upsert_{tipo}", registros_entrada=len(novos_dados)) as medida:
+                novos, atualizados = armazenamento.upsert(conn, tipo, novos_dados)
+                # Uma transação por página: a outra sincronização (em paralelo) não fica travada
+                # esperando o tipo inteiro. O cursor só avança no fim, então uma página gravada de
+                # uma execução que falhou é só regravada (upsert idêntico) na próxima.
+                conn.commit()
+                medida.update(novos=novos, atualizados=atualizados)
+            processados += len(novos_dados)
+            novos_count += novos
+            atualizados_count += atualizados
+
+        conn.commit()
+        print(f"✅ Total processado ({tipo}): {processados}")
+
+        print(f"\n🧾 Atualizações concluídas:")
+        print(f"🔁 {tipo} atualizados: {atualizados_count}")
+        print(f"➕ Novos {tipo} adicionados: {novos_count} → {armazenamento.CAMINHO_BANCO}")
+
+        with metricas.mede(f"snapshot_{tipo}"):
+            snapshots.atualiza_do_banco(conn, tipo)
+    finally:
+        conn.close()
+
+    return ultima_modificacao
+
+
+def sincroniza(tipo: str, recuperacao: bool = False, desde: str = None):
+    """
+    Sincroniza um tipo a partir do cursor salvo e só avança o cursor depois que tudo foi gravado no banco.
+    Com `desde` (backfill) ou em recuperação, usa a busca fatiada em paralelo.
+    """
+    if tipo == "negocios":
+        caminho_csv, props, mapa, id_coluna = NEGOCIOS_CSV, PROPERTIES_NEGOCIOS, API_TO_CSV_NEGOCIOS, "ID do registro."
+    else:
+        caminho_csv, props, mapa, id_coluna = CHAMADAS_CSV, PROPERTIES_CHAMADAS, API_TO_CSV_CHAMADAS, "ID do objeto"
 
-    print("✅ CSV salvo com sucesso!\n")
+    with perfil.etapa(f"sincroniza_{tipo}"):
+        data_inicio = desde or define_data_inicio(tipo, recuperacao)
+        fatiado = bool(desde) or recuperacao
+        with metricas.mede(f"atualiza_csv_{tipo}"):
+            ultima_modificacao = atualiza_csv(tipo, caminho_csv, data_inicio, props, mapa, id_coluna, fatiado=fatiado)
 
+        if ultima_modificacao:
+            salva_cursor(tipo, ultima_modificacao)
 
-def main():
-    # Puxa os últimos 4 dias
-    hoje = datetime.now()
-    quatro_dias_atras = hoje - timedelta(days=4)
-    data_formatada = quatro_dias_atras.strftime("%Y-%m-%d")
 
-    # Puxa a partir de uma data escolhida
+def main(recuperacao: bool = False, desde: str = None):
+    # Executado sozinho, sincroniza um tipo depois do outro; o app.api.main roda os dois em paralelo
+    # Busca a partir do cursor salvo (com sobreposição); sem cursor ou em recuperação, puxa os últimos 4 dias
+    # Para puxar a partir de uma data escolhida (backfill fatiado), passe desde=DATA_CORTE
     # DATA_CORTE = "2025-01-01"
 
-    atualiza_csv("negocios", NEGOCIOS_CSV, data_formatada, PROPERTIES_NEGOCIOS, API_TO_CSV_NEGOCIOS, "ID do registro.")
-    atualiza_csv("chamadas", CHAMADAS_CSV, data_formatada, PROPERTIES_CHAMADAS, API_TO_CSV_CHAMADAS, "ID do objeto")
+    sincroniza("negocios", recuperacao, desde)
+    sincroniza("chamadas", recuperacao, desde)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Sincroniza negócios e chamadas da HubSpot com os CSVs locais.")
+    parser.add_argument("--recuperacao", action="store_true", help=f"Busca os últimos {DIAS_RECUPERACAO} dias, ou desde o cursor se ele for mais antigo.")
+    parser.add_argument("--desde", help="Backfill: busca tudo modificado a partir desta data (YYYY-MM-DD), em fatias paralelas.")
+    perfil.adiciona_argumentos(parser)
+    args = parser.parse_args()
+    with perfil.sessao(args.perfil, args.perfil_memoria, args.perfil_top):
+        main(recuperacao=args.recuperacao, desde=args.desde)
@@ -0,0 +1,262 @@
+import atexit
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import date
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+from app.services.limitador import BaldeDeTokens
+
+load_dotenv()
+API_KEY = os.getenv("HUBSPOT_API_KEY")
+
+# Permite apontar para um servidor local (stub) em testes: HUBSPOT_BASE_URL=http://127.0.0.1:8765
+HUBSPOT_BASE_URL = os.getenv("HUBSPOT_BASE_URL", "https://api.hubapi.com").rstrip("/")
+
+# Limites da HubSpot para apps privados: 100 requisições / 10 s (burst), 250 mil por dia
+# e 5 requisições por segundo nos endpoints de search. Ajustáveis por variável de ambiente.
+# Numa janela de 10 s o balde libera até RAJADA_MAXIMA + 10 × REQUISICOES_POR_SEGUNDO
+# requisições, e essa soma tem de ficar em 100.
+REQUISICOES_POR_SEGUNDO = float(os.getenv("HUBSPOT_REQUISICOES_POR_SEGUNDO", "9"))
+RAJADA_MAXIMA = int(os.getenv("HUBSPOT_RAJADA_MAXIMA", "10"))
+BUSCAS_POR_SEGUNDO = float(os.getenv("HUBSPOT_BUSCAS_POR_SEGUNDO", "4"))
+LIMITE_DIARIO = int(os.getenv("HUBSPOT_LIMITE_DIARIO", "250000"))
+
+# O cron abre um processo por execução: a contagem do dia fica em disco para valer entre execuções.
+# Quando a HubSpot devolve o restante do dia no cabeçalho, a contagem passa a seguir o portal (que
+# inclui as requisições de outras integrações com o mesmo app). Durante a execução a contagem fica
+# em memória e vai para o disco a cada GRAVA_CONTAGEM_A_CADA requisições, ao atingir o limite e na
+# saída do processo.
+CAMINHO_CONTAGEM_DIARIA = "data/atualizado/hubspot-requisicoes-dia.json"
+GRAVA_CONTAGEM_A_CADA = 100
+CABECALHO_RESTANTE_DIARIO = "X-HubSpot-RateLimit-Daily-Remaining"
+
+MAX_TENTATIVAS = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAXIMO = 60.0
+STATUS_RETENTAVEIS = {429, 500, 502, 503, 504}
+TIMEOUT = 30
+
+
+class LimiteDiarioExcedido(Exception):
+    pass
+
+
+def le_contagem_diaria(dia: str) -> int:
+    """
+    Requisições já feitas no dia (AAAA-MM-DD) segundo o arquivo de contagem; 0 num dia novo.
+    """
+    try:
+        with open(CAMINHO_CONTAGEM_DIARIA, encoding="utf-8") as f:
+            contagem = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    return int(contagem.get("requisicoes", 0)) if contagem.get("dia") == dia else 0
+
+
+def grava_contagem_diaria(dia: str, requisicoes: int):
+    os.makedirs(os.path.dirname(CAMINHO_CONTAGEM_DIARIA) or ".", exist_ok=True)
+    caminho_tmp = f"{CAMINHO_CONTAGEM_DIARIA}.tmp"
+    with open(caminho_tmp, "w", encoding="utf-8") as f:
+        json.dump({"dia": dia, "requisicoes": requisicoes}, f)
+    os.replace(caminho_tmp, CAMINHO_CONTAGEM_DIARIA)
+
+
+def normaliza_endpoint(metodo: str, url: str) -> str:
+    """
+    Agrupa URLs pelo endpoint (sem host, query e IDs numéricos) para as métricas.
+    Ex.: GET https://api.hubapi.com/crm/v3/pipelines/deals/123 → GET /crm/v3/pipelines/deals/{id}
+    """
+    caminho = re.sub(r"^https?://[^/]+", "", url).split("?")[0]
+    caminho = re.sub(r"/\d+(?=/|$)", "/{id}", caminho)
+    return f"{metodo.upper()} {caminho}"
+
+
+def percentil(valores: list, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    posicao = min(len(ordenados) - 1, max(0, round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[posicao]
+
+
+class ClienteHubSpot:
+    """
+    Cliente HTTP compartilhado para a API da HubSpot: conexões keep-alive reaproveitadas,
+    limitador de taxa (por segundo, search e diário) e retentativas com backoff em 429/5xx.
+    """
+
+    def __init__(self, api_key: str = API_KEY, base_url: str = HUBSPOT_BASE_URL, pool: int = 10):
+        self.base_url = base_url
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": f"Bearer {api_key}"})
+        adapter = HTTPAdapter(pool_connections=pool, pool_maxsize=pool)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.balde = BaldeDeTokens(REQUISICOES_POR_SEGUNDO, RAJADA_MAXIMA)
+        self.balde_busca = BaldeDeTokens(BUSCAS_POR_SEGUNDO, 1)
+
+        self.dia = None
+        self.requisicoes_dia = 0
+        self.nao_gravadas = 0
+        atexit.register(self.grava_contagem)
+
+        self.lock = threading.Lock()
+        self.latencias = defaultdict(list)
+        self.retentativas = defaultdict(int)
+        self.erros = defaultdict(int)
+
+    def _monta_url(self, url: str) -> str:
+        if url.startswith("http://") or url.startswith("https://"):
+            return url
+        return f"{self.base_url}/{url.lstrip('/')}"
+
+    def _conta_requisicao_diaria(self):
+        with self.lock:
+            hoje = date.today().isoformat()
+            if hoje != self.dia:
+                self._grava_contagem()
+                self.dia, self.requisicoes_dia = hoje, le_contagem_diaria(hoje)
+            if self.requisicoes_dia >= LIMITE_DIARIO:
+                self._grava_contagem()
+                raise LimiteDiarioExcedido(f"Limite diário de {LIMITE_DIARIO} requisições à HubSpot atingido.")
+            self.requisicoes_dia += 1
+            self.nao_gravadas += 1
+            if self.nao_gravadas >= GRAVA_CONTAGEM_A_CADA:
+                self._grava_contagem()
+
+    def _grava_contagem(self):
+        # Chamado com self.lock já adquirido
+        if self.dia is not None and self.nao_gravadas:
+            grava_contagem_diaria(self.dia, self.requisicoes_dia)
+            self.nao_gravadas = 0
+
+    def grava_contagem(self):
+        """
+        Grava no disco a contagem do dia mantida em memória (também registrado no atexit).
+        """
+        with self.lock:
+            self._grava_contagem()
+
+    def _acompanha_restante_diario(self, response):
+        """
+        Ajusta a contagem do dia pelo restante informado pela HubSpot, quando vem no cabeçalho.
+        """
+        restante = response.headers.get(CABECALHO_RESTANTE_DIARIO, "")
+        if not restante.isdigit():
+            return
+        with self.lock:
+            usadas = LIMITE_DIARIO - int(restante)
+            if self.dia == date.today().isoformat() and usadas > self.requisicoes_dia:
+                self.requisicoes_dia = usadas
+                self.nao_gravadas += 1
+
+    def _espera_retentativa(self, response, tentativa: int) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(BACKOFF_MAXIMO, float(retry_after))
+            except ValueError:
+                pass
+        return min(BACKOFF_MAXIMO, BACKOFF_BASE * 2 ** tentativa) + random.uniform(0, BACKOFF_BASE)
+
+    def request(self, metodo: str, url: str, **kwargs) -> requests.Response:
+        """
+        Faz a requisição respeitando os limites e retentando 429/5xx e erros de conexão.
+        Depois de MAX_TENTATIVAS devolve a última resposta (ou relança o erro de conexão);
+        cabe a quem chama checar `response.ok`.
+        """
+        url = self._monta_url(url)
+        endpoint = normaliza_endpoint(metodo, url)
+        kwargs.setdefault("timeout", TIMEOUT)
+
+        for tentativa in range(MAX_TENTATIVAS):
+            self._conta_requisicao_diaria()
+            self.balde.consome()
+            if "/search" in url:
+                self.balde_busca.consome()
+
+            inicio = time.perf_counter()
+            try:
+                response = self.session.request(metodo, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                with self.lock:
+                    self.erros[endpoint] += 1
+                if tentativa == MAX_TENTATIVAS - 1:
+                    raise
+                response, erro = None, e
+            else:
+                erro = None
+            finally:
+                with self.lock:
+                    self.latencias[endpoint].append(time.perf_counter() - inicio)
+
+            if response is not None:
+                self._acompanha_restante_diario(response)
+            if response is not None and response.status_code not in STATUS_RETENTAVEIS:
+                return response
+            if tentativa == MAX_TENTATIVAS - 1:
+                with self.lock:
+                    self.erros[endpoint] += 1
+                return response
+
+            espera = self._espera_retentativa(response, tentativa)
+            motivo = erro if response is None else f"HTTP {response.status_code}"
+            print(f"⏳ {endpoint}: {motivo}, nova tentativa em {espera:.1f}s ({tentativa + 1}/{MAX_TENTATIVAS - 1})")
+            with self.lock:
+                self.retentativas[endpoint] += 1
+            time.sleep(espera)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def metricas(self) -> dict:
+        """
+        Latência (p50/p95/máx, em segundos), chamadas, retentativas e erros por endpoint.
+        """
+        with self.lock:
+            endpoints = set(self.latencias) | set(self.retentativas) | set(self.erros)
+            return {
+                endpoint: {
+                    "chamadas": len(self.latencias[endpoint]),
+                    "latencia_p50": percentil(self.latencias[endpoint], 50),
+                    "latencia_p95": percentil(self.latencias[endpoint], 95),
+                    "latencia_max": max(self.latencias[endpoint], default=0.0),
+                    "retentativas": self.retentativas[endpoint],
+                    "erros": self.erros[endpoint],
+                }
+                for endpoint in sorted(endpoints)
+            }
+
+    def zera_metricas(self):
+        with self.lock:
+            self.latencias.clear()
+            self.retentativas.clear()
+            self.erros.clear()
+
+
+# Cliente padrão, compartilhado por todos os módulos do pipeline
+cliente = ClienteHubSpot()
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return cliente.get(url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return cliente.post(url, **kwargs)
+
+
+def metricas() -> dict:
+    return cliente.metricas()
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import random
+import tempfile
+import time
+
+import requests
+from gspread.exceptions import APIError
+
+from app.services.limitador import BaldeDeTokens
+from app.services import metricas
+
+# Cota de escrita da API do Sheets: 60 requisições por minuto por usuário. Cada escrita grande é
+# dividida em lotes de até MAX_CELULAS_POR_LOTE células, enviados no ritmo da cota.
+ESCRITAS_POR_MINUTO = float(os.getenv("SHEETS_ESCRITAS_POR_MINUTO", "50"))
+RAJADA_ESCRITAS = int(os.getenv("SHEETS_RAJADA_ESCRITAS", "5"))
+MAX_CELULAS_POR_LOTE = int(os.getenv("SHEETS_MAX_CELULAS_POR_LOTE", "50000"))
+
+MAX_TENTATIVAS = 6
+BACKOFF_BASE = 2.0
+BACKOFF_MAXIMO = 64.0
+STATUS_RETENTAVEIS = {429, 500, 502, 503, 504}
+
+# Lotes já gravados de uma escrita interrompida: a próxima tentativa com o mesmo plano continua dali
+CAMINHO_PROGRESSO = "data/atualizado/planilha-progresso.json"
+
+
+def celulas(requisicao: dict) -> int:
+    return sum(len(linha["values"]) for linha in requisicao["updateCells"].get("rows", []))
+
+
+def divide_requisicao(requisicao: dict, limite: int) -> list:
+    """
+    Quebra um updateCells com mais de `limite` células em faixas de linhas consecutivas.
+    """
+    atualizacao = requisicao["updateCells"]
+    linhas = atualizacao.get("rows", [])
+    if celulas(requisicao) <= limite:
+        return [requisicao]
+    largura = max(len(linha["values"]) for linha in linhas)
+    por_faixa = max(1, limite // max(1, largura))
+    faixas = []
+    for inicio in range(0, len(linhas), por_faixa):
+        start = dict(atualizacao["start"], rowIndex=atualizacao["start"]["rowIndex"] + inicio)
+        faixas.append({"updateCells": dict(atualizacao, start=start, rows=linhas[inicio:inicio + por_faixa])})
+    return faixas
+
+
+def agrupa_em_lotes(requisicoes: list, limite: int = None) -> list:
+    """
+    Lotes de requisições (na ordem original) com até `limite` células cada; limpezas não contam.
+    """
+    limite = limite or MAX_CELULAS_POR_LOTE
+    lotes, atual, tamanho = [], [], 0
+    for requisicao in requisicoes:
+        for parte in divide_requisicao(requisicao, limite):
+            n = celulas(parte)
+            if atual and tamanho + n > limite:
+                lotes.append(atual)
+                atual, tamanho = [], 0
+            atual.append(parte)
+            tamanho += n
+    if atual:
+        lotes.append(atual)
+    return lotes
+
+
+def assinatura(lote) -> str:
+    return hashlib.sha1(json.dumps(lote, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+def status_do_erro(erro: Exception):
+    resposta = getattr(erro, "response", None)
+    return getattr(resposta, "status_code", None)
+
+
+class EscritorSheets:
+    """
+    Escritas na aba em lotes limitados, no ritmo da cota de escrita, com retentativas (backoff
+    exponencial, respeitando Retry-After) em 429/5xx e erros de conexão. O progresso dos lotes de
+    um batchUpdate fica em disco: se a execução parar no meio, a próxima com o mesmo plano retoma
+    do primeiro lote não gravado.
+    """
+
+    def __init__(self, worksheet, caminho_progresso: str = None, balde: BaldeDeTokens = None):
+        self.worksheet = worksheet
+        self.caminho_progresso = caminho_progresso or CAMINHO_PROGRESSO
+        self.balde = balde or balde_escritas
+        self.requisicoes = 0
+        self.retentativas = 0
+
+    def _espera_retentativa(self, erro: Exception, tentativa: int) -> float:
+        resposta = getattr(erro, "response", None)
+        retry_after = getattr(resposta, "headers", {}).get("Retry-After") if resposta is not None else None
+        if retry_after:
+            try:
+                return min(BACKOFF_MAXIMO, float(retry_after))
+            except ValueError:
+                pass
+        return min(BACKOFF_MAXIMO, BACKOFF_BASE * 2 ** tentativa) + random.uniform(0, BACKOFF_BASE)
+
+    def executa(self, descricao: str, funcao, *args, idempotente: bool = True, **kwargs):
+        """
+        Uma requisição de escrita: espera a cota, tenta e, em erro retentável, repete com backoff.
+        Depois de MAX_TENTATIVAS (ou em erro não retentável) relança o erro. Escritas não
+        idempotentes (inserção de linhas) só são repetidas em 429, quando a API garante que nada
+        foi aplicado; num 5xx ou timeout a inserção pode ter acontecido.
+        """
+        for tentativa in range(MAX_TENTATIVAS):
+            self.balde.consome()
+            self.requisicoes += 1
+            try:
+                with metricas.mede("sheets_escrita", requisicoes=1):
+                    return funcao(*args, **kwargs)
+            except (APIError, requests.ConnectionError, requests.Timeout) as erro:
+                status = status_do_erro(erro)
+                if isinstance(erro, APIError) and status not in STATUS_RETENTAVEIS:
+                    raise
+                if not idempotente and status != 429:
+                    raise
+                if tentativa == MAX_TENTATIVAS - 1:
+                    raise
+                espera = self._espera_retentativa(erro, tentativa)
+                motivo = f"HTTP {status}" if status else type(erro).__name__
+                print(f"⏳ Sheets {descricao}: {motivo}, nova tentativa em {espera:.1f}s ({tentativa + 1}/{MAX_TENTATIVAS - 1})")
+                self.retentativas += 1
+                metricas.soma("sheets_escrita", retentativas=1)
+                time.sleep(espera)
+
+    def _le_progresso(self) -> list:
+        try:
+            with open(self.caminho_progresso, encoding="utf-8") as f:
+                return json.load(f).get("lotes", [])
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+
+    def _salva_progresso(self, gravados: list):
+        pasta = os.path.dirname(self.caminho_progresso) or "."
+        os.makedirs(pasta, exist_ok=True)
+        fd, caminho_tmp = tempfile.mkstemp(dir=pasta, prefix=".planilha-progresso.", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"lotes": gravados}, f)
+        os.replace(caminho_tmp, self.caminho_progresso)
+
+    def envia(self, requisicoes: list) -> int:
+        """
+        Envia as requisições de um spreadsheets.batchUpdate divididas em lotes, na ordem. Retorna
+        quantos lotes foram enviados nesta chamada (os já gravados por uma tentativa anterior do
+        mesmo plano são pulados).
+        """
+        lotes = agrupa_em_lotes(requisicoes)
+        assinaturas = [assinatura(lote) for lote in lotes]
+        gravados = self._le_progresso()
+        retomados = 0
+        while retomados < min(len(gravados), len(assinaturas)) and gravados[retomados] == assinaturas[retomados]:
+            retomados += 1
+        if retomados:
+            print(f"↩️  Retomando escrita interrompida: {retomados} de {len(lotes)} lotes já gravados.")
+        gravados = assinaturas[:retomados]
+
+        for numero in range(retomados, len(lotes)):
+            self.executa(f"lote {numero + 1}/{len(lotes)}", self.worksheet.spreadsheet.batch_update, {"requests": lotes[numero]})
+            metricas.soma("sheets_escrita", celulas=sum(celulas(requisicao) for requisicao in lotes[numero]))
+            gravados.append(assinaturas[numero])
+            if numero < len(lotes) - 1:
+                self._salva_progresso(gravados)
+        if os.path.exists(self.caminho_progresso):
+            os.remove(self.caminho_progresso)
+        if len(lotes) > 1:
+            print(f"📦 Escrita dividida em {len(lotes)} lotes de até {MAX_CELULAS_POR_LOTE} células.")
+        return len(lotes) - retomados
+
+    def insere_linhas(self, linhas: list, linha: int = 2):
+        """
+        insert_rows em lotes de até MAX_CELULAS_POR_LOTE células, do último para o primeiro, todos na
+        mesma posição, para as linhas ficarem na ordem de `linhas`. Uma execução interrompida não
+        duplica linhas: quem chama recalcula o que falta pelos IDs já presentes na aba.
+        """
+        if not linhas:
+            return
+        por_lote = max(1, MAX_CELULAS_POR_LOTE // max(1, max(len(valores) for valores in linhas)))
+        inicios = list(range(0, len(linhas), por_lote))
+        for numero, inicio in enumerate(reversed(inicios), start=1):
+            self.executa(
+                f"inserção {numero}/{len(inicios)}", self.worksheet.insert_rows, linhas[inicio:inicio + por_lote], linha,
+                idempotente=False,
+            )
+            metricas.soma("sheets_escrita", celulas=sum(len(valores) for valores in linhas[inicio:inicio + por_lote]))
+
+
+# Balde compartilhado: a cota é por usuário, não por aba
+balde_escritas = BaldeDeTokens(ESCRITAS_POR_MINUTO / 60, RAJADA_ESCRITAS)
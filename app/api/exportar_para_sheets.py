@@ -1,18 +1,38 @@
 from dotenv import load_dotenv
 import pandas as pd
 import gspread
+from gspread.utils import a1_range_to_grid_range, a1_to_rowcol, numericise_all, rowcol_to_a1
 import numpy as np
 from google.oauth2.service_account import Credentials
+import argparse
 import os
 import json
 import tempfile
-import time
+
+from app.api.escritor_sheets import EscritorSheets
+from app.services import metricas, perfil, snapshots
+from app.services.calendario_comercial import calendario_para
 
 # Configurações
 NEGOCIOS_CSV_PATH = "data/atualizado/negocios.csv"
 NEGOCIOS_CHAMADAS_CSV_PATH = "data/atualizado/negocios-chamadas"
 SHEET_NAME = "Acompanhamento métricas-chave aMORA - 2025 - Lead time"
 WORKSHEET_NAME = "Negócios"
+ANO_PLANILHA = 2025
+
+# Colunas lidas de cada fonte (o resto do CSV/snapshot não é carregado)
+COLUNAS_NEGOCIOS = [
+    "ID do registro.", "Nome do negócio", "Etapa do negócio", "Data de criação", "status_cadastro",
+    "Momento de Compra", "Proprietário do negócio",
+]
+COLUNAS_LEAD_TIME = ["Associated Deal IDs", "Lead Time (min)", "Data da atividade"]
+
+# Sincronização por diferença: cópia local do que foi enviado por último para a aba. Só as células
+# que mudaram desde então são escritas, num único batch_update; acima de LIMITE_DIFF (fração das
+# células de dados) a aba é reescrita inteira. As colunas de fórmula (E/F) não entram no diff.
+PLANILHA_ENVIADA_PATH = "data/atualizado/planilha-enviada.json"
+LIMITE_DIFF = 0.3
+COLUNAS_FORMULA = ("E", "F")
 
 SCOPES = [
     'https://www.googleapis.com/auth/spreadsheets',
@@ -46,80 +66,139 @@ def clean_row(row):
             clean.append(str(val))
     return clean
 
-def insere_novos_negocios(worksheet, df_sheets):
-    df_csv = pd.read_csv(NEGOCIOS_CSV_PATH)
-
-    # Ordena o CSV por data de criação: mais antigo primeiro (crescente)
-    df_csv["Data de criação"] = pd.to_datetime(df_csv["Data de criação"], errors="coerce")
-    df_csv = df_csv.sort_values(by="Data de criação", ascending=True)  # crescente
+def le_negocios_do_ano(ano: int = ANO_PLANILHA) -> pd.DataFrame:
+    """
+    Negócios criados no ano da planilha, com "Data de criação" em datetime. Pelo snapshot Parquet
+    só as partições do ano são lidas, e pelo banco local só as linhas do ano; sem nenhum dos dois,
+    o negocios.csv é lido inteiro e filtrado.
+    """
+    df = snapshots.le_dataset("negocios", colunas=COLUNAS_NEGOCIOS, filtros=[("ano", "=", ano)])
+    if df is None:
+        df = snapshots.le_banco("negocios", COLUNAS_NEGOCIOS, ano=ano)
+        if df is None:
+            df = pd.read_csv(NEGOCIOS_CSV_PATH, usecols=lambda coluna: coluna in COLUNAS_NEGOCIOS)
+        df["Data de criação"] = pd.to_datetime(df["Data de criação"], errors="coerce")
+        df = df[df["Data de criação"].dt.year == ano]
+    return df
+
+
+def le_lead_times() -> pd.DataFrame:
+    """
+    Lead time e data da primeira chamada por negócio, do snapshot do merge quando ele está em dia
+    (data de volta ao texto do CSV), senão do negocios-chamadas.
+    """
+    df = snapshots.le_dataset("negocios-chamadas", colunas=COLUNAS_LEAD_TIME, caminho_csv=NEGOCIOS_CHAMADAS_CSV_PATH)
+    if df is None:
+        return pd.read_csv(NEGOCIOS_CHAMADAS_CSV_PATH, usecols=lambda coluna: coluna in COLUNAS_LEAD_TIME)
+    return df.assign(**{"Data da atividade": snapshots.data_como_texto(df["Data da atividade"])})
+
+
+def normaliza_ids(coluna):
+    """
+    IDs como texto e sem o ".0" que a leitura como float deixa (10203.0 -> "10203").
+    """
+    return coluna.astype(str).str.split('.').str[0]
+
+def limpa_linhas(df):
+    """
+    clean_row aplicado à tabela inteira de uma vez: NaN e infinitos viram "", o resto str().
+    """
+    df = df.astype(object)
+    vazias = df.isna() | df.isin([np.inf, -np.inf])
+    return df.where(~vazias, "").astype(str).values.tolist()
+
+def monta_novas_linhas(df_csv, df_sheets):
+    """
+    Linhas (já limpas, mais recente primeiro) dos negócios do CSV que ainda não estão na planilha.
+    """
+    # Ordena por data de criação: mais antigo primeiro (crescente); o ID desempata, para a ordem
+    # não depender da ordem das linhas na fonte
+    df_csv = df_csv.sort_values(by=["Data de criação", "ID do registro."], ascending=True)  # crescente
 
     # Limpa e converte os IDs
-    df_sheets["ID do registro."] = df_sheets["ID do registro."].astype(str).str.split('.').str[0]
-    df_csv["ID do registro."] = df_csv["ID do registro."].astype(str).str.split('.').str[0]
-
-    ids_sheets = set(df_sheets["ID do registro."])
-    novos_ids = [id_ for id_ in df_csv["ID do registro."] if id_ not in ids_sheets]
-
-    novas_linhas = []
-
-    # Montagem das novas linhas
-    for id_ in novos_ids:
-        linha_csv = df_csv[df_csv["ID do registro."] == id_].iloc[0]
-        nova_linha = [
-            linha_csv.get("ID do registro.", ""),
-            linha_csv.get("Nome do negócio", ""),
-            linha_csv.get("Etapa do negócio", ""),
-            linha_csv.get("Data de criação", "").strftime("%Y-%m-%d %H:%M") if pd.notna(linha_csv.get("Data de criação", "")) else "",
-            "",  # Semana de criação
-            "",  # Mês de criação
-            linha_csv.get("status_cadastro", ""),
-            linha_csv.get("Momento de Compra", ""),
-            linha_csv.get("Proprietário do negócio", ""),
-            "",  # Horário Comercial
-            "",  # Data da primeira chamada
-            "",  # Lead Time (min)
-        ]
+    df_sheets["ID do registro."] = normaliza_ids(df_sheets["ID do registro."])
+    df_csv = df_csv.assign(**{"ID do registro.": normaliza_ids(df_csv["ID do registro."])})
+
+    # Anti-join pelo ID (hash), em vez de filtrar o CSV inteiro a cada ID novo
+    novos = df_csv[~df_csv["ID do registro."].isin(df_sheets["ID do registro."])]
+
+    vazia = pd.Series("", index=novos.index)
+    coluna = lambda nome: novos[nome] if nome in novos.columns else vazia
+    data_criacao = coluna("Data de criação")
+    if pd.api.types.is_datetime64_any_dtype(data_criacao):
+        data_criacao = snapshots.data_como_texto(data_criacao)
+    novas_linhas = pd.DataFrame({
+        "ID do registro.": coluna("ID do registro."),
+        "Nome do negócio": coluna("Nome do negócio"),
+        "Etapa do negócio": coluna("Etapa do negócio"),
+        "Data de criação": data_criacao,
+        "Semana de criação": vazia,
+        "Mês de criação": vazia,
+        "status_cadastro": coluna("status_cadastro"),
+        "Momento de Compra": coluna("Momento de Compra"),
+        "Proprietário do negócio": coluna("Proprietário do negócio"),
+        "Horário Comercial": vazia,
+        "Data da primeira chamada": vazia,
+        "Lead Time (min)": vazia,
+    })
+    return limpa_linhas(novas_linhas.iloc[::-1])  # inverter para que o mais recente fique em cima (linha 3)
 
-        # Checa se 2025
-        if "2025" in str(linha_csv["Data de criação"]):
-            novas_linhas.append(clean_row(nova_linha))
+def insere_novos_negocios(worksheet, df_sheets):
+    """
+    Insere os negócios novos no topo da aba e devolve a cópia local da aba com as mesmas linhas
+    aplicadas (lidas como o get_all_records leria), sem baixar a planilha de novo.
+    """
+    novas_linhas = monta_novas_linhas(le_negocios_do_ano(), df_sheets)
 
     if novas_linhas:
-        novas_linhas.reverse()  # inverter para que o mais recente fique em cima (linha 3)
-        worksheet.insert_rows(novas_linhas, 2)  # insere a partir da linha 2
+        EscritorSheets(worksheet).insere_linhas(novas_linhas, 2)  # insere a partir da linha 2
         print(f"✅ Inseridos {len(novas_linhas)} registros de uma vez na ordem correta.")
     else:
         print("Nenhum registro novo para inserir.")
-
-
+        return df_sheets
+
+    colunas = list(df_sheets.columns)
+    novas = pd.DataFrame(
+        [dict(zip(colunas, numericise_all(linha, empty2zero=False, default_blank=""))) for linha in novas_linhas],
+        columns=colunas,
+    ).fillna("")
+    return pd.concat([novas.astype(object), df_sheets.astype(object)], ignore_index=True)
+
+
+
+def aplica_lead_times(df_sheets, df_csv):
+    """
+    Copia lead time e data da primeira chamada do merge para as linhas da planilha com o mesmo ID
+    (junção pelo índice; as demais linhas ficam como estão).
+    """
+    df_sheets["ID do registro."] = normaliza_ids(df_sheets["ID do registro."])
+    df_csv = df_csv.assign(**{"Associated Deal IDs": normaliza_ids(df_csv["Associated Deal IDs"])})
+
+    # Com IDs repetidos no merge vale a última linha, como no dicionário de antes
+    lookup = df_csv.drop_duplicates(subset="Associated Deal IDs", keep="last").set_index("Associated Deal IDs")
+    posicoes = lookup.index.get_indexer(df_sheets["ID do registro."])
+    encontrados = posicoes >= 0
+
+    colunas = {
+        "Lead time (min)": "Lead Time (min)",
+        # "Horário Comercial": "Horário da atividade",
+        "Data da primeira chamada": "Data da atividade",
+    }
+    for coluna_sheets, coluna_csv in colunas.items():
+        if coluna_sheets in df_sheets.columns:
+            df_sheets[coluna_sheets] = df_sheets[coluna_sheets].astype(object)
+        valores = lookup[coluna_csv].to_numpy(dtype=object) if coluna_csv in lookup.columns else np.full(len(lookup), "", dtype=object)
+        df_sheets.loc[encontrados, coluna_sheets] = valores[posicoes[encontrados]]
+    return df_sheets
 
 def atualiza_leadtime(worksheet, df_sheets):
-    df_csv = pd.read_csv(NEGOCIOS_CHAMADAS_CSV_PATH)
-
-    df_sheets["ID do registro."] = df_sheets["ID do registro."].astype(str).str.split('.').str[0]
-    df_csv["Associated Deal IDs"] = df_csv["Associated Deal IDs"].astype(str).str.split('.').str[0]
-
-    lookup = {
-        str(row["Associated Deal IDs"]): {
-            "Lead time (min)": row.get("Lead Time (min)", ""),
-            
-            # "Horário da atividade": row.get("Horário da atividade", ""),
-            "Data da atividade": row.get("Data da atividade", "")
-        }
-        for _, row in df_csv.iterrows()
-    }
+    df_sheets = aplica_lead_times(df_sheets, le_lead_times())
 
-    for idx, row in df_sheets.iterrows():
-        id_ = str(row["ID do registro."]).split('.')[0]
-        if id_ in lookup:
-            info = lookup[id_]
-            df_sheets.at[idx, "Lead time (min)"] = info.get("Lead time (min)", "")
-            # df_sheets.at[idx, "Horário Comercial"] = info.get("Horário da atividade", "")
-            df_sheets.at[idx, "Data da primeira chamada"] = info.get("Data da atividade", "")
+    preenche_horario_comercial(df_sheets)
 
     df_sheets = df_sheets.replace([np.inf, -np.inf], np.nan).fillna('')
     valores = [df_sheets.columns.tolist()] + df_sheets.values.tolist()
-    worksheet.update('A1', valores)
+    sincroniza_planilha(worksheet, valores, intervalos_formulas(len(valores)))
 
     print("Lead time atualizado com sucesso!")
 
@@ -127,74 +206,218 @@ def atualiza_leadtime(worksheet, df_sheets):
     df_sheets.to_csv(NEGOCIOS_CHAMADAS_CSV_PATH, index=False, encoding='utf-8')
     print(f"Arquivo salvo: {NEGOCIOS_CHAMADAS_CSV_PATH}")
 
-def insere_formulas(worksheet):
-    horario_comercial = '''=ARRAYFORMULA(
-            SE(D2:D=""; "";
-                SE(
-                DIA.DA.SEMANA(D2:D; 2) = 7;
-                "Fora do Horário Comercial";
-                SE(
-                    (
-                    (DIA.DA.SEMANA(D2:D; 2) <= 5) * (TEXTO(D2:D;"HH:MM") >= "08:00") * (TEXTO(D2:D;"HH:MM") < "20:00")
-                    ) +
-                    (
-                    (DIA.DA.SEMANA(D2:D; 2) = 6) * (TEXTO(D2:D;"HH:MM") >= "08:00") * (TEXTO(D2:D;"HH:MM") < "18:00")
-                    );
-                    "Dentro do Horário Comercial";
-                    "Fora do Horário Comercial"
-                )
-                )
+def le_planilha_enviada():
+    """
+    Valores enviados na última sincronização (cabeçalho + linhas), ou None se não houver cópia
+    local desta planilha/aba.
+    """
+    try:
+        with open(PLANILHA_ENVIADA_PATH, encoding="utf-8") as f:
+            enviada = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if enviada.get("planilha") != SHEET_NAME or enviada.get("aba") != WORKSHEET_NAME:
+        return None
+    return enviada["valores"]
+
+def salva_planilha_enviada(valores):
+    pasta = os.path.dirname(PLANILHA_ENVIADA_PATH) or "."
+    os.makedirs(pasta, exist_ok=True)
+    fd, caminho_tmp = tempfile.mkstemp(dir=pasta, prefix=".planilha-enviada.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            # Escalares do numpy (np.int64 etc.) viram o número Python correspondente
+            json.dump(
+                {"planilha": SHEET_NAME, "aba": WORKSHEET_NAME, "valores": valores}, f, ensure_ascii=False,
+                default=lambda valor: valor.item() if isinstance(valor, np.generic) else str(valor),
             )
-            )
-            '''
+        os.replace(caminho_tmp, PLANILHA_ENVIADA_PATH)
+    except BaseException:
+        if os.path.exists(caminho_tmp):
+            os.remove(caminho_tmp)
+        raise
+
+def diferencas_planilha(enviados, valores):
+    """
+    Intervalos (formato do batch_update) com as células de `valores` que mudaram em relação ao
+    último envio, casando as linhas por "ID do registro." (as linhas inseridas no topo deslocam as
+    posições, não os IDs), e o total de células alteradas. Retorna None quando a cópia local não
+    corresponde mais à aba (cabeçalho diferente, linhas removidas ou reordenadas fora do pipeline).
+    """
+    if not enviados or enviados[0] != valores[0] or "ID do registro." not in valores[0]:
+        return None
+    coluna_id = valores[0].index("ID do registro.")
+    ids_enviados = [str(linha[coluna_id]) for linha in enviados[1:]]
+    por_id = dict(zip(ids_enviados, enviados[1:]))
+    if len(por_id) != len(ids_enviados):
+        return None
+    if [str(linha[coluna_id]) for linha in valores[1:] if str(linha[coluna_id]) in por_id] != ids_enviados:
+        return None
+
+    formulas = {a1_to_rowcol(f"{coluna}1")[1] - 1 for coluna in COLUNAS_FORMULA}
+    intervalos, celulas = [], 0
+    for numero, linha in enumerate(valores[1:], start=2):
+        anterior = por_id.get(str(linha[coluna_id]))
+        mudaram = [
+            coluna for coluna, valor in enumerate(linha)
+            if coluna not in formulas and (anterior is None or coluna >= len(anterior) or anterior[coluna] != valor)
+        ]
+        celulas += len(mudaram)
+        # Células vizinhas alteradas viram um único intervalo
+        inicio = 0
+        while inicio < len(mudaram):
+            fim = inicio
+            while fim + 1 < len(mudaram) and mudaram[fim + 1] == mudaram[fim] + 1:
+                fim += 1
+            primeira, ultima = mudaram[inicio], mudaram[fim]
+            intervalos.append({
+                "range": f"{rowcol_to_a1(numero, primeira + 1)}:{rowcol_to_a1(numero, ultima + 1)}",
+                "values": [list(linha[primeira:ultima + 1])],
+            })
+            inicio = fim + 1
+    return intervalos, celulas
+
+def celula(valor, formula=False):
+    """
+    Valor de célula do updateCells com a mesma semântica da escrita RAW: números como números,
+    o resto como texto ("" apaga a célula).
+    """
+    if formula:
+        return {"userEnteredValue": {"formulaValue": valor}}
+    if isinstance(valor, (bool, np.bool_)):
+        return {"userEnteredValue": {"boolValue": bool(valor)}}
+    if isinstance(valor, (int, float, np.number)):
+        if pd.isna(valor) or valor in (float("inf"), float("-inf")):
+            return {}
+        return {"userEnteredValue": {"numberValue": valor.item() if isinstance(valor, np.generic) else valor}}
+    if valor is None or valor == "":
+        return {}
+    return {"userEnteredValue": {"stringValue": str(valor)}}
+
+def envia_intervalos(worksheet, intervalos):
+    """
+    Escreve todos os intervalos ({"range": A1, "values": linhas}; sem "values" o intervalo é
+    apagado; com "formula" os valores são fórmulas) numa única chamada spreadsheets.batchUpdate,
+    aplicada na ordem da lista (dividida em lotes pelo EscritorSheets quando passa do tamanho).
+    """
+    requisicoes = []
+    for intervalo in intervalos:
+        grade = a1_range_to_grid_range(intervalo["range"], worksheet.id)
+        if intervalo.get("values") is None:
+            requisicoes.append({"updateCells": {"range": grade, "fields": "userEnteredValue"}})
+            continue
+        linhas = [
+            {"values": [celula(valor, intervalo.get("formula", False)) for valor in linha]}
+            for linha in intervalo["values"]
+        ]
+        inicio = {"sheetId": worksheet.id, "rowIndex": grade["startRowIndex"], "columnIndex": grade["startColumnIndex"]}
+        requisicoes.append({"updateCells": {"start": inicio, "rows": linhas, "fields": "userEnteredValue"}})
+    if requisicoes:
+        EscritorSheets(worksheet).envia(requisicoes)
+
+def sincroniza_planilha(worksheet, valores, extras=()):
+    """
+    Envia `valores` (cabeçalho + linhas, na ordem atual da aba) escrevendo só o que mudou desde o
+    último envio. Sem cópia local, com ela fora de sincronia ou com diff grande demais, reescreve a
+    aba inteira como antes. Os intervalos `extras` (limpeza e fórmulas) vão na mesma requisição,
+    depois dos dados. A cópia local só é atualizada depois que a escrita deu certo.
+    """
+    diff = diferencas_planilha(le_planilha_enviada(), valores)
+    total_celulas = max(1, (len(valores) - 1) * len(valores[0]))
+    if diff is None:
+        intervalos = [{"range": "A1", "values": valores}]
+        mensagem = f"📤 Aba reescrita inteira ({len(valores) - 1} linhas): sem cópia local do último envio compatível."
+    elif diff[1] > LIMITE_DIFF * total_celulas:
+        intervalos = [{"range": "A1", "values": valores}]
+        mensagem = f"📤 Aba reescrita inteira: {diff[1]} células alteradas (acima de {LIMITE_DIFF:.0%})."
+    elif diff[0]:
+        intervalos = diff[0]
+        mensagem = f"📤 {diff[1]} células alteradas enviadas em {len(diff[0])} intervalos."
+    else:
+        intervalos = []
+        mensagem = "📤 Nenhuma célula alterada desde o último envio."
+    envia_intervalos(worksheet, intervalos + list(extras))
+    print(mensagem)
+    salva_planilha_enviada(valores)
+
+def preenche_horario_comercial(df_sheets):
+    """
+    Preenche "Horário Comercial" pela data de criação usando o calendário comercial do pipeline
+    (mesmas regras do lead time, inclusive feriados), no lugar da antiga fórmula da planilha.
+    """
+    if "Data de criação" not in df_sheets.columns:
+        return
 
+    datas = pd.to_datetime(df_sheets["Data de criação"], format="%Y-%m-%d %H:%M", errors="coerce")
+    validas = datas.notna().to_numpy()
+    rotulos = np.full(len(df_sheets), "", dtype=object)
+    if validas.any():
+        datas_validas = datas[validas].to_numpy(dtype="datetime64[m]")
+        dentro = calendario_para(datas_validas).dentro_do_horario(datas_validas)
+        rotulos[validas] = np.where(dentro, "Dentro do Horário Comercial", "Fora do Horário Comercial")
+    df_sheets["Horário Comercial"] = rotulos
+
+def intervalos_formulas(total_linhas):
+    """
+    Limpeza das colunas E/F abaixo da linha 2 e as fórmulas de semana e mês de criação em E2/F2,
+    como intervalos para a mesma requisição dos dados. O total de linhas vem da cópia local da aba
+    (cabeçalho incluído), sem baixar a planilha para contar.
+    """
     mes_criacao = '''=ARRAYFORMULA(SE(D2:D<>""; MÊS(D2:D); ""))'''
 
     semana_criacao = '''=ARRAYFORMULA(SE(D2:D<>""; ISOWEEKNUM(D2:D); ""))'''
 
-    worksheet.update_acell('J2', horario_comercial)
-    worksheet.update_acell('F2', mes_criacao)
-    worksheet.update_acell('E2', semana_criacao)
-
-def limpa_colunas(worksheet):
-    total_linhas = len(worksheet.get_all_values())
-
-    if total_linhas <= 2:
-        return
-
-    intervalo_E = f"E3:E{total_linhas}"
-    intervalo_F = f"F3:F{total_linhas}"
-    intervalo_J = f"J3:J{total_linhas}"
+    intervalos = []
+    if total_linhas > 2:
+        # Limpa (deleta conteúdo) dos intervalos
+        intervalos.append({"range": f"E3:F{total_linhas}"})
+    intervalos.append({"range": "E2:F2", "values": [[semana_criacao, mes_criacao]], "formula": True})
+    return intervalos
 
-    # Limpa (deleta conteúdo) dos intervalos
-    worksheet.batch_clear([intervalo_E, intervalo_F, intervalo_J])
-
-def main():
+def abre_aba():
     gc = autenticar()
     sh = gc.open(SHEET_NAME)
-    worksheet = sh.worksheet(WORKSHEET_NAME)
-
-    # Lê o conteúdo atual da planilha
-    records = worksheet.get_all_records()
-    df_sheets = pd.DataFrame(records)
-
-    # Atualiza negócios
-    insere_novos_negocios(worksheet, df_sheets)
-
-    # 🔁 Recarrega a planilha após inserção
-    time.sleep(2)  # Pequeno delay para garantir que o Google Sheets salve os dados
-    records = worksheet.get_all_records()
-    df_sheets = pd.DataFrame(records)
-
-    # # Atualiza lead time com base na versão mais atual da planilha
+    return sh.worksheet(WORKSHEET_NAME)
+
+def le_aba(worksheet):
+    """
+    Conteúdo atual da aba (única leitura da execução).
+    """
+    with metricas.mede("sheets_leitura", requisicoes=1) as medida:
+        records = worksheet.get_all_records()
+        medida["registros_saida"] = len(records)
+    return pd.DataFrame(records)
+
+@perfil.perfilado("sheets_leitura")
+def prepara_planilha():
+    """
+    Autentica, abre a aba e lê o conteúdo atual: não depende da HubSpot nem do merge, então o
+    orquestrador roda em paralelo com a sincronização.
+    """
+    with metricas.mede("sheets_autenticacao"):
+        worksheet = abre_aba()
+    return worksheet, le_aba(worksheet)
+
+@perfil.perfilado("sheets_escrita")
+def atualiza_planilha(worksheet, df_sheets=None):
+    # Lê o conteúdo atual da planilha, se o orquestrador ainda não leu
+    if df_sheets is None:
+        df_sheets = le_aba(worksheet)
+
+    # Atualiza negócios; a cópia local já volta com as linhas inseridas
+    df_sheets = insere_novos_negocios(worksheet, df_sheets)
+
+    # Lead time, limpeza das colunas de fórmula e fórmulas numa única requisição
     atualiza_leadtime(worksheet, df_sheets)
 
-    # # Formulas
-    time.sleep(1)
-    limpa_colunas(worksheet)
-    insere_formulas(worksheet)
-
     print("✅ Planilha final atualizada com dados de negócios e lead time.")
 
+def main():
+    atualiza_planilha(abre_aba())
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Atualiza a aba do Google Sheets com negócios novos e lead times.")
+    perfil.adiciona_argumentos(parser)
+    args = parser.parse_args()
+    with perfil.sessao(args.perfil, args.perfil_memoria, args.perfil_top):
+        main()
@@ -1,20 +1,154 @@
-from app.api.atualizar_negocios_chamadas import main as atualiza_dados
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from app.api import cliente_hubspot, exportar_para_sheets
+from app.api.atualizar_negocios_chamadas import sincroniza
+from app.services import armazenamento, calendario_comercial, estado_etapas, metricas, perfil
+from app.services import merge_negocios_chamadas
 from app.services.merge_negocios_chamadas import main as merge_dados
-from app.api.exportar_para_sheets import main as atualiza_google_sheets
+from app.api.exportar_para_sheets import atualiza_planilha, prepara_planilha
+
+
+def versoes_banco() -> dict:
+    # Versão de cada tipo no banco local: só muda quando a sincronização altera algum registro
+    conn = armazenamento.conecta()
+    try:
+        return {f"versao_{tipo}": armazenamento.versao(conn, tipo) for tipo in armazenamento.TABELAS}
+    finally:
+        conn.close()
+
+
+def arquivos_merge(versoes: dict):
+    # Entradas: negócios e chamadas do banco (pelas versões) e tabelas do calendário comercial;
+    # saída: negocios-chamadas
+    entradas = [calendario_comercial.CAMINHO_FERIADOS, calendario_comercial.CAMINHO_HORARIOS_ESPECIAIS]
+    return entradas, [merge_negocios_chamadas.CAMINHO_NEGOCIOS_CHAMADAS], dict(versoes)
+
+
+def arquivos_sheets(versoes: dict):
+    # Entrada: os negócios do banco (pela versão). Saídas: a cópia local do último envio (apagá-la
+    # força a reescrita da aba e a execução da etapa) e o negocios-chamadas, que a etapa regrava
+    # com o conteúdo da aba
+    parametros = {
+        "planilha": exportar_para_sheets.SHEET_NAME,
+        "aba": exportar_para_sheets.WORKSHEET_NAME,
+        "ano": exportar_para_sheets.ANO_PLANILHA,
+        "versao_negocios": versoes["versao_negocios"],
+    }
+    saidas = [exportar_para_sheets.PLANILHA_ENVIADA_PATH, exportar_para_sheets.NEGOCIOS_CHAMADAS_CSV_PATH]
+    return [], saidas, parametros
+
+
+def motivo_etapa(estado: dict, nome: str, entradas: list, saidas: list, parametros: dict = None, forcar: bool = False) -> str:
+    if forcar:
+        return "execução forçada (--forcar)"
+    return estado_etapas.motivo_execucao(estado, nome, entradas, saidas, parametros)
+
 
-def executar_pipeline_completo():
+@contextmanager
+def mede_execucao(opcoes: dict):
+    """
+    Zera as métricas no início e, no fim (também quando uma etapa falha), grava uma linha JSON
+    com as métricas da execução e manda o resumo ao Cronitor. Devolve a lista de etapas puladas.
+    """
+    metricas.zera()
+    cliente_hubspot.cliente.zera_metricas()
+    inicio, instante = datetime.now(timezone.utc).isoformat(timespec="seconds"), time.perf_counter()
+    puladas, status = [], "ok"
+    try:
+        yield puladas
+    except BaseException as erro:
+        status = f"erro: {type(erro).__name__}: {erro}"
+        raise
+    finally:
+        registro = metricas.monta_registro(
+            inicio, time.perf_counter() - instante, status, cliente_hubspot.metricas(), opcoes=opcoes, etapas_puladas=puladas,
+        )
+        metricas.grava_execucao(registro)
+        metricas.envia_cronitor(registro)
+        print(f"\n📈 Métricas: {registro['resumo']} → {metricas.CAMINHO_METRICAS}")
+
+
+def executar_pipeline_completo(recuperacao: bool = False, desde: str = None, merge_completo: bool = False, forcar: bool = False):
+    opcoes = {"recuperacao": recuperacao, "desde": desde, "merge_completo": merge_completo, "forcar": forcar}
+    with mede_execucao(opcoes) as puladas:
+        _executa_etapas(puladas, recuperacao, desde, merge_completo, forcar)
+    print("\n✅ Pipeline finalizado com sucesso!")
+
+
+def _executa_etapas(puladas: list, recuperacao: bool, desde: str, merge_completo: bool, forcar: bool):
     print("🚀 Iniciando pipeline completo...")
-    
-    print("\n🔁 1. Atualizando dados...")
-    atualiza_dados()
+    estado = estado_etapas.le_estado()
 
-    print("\n🧱 2. Juntando csvs e calculando leadtime...")
-    merge_dados()
+    # As duas sincronizações com a HubSpot (cliente e limitador compartilhados) e a autenticação +
+    # leitura da aba do Sheets (que não depende delas) rodam em paralelo. Com os CSVs novos já
+    # gravadas no banco, decide o que roda; se o Sheets for pulado, a aba lida é descartada.
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        print("\n🔁 1. Atualizando dados (negócios e chamadas em paralelo, Sheets autenticando e lendo a aba)...")
+        negocios = executor.submit(sincroniza, "negocios", recuperacao, desde)
+        chamadas = executor.submit(sincroniza, "chamadas", recuperacao, desde)
+        planilha = executor.submit(prepara_planilha)
+        with metricas.mede("pipeline_sincronizacao"):
+            negocios.result()
+            chamadas.result()
+
+        # O Sheets lê o negocios-chamadas do merge e depois o regrava com o conteúdo da aba: as duas
+        # etapas rodam juntas (o merge refaz o arquivo que o Sheets vai ler e o Sheets envia o que o
+        # merge mudou)
+        versoes = versoes_banco()
+        entradas_merge, saidas_merge, parametros_merge = arquivos_merge(versoes)
+        entradas_sheets, saidas_sheets, parametros = arquivos_sheets(versoes)
+        motivo_merge = motivo_etapa(estado, "merge", entradas_merge, saidas_merge, parametros_merge, forcar)
+        motivo_sheets = motivo_etapa(estado, "sheets", entradas_sheets, saidas_sheets, parametros, forcar)
+        if merge_completo:
+            motivo_merge = "modo completo (--merge-completo)"
+        if motivo_sheets and not motivo_merge:
+            motivo_merge = f"o Sheets vai rodar ({motivo_sheets}) e lê o negocios-chamadas do merge"
+        if motivo_merge and not motivo_sheets:
+            motivo_sheets = "negocios-chamadas refeito pelo merge"
+
+        print("\n🧱 2. Juntando csvs e calculando leadtime...")
+        if motivo_merge:
+            print(f"▶️  Merge executado: {motivo_merge}.")
+            # Sem o registro do Sheets, uma falha no envio faz a próxima execução rodar as duas etapas
+            estado["etapas"].pop("sheets", None)
+            with metricas.mede("pipeline_merge"):
+                merge_dados(completo=merge_completo)
+            estado_etapas.registra_execucao(estado, "merge", entradas_merge, saidas_merge, parametros_merge)
+        else:
+            puladas.append("merge")
+            print("⏭️  Merge pulado: negócios e chamadas do banco e calendário iguais aos da última execução.")
+
+        worksheet = df_sheets = None
+        if motivo_sheets:
+            worksheet, df_sheets = planilha.result()
+        elif planilha.exception() is not None:
+            erro = planilha.exception()
+            print(f"⚠️  Leitura da aba do Sheets falhou ({type(erro).__name__}: {erro}); ignorada, o Sheets foi pulado.")
 
     print("\n📊 3. Atualizando Sheets...")
-    atualiza_google_sheets()
+    if motivo_sheets:
+        print(f"▶️  Sheets executado: {motivo_sheets}.")
+        with metricas.mede("pipeline_sheets"):
+            atualiza_planilha(worksheet, df_sheets)
+        estado_etapas.registra_execucao(estado, "sheets", entradas_sheets, saidas_sheets, parametros)
+    else:
+        puladas.append("sheets")
+        print("⏭️  Sheets pulado: negócios e lead times iguais aos do último envio.")
 
-    print("\n✅ Pipeline finalizado com sucesso!")
+    if puladas:
+        print(f"\n📋 Etapas puladas (entradas sem mudança): {', '.join(puladas)}. Use --forcar para executar tudo.")
 
 if __name__ == "__main__":
-    executar_pipeline_completo()
+    parser = argparse.ArgumentParser(description="Executa o pipeline HubSpot → CSV → Google Sheets.")
+    parser.add_argument("--recuperacao", action="store_true", help="Busca a janela larga de dias, ou desde o cursor se ele for mais antigo.")
+    parser.add_argument("--desde", help="Backfill a partir desta data (YYYY-MM-DD), com busca fatiada em paralelo.")
+    parser.add_argument("--merge-completo", action="store_true", help="Recalcula primeiras chamadas e lead time de todo o histórico.")
+    parser.add_argument("--forcar", "--force", dest="forcar", action="store_true", help="Executa merge e Sheets mesmo sem mudança nas entradas.")
+    perfil.adiciona_argumentos(parser)
+    args = parser.parse_args()
+    with perfil.sessao(args.perfil, args.perfil_memoria, args.perfil_top):
+        executar_pipeline_completo(recuperacao=args.recuperacao, desde=args.desde, merge_completo=args.merge_completo, forcar=args.forcar)
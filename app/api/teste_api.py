@@ -1,14 +1,12 @@
 from fastapi import FastAPI, Query
 from datetime import datetime, timezone
-import requests
-import os
-from dotenv import load_dotenv
+
+from app.api import cliente_hubspot
+from app.api.cliente_hubspot import HUBSPOT_BASE_URL
 
 app = FastAPI() 
 
-load_dotenv()
-API_KEY = os.getenv("HUBSPOT_API_KEY")
-HUBSPOT_URL = "https://api.hubapi.com/crm/v3/objects/deals"
+HUBSPOT_URL = f"{HUBSPOT_BASE_URL}/crm/v3/objects/deals"
 
 @app.get("/hubspot/deals")
 def get_deals(
@@ -20,7 +18,6 @@ def get_deals(
     except ValueError:
         return {"error": "Formato de data inválido. Use YYYY-MM-DD"}
 
-    headers = {"Authorization": f"Bearer {API_KEY}"}
     params = {
         "limit": 100,
         "properties": [
@@ -61,7 +58,7 @@ def get_deals(
         if next_after:
             params["after"] = next_after
 
-        response = requests.get(HUBSPOT_URL, headers=headers, params=params)
+        response = cliente_hubspot.get(HUBSPOT_URL, params=params)
         if not response.ok:
             return {"error": "Erro na API HubSpot", "detalhes": response.text}
 
@@ -0,0 +1,583 @@
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import tempfile
+import uuid
+from datetime import datetime
+
+# Banco local com os registros sincronizados da HubSpot (um registro por ID, linha completa em JSON)
+CAMINHO_BANCO = "data/atualizado/hubspot.sqlite3"
+CAMINHO_NEGOCIOS = "data/atualizado/negocios.csv"
+CAMINHO_CHAMADAS = "data/atualizado/chamadas.csv"
+CAMINHO_CHAMADAS_RESUMO = "data/atualizado/chamadas-resumo.csv"
+
+# Negócios e chamadas sincronizam em paralelo no mesmo banco: quem encontra o banco travado pela
+# transação (uma página) da outra sincronização espera até este limite, em segundos
+TIMEOUT_BANCO = 60
+
+# Colunas do CSV usadas como chave e como índices secundários em cada tabela. Colunas "frias"
+# (texto livre grande) ficam numa tabela à parte ({tipo}_corpos) e só voltam no CSV completo; o
+# "resumo" é o CSV estreito que a ingestão gera para os estágios seguintes.
+TABELAS = {
+    "negocios": {
+        "id": "ID do registro.",
+        "data": "Data de criação",
+        "proprietario": "Proprietário do negócio",
+        "negocio": "ID do registro.",
+        "csv": CAMINHO_NEGOCIOS,
+        "frias": [],
+    },
+    "chamadas": {
+        "id": "ID do objeto",
+        "data": "Data da atividade",
+        "proprietario": "Atividade atribuída a",
+        "negocio": "Associated Deal IDs",
+        "csv": CAMINHO_CHAMADAS,
+        "frias": ["Observações de chamada"],
+        "resumo": CAMINHO_CHAMADAS_RESUMO,
+        "colunas_resumo": [
+            "ID do objeto",
+            "Associated Deal IDs",
+            "Associated Deal",
+            "Data da atividade",
+            "Atividade atribuída a",
+            "Resultado da chamada",
+            "Duração da chamada (HH:mm:ss)",
+        ],
+    },
+}
+
+
+# Índice da primeira chamada de cada negócio, mantido pelo upsert das chamadas. A regra é a do
+# merge: menor "Data da atividade" (vazia ou inválida por último) e, no empate, menor ID da
+# chamada. Chamadas sem negócio ficam agrupadas na chave "". Se a regra mudar, o índice é refeito.
+# A data normalizada (data_chave) é gravada junto com a linha e a ordem inteira é coberta pelo
+# índice idx_chamadas_primeira: achar a primeira chamada de um negócio é uma busca no índice.
+ORDEM_PRIMEIRA_CHAMADA = "data_chave IS NULL, data_chave, CAST(id AS INTEGER), id"
+FORMATO_DATA = "%Y-%m-%d %H:%M"
+
+
+def particao_de(valor) -> str:
+    """
+    Mês (AAAA-MM) da data no formato do CSV, ou "" se ela for vazia ou inválida: a partição ano/mês
+    do snapshot Parquet em que a linha fica.
+    """
+    chave = chave_data(valor)
+    return chave[:7] if chave else ""
+
+
+def chave_data(valor):
+    """
+    Data da atividade normalizada para ordenação (AAAA-MM-DD HH:MM), ou None se não for uma data
+    válida no formato do CSV, como o pd.to_datetime(..., errors="coerce") do merge.
+    """
+    try:
+        return datetime.strptime(valor, FORMATO_DATA).strftime(FORMATO_DATA)
+    except (TypeError, ValueError):
+        return None
+
+
+def conecta(caminho_banco: str = None) -> sqlite3.Connection:
+    """
+    Abre (e cria, se preciso) o banco com uma tabela por tipo e índices em data, proprietário e negócio.
+    """
+    caminho_banco = caminho_banco or CAMINHO_BANCO
+    os.makedirs(os.path.dirname(caminho_banco) or ".", exist_ok=True)
+    conn = sqlite3.connect(caminho_banco, timeout=TIMEOUT_BANCO)
+    conn.create_function("chave_data", 1, chave_data, deterministic=True)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS colunas (
+            tipo TEXT NOT NULL,
+            posicao INTEGER NOT NULL,
+            nome TEXT NOT NULL,
+            PRIMARY KEY (tipo, posicao)
+        )
+    """)
+    for tipo in TABELAS:
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {tipo} (
+                id TEXT PRIMARY KEY,
+                ordem INTEGER NOT NULL,
+                data TEXT,
+                data_chave TEXT,
+                proprietario TEXT,
+                negocio_id TEXT,
+                dados TEXT NOT NULL
+            )
+        """)
+        _adiciona_data_chave(conn, tipo)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{tipo}_ordem ON {tipo}(ordem)")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{tipo}_data ON {tipo}(data)")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{tipo}_data_chave ON {tipo}(data_chave)")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{tipo}_proprietario ON {tipo}(proprietario)")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{tipo}_negocio ON {tipo}(negocio_id)")
+        if TABELAS[tipo]["frias"]:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {tipo}_corpos (
+                    id TEXT PRIMARY KEY,
+                    dados TEXT NOT NULL
+                )
+            """)
+
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_chamadas_primeira ON chamadas(negocio_id, {ORDEM_PRIMEIRA_CHAMADA})")
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS metadados (
+            chave TEXT PRIMARY KEY,
+            valor TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS primeira_chamada (
+            negocio_id TEXT PRIMARY KEY,
+            chamada_id TEXT NOT NULL,
+            ordem INTEGER NOT NULL,
+            data TEXT,
+            proprietario TEXT,
+            titulo TEXT
+        )
+    """)
+    # Meses (AAAA-MM de data_chave, "" = data vazia ou inválida) com registros alterados desde a
+    # última atualização do snapshot Parquet do tipo; gravados na mesma transação do upsert
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS particoes_pendentes (
+            tipo TEXT NOT NULL,
+            particao TEXT NOT NULL,
+            PRIMARY KEY (tipo, particao)
+        )
+    """)
+    # Lead time já calculado por par (data de criação, data da primeira chamada); "" = data vazia
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS memo_lead_time (
+            data_criacao TEXT NOT NULL,
+            data_atividade TEXT NOT NULL,
+            horario TEXT,
+            lead_time TEXT,
+            lead_time_min,
+            PRIMARY KEY (data_criacao, data_atividade)
+        )
+    """)
+    conn.commit()
+    separa_colunas_frias(conn)
+    return conn
+
+
+def _adiciona_data_chave(conn: sqlite3.Connection, tipo: str):
+    """
+    Bancos criados antes da coluna data_chave: acrescenta e preenche a partir da data (uma vez).
+    """
+    if "data_chave" in [coluna[1] for coluna in conn.execute(f"PRAGMA table_info({tipo})")]:
+        return
+    conn.execute(f"ALTER TABLE {tipo} ADD COLUMN data_chave TEXT")
+    conn.execute(f"UPDATE {tipo} SET data_chave = chave_data(data)")
+
+
+def separa_colunas_frias(conn: sqlite3.Connection):
+    """
+    Migra bancos antigos, com as colunas frias dentro do JSON da linha, para a tabela {tipo}_corpos.
+    Roda uma vez por configuração de TABELAS (registrada em metadados).
+    """
+    configuracao = json.dumps({tipo: config["frias"] for tipo, config in TABELAS.items()}, ensure_ascii=False)
+    registrada = conn.execute("SELECT valor FROM metadados WHERE chave = 'colunas_frias'").fetchone()
+    if registrada and registrada[0] == configuracao:
+        return
+
+    for tipo, config in TABELAS.items():
+        if not config["frias"]:
+            continue
+        caminhos = [f'$."{coluna}"' for coluna in config["frias"]]
+        pares = ", ".join(f"'{coluna}', json_extract(dados, '{caminho}')" for coluna, caminho in zip(config["frias"], caminhos))
+        presente = " OR ".join(f"json_type(dados, '{caminho}') IS NOT NULL" for caminho in caminhos)
+        conn.execute(f"""
+            INSERT INTO {tipo}_corpos (id, dados)
+            SELECT id, json_object({pares}) FROM {tipo} WHERE {presente}
+            ON CONFLICT(id) DO UPDATE SET dados = json_patch({tipo}_corpos.dados, excluded.dados)
+        """)
+        remover = ", ".join(f"'{caminho}'" for caminho in caminhos)
+        conn.execute(f"UPDATE {tipo} SET dados = json_remove(dados, {remover}) WHERE {presente}")
+
+    conn.execute("INSERT OR REPLACE INTO metadados (chave, valor) VALUES ('colunas_frias', ?)", (configuracao,))
+    conn.commit()
+
+
+def _separa_linha(tipo: str, linha: dict) -> tuple:
+    """
+    (campos quentes, campos frios) de uma linha do CSV.
+    """
+    frias = TABELAS[tipo]["frias"]
+    if not frias:
+        return linha, {}
+    quente = {coluna: valor for coluna, valor in linha.items() if coluna not in frias}
+    fria = {coluna: linha[coluna] for coluna in frias if coluna in linha}
+    return quente, fria
+
+
+def _grava_frios(conn: sqlite3.Connection, tipo: str, hs_id: str, fria: dict):
+    if fria:
+        conn.execute(
+            f"""
+            INSERT INTO {tipo}_corpos (id, dados) VALUES (?, ?)
+            ON CONFLICT(id) DO UPDATE SET dados = json_patch({tipo}_corpos.dados, excluded.dados)
+            """,
+            (hs_id, json.dumps(fria, ensure_ascii=False)),
+        )
+
+
+def le_colunas(conn: sqlite3.Connection, tipo: str) -> list:
+    return [nome for (nome,) in conn.execute("SELECT nome FROM colunas WHERE tipo = ? ORDER BY posicao", (tipo,))]
+
+
+def adiciona_colunas(conn: sqlite3.Connection, tipo: str, novas: list):
+    atuais = le_colunas(conn, tipo)
+    for nome in novas:
+        if nome not in atuais:
+            conn.execute("INSERT INTO colunas (tipo, posicao, nome) VALUES (?, ?, ?)", (tipo, len(atuais), nome))
+            atuais.append(nome)
+
+
+def _valores_indexados(tipo: str, linha: dict) -> tuple:
+    """
+    (data, data_chave, proprietario, negocio_id) da linha, na ordem das colunas do banco.
+    """
+    config = TABELAS[tipo]
+    data = linha.get(config["data"]) or None
+    return (data, chave_data(data), linha.get(config["proprietario"]) or None, linha.get(config["negocio"]) or None)
+
+
+def versao(conn: sqlite3.Connection, tipo: str) -> str:
+    """
+    Marca do conteúdo atual do tipo ("" se nada foi gravado ainda): muda a cada upsert ou
+    importação que altera alguma linha, e só nesses casos. Os estágios seguintes a usam para saber
+    se o que leram (ou o snapshot) continua valendo.
+    """
+    linha = conn.execute("SELECT valor FROM metadados WHERE chave = ?", (f"versao_{tipo}",)).fetchone()
+    return linha[0] if linha else ""
+
+
+def _nova_versao(conn: sqlite3.Connection, tipo: str):
+    conn.execute("INSERT OR REPLACE INTO metadados (chave, valor) VALUES (?, ?)", (f"versao_{tipo}", uuid.uuid4().hex))
+
+
+def esta_vazio(conn: sqlite3.Connection, tabela: str) -> bool:
+    return conn.execute(f"SELECT 1 FROM {tabela} LIMIT 1").fetchone() is None
+
+
+def importa_csv(conn: sqlite3.Connection, tipo: str, caminho_csv: str) -> int:
+    """
+    Carrega um CSV legado no banco (uma vez), preservando a ordem das linhas e das colunas.
+    """
+    if not os.path.exists(caminho_csv):
+        return 0
+
+    id_coluna = TABELAS[tipo]["id"]
+    print(f"📂 Importando {caminho_csv} para o banco local...")
+    total = 0
+    with open(caminho_csv, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        adiciona_colunas(conn, tipo, list(reader.fieldnames or []))
+        for ordem, row in enumerate(reader):
+            row.pop(None, None)
+            quente, fria = _separa_linha(tipo, row)
+            conn.execute(
+                f"""
+                INSERT INTO {tipo} (id, ordem, data, data_chave, proprietario, negocio_id, dados) VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET data = excluded.data, data_chave = excluded.data_chave,
+                    proprietario = excluded.proprietario, negocio_id = excluded.negocio_id, dados = excluded.dados
+                """,
+                (row.get(id_coluna), ordem, *_valores_indexados(tipo, quente), json.dumps(quente, ensure_ascii=False)),
+            )
+            _grava_frios(conn, tipo, row.get(id_coluna), fria)
+            total += 1
+    _nova_versao(conn, tipo)
+    conn.commit()
+    print(f"✅ {total} registros importados.")
+    return total
+
+
+def upsert(conn: sqlite3.Connection, tipo: str, linhas: list) -> tuple:
+    """
+    Insere ou atualiza as linhas pelo ID. Registros existentes recebem os campos novos por cima
+    dos antigos (como dict.update); registros novos entram antes de todos os outros na ordem de
+    exportação. Custo proporcional ao número de linhas recebidas. As colunas frias vão para a
+    tabela {tipo}_corpos, com a mesma regra. Para chamadas, também atualiza o índice de primeiras
+    chamadas dos negócios afetados. Linha reenviada sem mudança (a sobreposição do cursor) não é
+    regravada; se alguma mudou, a versão do tipo muda e os meses (antigo e novo) das linhas
+    alteradas ficam pendentes para o snapshot Parquet. Linhas sem ID não têm como ser atualizadas
+    depois e são descartadas (o total aparece num aviso). Retorna (novos, atualizados).
+    """
+    if not linhas:
+        return 0, 0
+
+    id_coluna = TABELAS[tipo]["id"]
+    ids = [linha.get(id_coluna) for linha in linhas]
+    existentes = {}
+    for inicio in range(0, len(ids), 500):
+        lote = ids[inicio:inicio + 500]
+        marcadores = ",".join("?" * len(lote))
+        for hs_id, dados in conn.execute(f"SELECT id, dados FROM {tipo} WHERE id IN ({marcadores})", lote):
+            existentes[hs_id] = json.loads(dados)
+
+    menor_ordem = conn.execute(f"SELECT MIN(ordem) FROM {tipo}").fetchone()[0] or 0
+    coluna_negocio = TABELAS[tipo]["negocio"]
+    coluna_data = TABELAS[tipo]["data"]
+    negocios_afetados = set()
+    particoes = set()
+    novos = atualizados = sem_id = 0
+    for hs_id, linha in zip(ids, linhas):
+        if hs_id is None:
+            sem_id += 1
+            continue
+
+        linha, fria = _separa_linha(tipo, linha)
+        _grava_frios(conn, tipo, hs_id, fria)
+        if hs_id in existentes:
+            atualizados += 1
+            linha_final = {**existentes[hs_id], **linha}
+            if linha_final == existentes[hs_id]:
+                continue
+            negocios_afetados.add(existentes[hs_id].get(coluna_negocio) or "")
+            particoes.add(particao_de(existentes[hs_id].get(coluna_data)))
+            existentes[hs_id] = linha_final
+            conn.execute(
+                f"UPDATE {tipo} SET data = ?, data_chave = ?, proprietario = ?, negocio_id = ?, dados = ? WHERE id = ?",
+                (*_valores_indexados(tipo, linha_final), json.dumps(linha_final, ensure_ascii=False), hs_id),
+            )
+        else:
+            menor_ordem -= 1
+            linha_final = dict(linha)
+            existentes[hs_id] = linha_final
+            conn.execute(
+                f"INSERT INTO {tipo} (id, ordem, data, data_chave, proprietario, negocio_id, dados) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (hs_id, menor_ordem, *_valores_indexados(tipo, linha_final), json.dumps(linha_final, ensure_ascii=False)),
+            )
+            novos += 1
+        negocios_afetados.add(linha_final.get(coluna_negocio) or "")
+        particoes.add(particao_de(linha_final.get(coluna_data)))
+
+    if sem_id:
+        print(f"⚠️  {sem_id} registro(s) de {tipo} sem ID descartado(s).")
+    if particoes:
+        _nova_versao(conn, tipo)
+    conn.executemany("INSERT OR IGNORE INTO particoes_pendentes (tipo, particao) VALUES (?, ?)", [(tipo, particao) for particao in particoes])
+    if tipo == "chamadas" and not garante_primeiras_chamadas(conn):
+        atualiza_primeiras_chamadas(conn, negocios_afetados)
+
+    return novos, atualizados
+
+
+def atualiza_primeiras_chamadas(conn: sqlite3.Connection, negocio_ids) -> int:
+    """
+    Recalcula a primeira chamada só dos negócios informados (os das chamadas novas ou alteradas,
+    inclusive o negócio antigo de uma chamada que mudou de negócio). Retorna quantos mudaram.
+    """
+    alterados = 0
+    for negocio_id in negocio_ids:
+        filtro, parametros = ("negocio_id IS NULL", ()) if negocio_id == "" else ("negocio_id = ?", (negocio_id,))
+        chamada = conn.execute(
+            f"SELECT id, ordem, data, proprietario, dados FROM chamadas WHERE {filtro} ORDER BY {ORDEM_PRIMEIRA_CHAMADA} LIMIT 1",
+            parametros,
+        ).fetchone()
+        atual = conn.execute(
+            "SELECT chamada_id, ordem, data, proprietario, titulo FROM primeira_chamada WHERE negocio_id = ?", (negocio_id,)
+        ).fetchone()
+
+        if chamada is None:
+            if atual is not None:
+                conn.execute("DELETE FROM primeira_chamada WHERE negocio_id = ?", (negocio_id,))
+                alterados += 1
+            continue
+
+        chamada_id, ordem, data, proprietario, dados = chamada
+        nova = (chamada_id, ordem, data, proprietario, json.loads(dados).get("Associated Deal"))
+        if nova != atual:
+            conn.execute(
+                "INSERT OR REPLACE INTO primeira_chamada (negocio_id, chamada_id, ordem, data, proprietario, titulo) VALUES (?, ?, ?, ?, ?, ?)",
+                (negocio_id, *nova),
+            )
+            alterados += 1
+    return alterados
+
+
+def reconstroi_primeiras_chamadas(conn: sqlite3.Connection) -> int:
+    """
+    Refaz o índice inteiro a partir da tabela de chamadas (uma passada com window function).
+    """
+    conn.execute("DELETE FROM primeira_chamada")
+    conn.execute(f"""
+        INSERT INTO primeira_chamada (negocio_id, chamada_id, ordem, data, proprietario, titulo)
+        SELECT COALESCE(negocio_id, ''), id, ordem, data, proprietario, json_extract(dados, '$."Associated Deal"')
+        FROM (
+            SELECT *, ROW_NUMBER() OVER (PARTITION BY negocio_id ORDER BY {ORDEM_PRIMEIRA_CHAMADA}) AS posicao
+            FROM chamadas
+        )
+        WHERE posicao = 1
+    """)
+    conn.execute(
+        "INSERT OR REPLACE INTO metadados (chave, valor) VALUES ('regra_primeira_chamada', ?)", (ORDEM_PRIMEIRA_CHAMADA,)
+    )
+    conn.commit()
+    return conn.execute("SELECT COUNT(*) FROM primeira_chamada").fetchone()[0]
+
+
+def garante_primeiras_chamadas(conn: sqlite3.Connection) -> bool:
+    """
+    Monta o índice na primeira vez (banco criado antes do índice ou recém-importado do CSV) ou
+    quando a regra de seleção mudou. Retorna True se reconstruiu.
+    """
+    regra = conn.execute("SELECT valor FROM metadados WHERE chave = 'regra_primeira_chamada'").fetchone()
+    desatualizado = regra is None or regra[0] != ORDEM_PRIMEIRA_CHAMADA
+    if esta_vazio(conn, "chamadas") or not (desatualizado or esta_vazio(conn, "primeira_chamada")):
+        return False
+    total = reconstroi_primeiras_chamadas(conn)
+    print(f"🗂️  Índice de primeiras chamadas montado com {total} negócios.")
+    return True
+
+
+def le_primeiras_chamadas(conn: sqlite3.Connection) -> list:
+    """
+    (negocio_id, titulo, data, proprietario) de cada negócio, ordenado pelo ID do negócio (sem
+    negócio por último), como o groupby do merge a partir do CSV.
+    """
+    return conn.execute(
+        "SELECT negocio_id, titulo, data, proprietario FROM primeira_chamada ORDER BY negocio_id = '', CAST(negocio_id AS INTEGER), negocio_id"
+    ).fetchall()
+
+
+def le_memo_lead_time(conn: sqlite3.Connection) -> dict:
+    return {
+        (data_criacao, data_atividade): (horario, lead_time, lead_time_min)
+        for data_criacao, data_atividade, horario, lead_time, lead_time_min in conn.execute("SELECT * FROM memo_lead_time")
+    }
+
+
+def garante_memo_lead_time(conn: sqlite3.Connection, assinatura: str) -> bool:
+    """
+    Descarta o memo quando o calendário comercial (assinatura registrada em metadados) mudou desde
+    que ele foi calculado, como o índice de primeiras chamadas quando a regra muda. Retorna True se descartou.
+    """
+    registrada = conn.execute("SELECT valor FROM metadados WHERE chave = 'calendario_lead_time'").fetchone()
+    if registrada is not None and registrada[0] == assinatura:
+        return False
+    conn.execute("DELETE FROM memo_lead_time")
+    conn.execute("INSERT OR REPLACE INTO metadados (chave, valor) VALUES ('calendario_lead_time', ?)", (assinatura,))
+    conn.commit()
+    return registrada is not None
+
+
+def salva_memo_lead_time(conn: sqlite3.Connection, memo: dict, limpar: bool = False, removidos=()):
+    """
+    Grava os pares novos do memo e apaga os removidos (que nenhum negócio usa mais), para o memo
+    não crescer além dos pares em uso.
+    """
+    if limpar:
+        conn.execute("DELETE FROM memo_lead_time")
+    conn.executemany("DELETE FROM memo_lead_time WHERE data_criacao = ? AND data_atividade = ?", list(removidos))
+    conn.executemany(
+        "INSERT OR REPLACE INTO memo_lead_time VALUES (?, ?, ?, ?, ?)",
+        [(*chave, *valores) for chave, valores in memo.items()],
+    )
+    conn.commit()
+
+
+def itera_linhas(conn: sqlite3.Connection, tipo: str, colunas: list, particao: str = None):
+    """
+    Valores de cada linha nas colunas pedidas (vazio = ""), na ordem de exportação (mais recentes
+    primeiro), lendo o banco em streaming. Com `particao` (AAAA-MM ou AAAA, ou "" para data
+    vazia), só as linhas daquele mês ou ano, pelo índice de data_chave. A tabela {tipo}_corpos só é lida se alguma
+    coluna fria for pedida.
+    """
+    if any(coluna in colunas for coluna in TABELAS[tipo]["frias"]):
+        consulta = f"SELECT t.dados, c.dados FROM {tipo} t LEFT JOIN {tipo}_corpos c ON c.id = t.id"
+    else:
+        consulta = f"SELECT t.dados, NULL FROM {tipo} t"
+    parametros = ()
+    if particao == "":
+        consulta += " WHERE t.data_chave IS NULL"
+    elif particao is not None:
+        consulta += " WHERE t.data_chave >= ? AND t.data_chave < ?"
+        parametros = (particao, particao + "~")  # "~" vem depois de "-mm-dd hh:mm" na ordenação
+    for dados, corpo in conn.execute(consulta + " ORDER BY t.ordem", parametros):
+        row = json.loads(dados)
+        if corpo:
+            row.update(json.loads(corpo))
+        yield [str(row.get(col, "") or "") for col in colunas]
+
+
+def particoes(conn: sqlite3.Connection, tipo: str) -> list:
+    """
+    Meses (AAAA-MM, "" = data vazia ou inválida) com pelo menos uma linha do tipo.
+    """
+    return [linha[0] for linha in conn.execute(f"SELECT DISTINCT COALESCE(substr(data_chave, 1, 7), '') FROM {tipo}")]
+
+
+def le_particoes_pendentes(conn: sqlite3.Connection, tipo: str) -> list:
+    return [linha[0] for linha in conn.execute("SELECT particao FROM particoes_pendentes WHERE tipo = ? ORDER BY particao", (tipo,))]
+
+
+def limpa_particoes_pendentes(conn: sqlite3.Connection, tipo: str, particoes_feitas: list):
+    conn.executemany("DELETE FROM particoes_pendentes WHERE tipo = ? AND particao = ?", [(tipo, particao) for particao in particoes_feitas])
+    conn.commit()
+
+
+def exporta_csv(conn: sqlite3.Connection, tipo: str, caminho_csv: str = None, colunas: list = None):
+    """
+    Gera o CSV no formato legado (QUOTE_ALL, mais recentes no topo) lendo o banco em streaming.
+    Sem `colunas`, é o CSV completo, com as colunas frias de volta. A escrita é atômica: arquivo
+    temporário na mesma pasta + rename. Retorna o número de linhas gravadas.
+    """
+    caminho_csv = caminho_csv or TABELAS[tipo]["csv"]
+    colunas = colunas or le_colunas(conn, tipo)
+
+    print(f"\n💾 Exportando {tipo} para: {caminho_csv}...")
+    pasta = os.path.dirname(caminho_csv) or "."
+    os.makedirs(pasta, exist_ok=True)
+    fd, caminho_tmp = tempfile.mkstemp(dir=pasta, suffix=".csv.tmp")
+    linhas = 0
+    try:
+        with os.fdopen(fd, "w", newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+            writer.writerow(colunas)
+            for valores in itera_linhas(conn, tipo, colunas):
+                writer.writerow(valores)
+                linhas += 1
+        os.replace(caminho_tmp, caminho_csv)
+    except BaseException:
+        os.remove(caminho_tmp)
+        raise
+    print("✅ CSV salvo com sucesso!\n")
+    return linhas
+
+
+def exporta_resumo(conn: sqlite3.Connection, tipo: str, caminho_csv: str = None):
+    """
+    Gera o CSV estreito do tipo (só as colunas de "colunas_resumo", sem ler a tabela de corpos).
+    """
+    config = TABELAS[tipo]
+    return exporta_csv(conn, tipo, caminho_csv or config["resumo"], colunas=config["colunas_resumo"])
+
+
+def main(tipos: list = None, resumo: bool = False):
+    conn = conecta()
+    for tipo in tipos or list(TABELAS):
+        if resumo:
+            if "resumo" in TABELAS[tipo]:
+                exporta_resumo(conn, tipo)
+        else:
+            exporta_csv(conn, tipo)
+    conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta os registros do banco local para os CSVs legados (completos, com as colunas frias).")
+    parser.add_argument("tipos", nargs="*", help=f"Tipos a exportar: {', '.join(TABELAS)} (padrão: todos).")
+    parser.add_argument("--resumo", action="store_true", help="Gera só os CSVs estreitos usados pelo merge.")
+    args = parser.parse_args()
+    invalidos = [tipo for tipo in args.tipos if tipo not in TABELAS]
+    if invalidos:
+        parser.error(f"tipo inválido: {', '.join(invalidos)}")
+    main(args.tipos, args.resumo)
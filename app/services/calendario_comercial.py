@@ -0,0 +1,242 @@
+import csv
+import hashlib
+import json
+import os
+from datetime import date, timedelta
+from functools import lru_cache
+
+import numpy as np
+
+# Horário comercial padrão por dia da semana (segunda = 0 ... domingo = 6); dia ausente = fechado
+HORARIO_PADRAO = {
+    0: [("08:00", "20:00")],
+    1: [("08:00", "20:00")],
+    2: [("08:00", "20:00")],
+    3: [("08:00", "20:00")],
+    4: [("08:00", "20:00")],
+    5: [("08:00", "18:00")],
+}
+
+# Tabelas opcionais: feriados extras (data,nome) e horários especiais (data,abertura,fechamento)
+CAMINHO_FERIADOS = "data/config/feriados.csv"
+CAMINHO_HORARIOS_ESPECIAIS = "data/config/horarios_especiais.csv"
+
+MINUTOS_DIA = 1440
+
+
+def pascoa(ano: int) -> date:
+    """
+    Domingo de Páscoa (algoritmo de Meeus/Jones/Butcher para o calendário gregoriano).
+    """
+    a = ano % 19
+    b, c = divmod(ano, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(ano, mes, dia + 1)
+
+
+def feriados_nacionais(ano: int, incluir_facultativos: bool = False) -> dict:
+    """
+    Feriados nacionais do Brasil no ano. Com incluir_facultativos, adiciona Carnaval e Corpus Christi.
+    """
+    domingo_pascoa = pascoa(ano)
+    feriados = {
+        date(ano, 1, 1): "Confraternização Universal",
+        domingo_pascoa - timedelta(days=2): "Sexta-feira Santa",
+        date(ano, 4, 21): "Tiradentes",
+        date(ano, 5, 1): "Dia do Trabalho",
+        date(ano, 9, 7): "Independência do Brasil",
+        date(ano, 10, 12): "Nossa Senhora Aparecida",
+        date(ano, 11, 2): "Finados",
+        date(ano, 11, 15): "Proclamação da República",
+        date(ano, 12, 25): "Natal",
+    }
+    if ano >= 2024:
+        feriados[date(ano, 11, 20)] = "Dia Nacional de Zumbi e da Consciência Negra"
+    if incluir_facultativos:
+        feriados[domingo_pascoa - timedelta(days=48)] = "Carnaval"
+        feriados[domingo_pascoa - timedelta(days=47)] = "Carnaval"
+        feriados[domingo_pascoa + timedelta(days=60)] = "Corpus Christi"
+    return feriados
+
+
+def carrega_feriados_csv(caminho: str = CAMINHO_FERIADOS) -> dict:
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, newline='', encoding='utf-8') as f:
+        return {date.fromisoformat(row["data"]): row.get("nome", "") for row in csv.DictReader(f)}
+
+
+def carrega_horarios_especiais_csv(caminho: str = CAMINHO_HORARIOS_ESPECIAIS) -> dict:
+    """
+    Cada linha (data, abertura, fechamento) abre um intervalo no dia; várias linhas na mesma data somam intervalos.
+    """
+    if not os.path.exists(caminho):
+        return {}
+    horarios = {}
+    with open(caminho, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            intervalos = horarios.setdefault(date.fromisoformat(row["data"]), [])
+            if row.get("abertura") and row.get("fechamento"):
+                intervalos.append((row["abertura"], row["fechamento"]))
+    return horarios
+
+
+def assinatura_calendario() -> str:
+    """
+    Hash do horário padrão e das tabelas de feriados e horários especiais (só o que muda o lead
+    time: datas e intervalos, não os nomes dos feriados). Os feriados nacionais vêm do código.
+    """
+    tabelas = {
+        "horario_padrao": sorted(HORARIO_PADRAO.items()),
+        "feriados": sorted(dia.isoformat() for dia in carrega_feriados_csv(CAMINHO_FERIADOS)),
+        "horarios_especiais": sorted(
+            (dia.isoformat(), intervalos) for dia, intervalos in carrega_horarios_especiais_csv(CAMINHO_HORARIOS_ESPECIAIS).items()
+        ),
+    }
+    return hashlib.sha256(json.dumps(tabelas).encode("utf-8")).hexdigest()
+
+
+def _minuto_do_dia(valor) -> int:
+    if isinstance(valor, str):
+        horas, minutos = valor.split(":")
+        return int(horas) * 60 + int(minutos)
+    return int(valor)
+
+
+class CalendarioComercial:
+    """
+    Índice pré-calculado de minutos úteis sobre um intervalo de dias.
+
+    Para cada perfil de dia distinto (horário normal, sábado, feriado, horário especial...) guarda os
+    minutos úteis acumulados em cada minuto do dia; para cada dia guarda o perfil e os minutos úteis
+    acumulados antes dele. Assim, minutos úteis até um instante são duas consultas, e o lead time
+    entre dois instantes é uma subtração.
+    """
+
+    def __init__(self, inicio: date, fim: date, horarios: dict = None, feriados: dict = None, horarios_especiais: dict = None):
+        horarios = HORARIO_PADRAO if horarios is None else horarios
+        feriados = feriados or {}
+        horarios_especiais = horarios_especiais or {}
+
+        self.inicio = inicio
+        self.fim = fim
+        self.inicio_np = np.datetime64(inicio, "D")
+        total_dias = (fim - inicio).days + 1
+        if total_dias <= 0:
+            raise ValueError("O fim do calendário deve ser igual ou posterior ao início.")
+
+        perfis = {}
+        self.perfil_dia = np.empty(total_dias, dtype=np.int64)
+        for i in range(total_dias):
+            dia = inicio + timedelta(days=i)
+            if dia in horarios_especiais:
+                intervalos = horarios_especiais[dia]
+            elif dia in feriados:
+                intervalos = []
+            else:
+                intervalos = horarios.get(dia.weekday(), [])
+            chave = tuple((_minuto_do_dia(a), _minuto_do_dia(b)) for a, b in intervalos)
+            self.perfil_dia[i] = perfis.setdefault(chave, len(perfis))
+
+        # Minuto a minuto de cada perfil: aberto?, acumulado e próximo minuto aberto no mesmo dia
+        self.aberto = np.zeros((len(perfis), MINUTOS_DIA), dtype=bool)
+        for chave, perfil in perfis.items():
+            for abertura, fechamento in chave:
+                self.aberto[perfil, abertura:fechamento] = True
+
+        self.acumulado_no_dia = np.zeros((len(perfis), MINUTOS_DIA + 1), dtype=np.int64)
+        self.acumulado_no_dia[:, 1:] = np.cumsum(self.aberto, axis=1)
+
+        self.proximo_no_dia = np.full((len(perfis), MINUTOS_DIA + 1), MINUTOS_DIA, dtype=np.int64)
+        for minuto in range(MINUTOS_DIA - 1, -1, -1):
+            self.proximo_no_dia[:, minuto] = np.where(self.aberto[:, minuto], minuto, self.proximo_no_dia[:, minuto + 1])
+
+        # Por dia: minutos úteis acumulados antes do dia e próximo dia (estritamente depois) com expediente
+        minutos_por_dia = self.acumulado_no_dia[self.perfil_dia, MINUTOS_DIA]
+        self.acumulado_antes_do_dia = np.concatenate(([0], np.cumsum(minutos_por_dia)))
+
+        self.proximo_dia_util = np.full(total_dias, -1, dtype=np.int64)
+        seguinte = -1
+        for i in range(total_dias - 1, -1, -1):
+            self.proximo_dia_util[i] = seguinte
+            if minutos_por_dia[i] > 0:
+                seguinte = i
+
+    def _indices(self, datas):
+        minutos = np.asarray(datas, dtype="datetime64[m]")
+        dias = (minutos.astype("datetime64[D]") - self.inicio_np).astype(np.int64)
+        if dias.size and (dias.min() < 0 or dias.max() >= len(self.perfil_dia)):
+            raise ValueError(f"Data fora do intervalo do calendário ({self.inicio} a {self.fim}).")
+        minuto_do_dia = (minutos - minutos.astype("datetime64[D]")).astype(np.int64)
+        return dias, minuto_do_dia
+
+    def minutos_acumulados(self, datas) -> np.ndarray:
+        dias, minuto_do_dia = self._indices(datas)
+        return self.acumulado_antes_do_dia[dias] + self.acumulado_no_dia[self.perfil_dia[dias], minuto_do_dia]
+
+    def lead_time(self, datas_inicio, datas_fim) -> np.ndarray:
+        """
+        Minutos úteis entre cada par de instantes (zero quando o fim vem antes do início).
+        """
+        return np.maximum(self.minutos_acumulados(datas_fim) - self.minutos_acumulados(datas_inicio), 0)
+
+    def dentro_do_horario(self, datas) -> np.ndarray:
+        dias, minuto_do_dia = self._indices(datas)
+        return self.aberto[self.perfil_dia[dias], minuto_do_dia]
+
+    def proximo_instante_util(self, datas) -> np.ndarray:
+        """
+        O próprio instante se estiver no expediente; senão, a próxima abertura (datetime64[m]).
+        """
+        dias, minuto_do_dia = self._indices(datas)
+        proximo = self.proximo_no_dia[self.perfil_dia[dias], minuto_do_dia]
+
+        fora_do_dia = proximo >= MINUTOS_DIA
+        if fora_do_dia.any():
+            dias_seguintes = self.proximo_dia_util[dias[fora_do_dia]]
+            if (dias_seguintes < 0).any():
+                raise ValueError(f"Sem expediente depois da data dentro do calendário ({self.inicio} a {self.fim}).")
+            dias = dias.copy()
+            dias[fora_do_dia] = dias_seguintes
+            proximo[fora_do_dia] = self.proximo_no_dia[self.perfil_dia[dias_seguintes], 0]
+
+        return self.inicio_np.astype("datetime64[m]") + (dias * MINUTOS_DIA + proximo)
+
+
+@lru_cache(maxsize=8)
+def calendario_padrao(ano_inicio: int, ano_fim: int, com_feriados: bool = True) -> CalendarioComercial:
+    """
+    Calendário do pipeline para anos inteiros: horário padrão, feriados nacionais e as tabelas
+    opcionais de data/config. Inclui janeiro do ano seguinte para o "próximo instante útil".
+    """
+    feriados, horarios_especiais = {}, {}
+    if com_feriados:
+        for ano in range(ano_inicio, ano_fim + 2):
+            feriados.update(feriados_nacionais(ano))
+        feriados.update(carrega_feriados_csv(CAMINHO_FERIADOS))
+        horarios_especiais = carrega_horarios_especiais_csv(CAMINHO_HORARIOS_ESPECIAIS)
+    return CalendarioComercial(date(ano_inicio, 1, 1), date(ano_fim + 1, 1, 31), feriados=feriados, horarios_especiais=horarios_especiais)
+
+
+def calendario_para(*colunas, com_feriados: bool = True) -> CalendarioComercial:
+    """
+    Calendário padrão que cobre todas as datas das colunas (datetime64, NaT ignorado).
+    """
+    anos = [
+        np.asarray(coluna, dtype="datetime64[Y]").astype(np.int64) + 1970
+        for coluna in colunas
+        if np.size(coluna)
+    ]
+    anos = np.concatenate(anos) if anos else np.array([], dtype=np.int64)
+    validos = anos[anos > -2**62]  # NaT vira o menor int64
+    hoje = date.today().year
+    if validos.size == 0:
+        return calendario_padrao(hoje, hoje, com_feriados)
+    return calendario_padrao(int(validos.min()), int(validos.max()), com_feriados)
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+
+# Estado das etapas do orquestrador: hash (SHA-1 do conteúdo) dos arquivos de entrada de cada etapa
+# na última execução bem-sucedida, os parâmetros dela (inclusive as versões das tabelas do banco
+# que ela lê) e o último hash conhecido de cada arquivo que o pipeline grava. Uma etapa é pulada
+# quando as entradas e os parâmetros não mudaram e as saídas continuam iguais.
+CAMINHO_ESTADO = "data/atualizado/estado-etapas.json"
+TAMANHO_BLOCO = 1 << 20
+
+# (caminho, tamanho, mtime) → hash, para não reler na mesma execução um arquivo que não mudou
+_cache_hashes = {}
+
+
+def hash_arquivo(caminho: str):
+    """
+    SHA-1 do conteúdo do arquivo, ou None se ele não existe.
+    """
+    try:
+        info = os.stat(caminho)
+    except FileNotFoundError:
+        return None
+    chave = (caminho, info.st_size, info.st_mtime_ns)
+    if chave not in _cache_hashes:
+        sha1 = hashlib.sha1()
+        with open(caminho, "rb") as f:
+            for bloco in iter(lambda: f.read(TAMANHO_BLOCO), b""):
+                sha1.update(bloco)
+        _cache_hashes[chave] = sha1.hexdigest()
+    return _cache_hashes[chave]
+
+
+def le_estado() -> dict:
+    try:
+        with open(CAMINHO_ESTADO, encoding="utf-8") as f:
+            estado = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        estado = {}
+    estado.setdefault("etapas", {})
+    estado.setdefault("arquivos", {})
+    return estado
+
+
+def salva_estado(estado: dict):
+    pasta = os.path.dirname(CAMINHO_ESTADO) or "."
+    os.makedirs(pasta, exist_ok=True)
+    fd, caminho_tmp = tempfile.mkstemp(dir=pasta, prefix=".estado-etapas.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(estado, f, ensure_ascii=False, indent=2)
+        os.replace(caminho_tmp, CAMINHO_ESTADO)
+    except BaseException:
+        if os.path.exists(caminho_tmp):
+            os.remove(caminho_tmp)
+        raise
+
+
+def motivo_execucao(estado: dict, nome: str, entradas: list, saidas: list, parametros: dict = None) -> str:
+    """
+    Por que a etapa precisa rodar, ou "" se ela pode ser pulada: entradas com o mesmo conteúdo do
+    fim da última execução, mesmos parâmetros e saídas iguais ao que o pipeline gravou por último
+    (uma saída apagada ou editada fora do pipeline faz a etapa rodar de novo).
+    """
+    anterior = estado["etapas"].get(nome)
+    if anterior is None:
+        return "sem execução anterior registrada"
+    parametros, parametros_anteriores = parametros or {}, anterior.get("parametros", {})
+    alterados = sorted(chave for chave in set(parametros) | set(parametros_anteriores) if parametros.get(chave) != parametros_anteriores.get(chave))
+    if alterados:
+        return "parâmetros alterados: " + ", ".join(alterados)
+    alteradas = [caminho for caminho in entradas if hash_arquivo(caminho) != anterior["entradas"].get(caminho)]
+    if alteradas:
+        return "entradas alteradas: " + ", ".join(os.path.basename(caminho) for caminho in alteradas)
+    for caminho in saidas:
+        if hash_arquivo(caminho) is None:
+            return f"saída ausente: {os.path.basename(caminho)}"
+        if hash_arquivo(caminho) != estado["arquivos"].get(caminho):
+            return f"saída alterada fora do pipeline: {os.path.basename(caminho)}"
+    return ""
+
+
+def registra_execucao(estado: dict, nome: str, entradas: list, saidas: list, parametros: dict = None):
+    """
+    Grava, depois de a etapa terminar, o hash das entradas e das saídas; as saídas passam a ser o
+    último conteúdo conhecido desses arquivos (o que uma etapa seguinte regravar prevalece).
+    """
+    hashes = {caminho: hash_arquivo(caminho) for caminho in list(entradas) + list(saidas)}
+    estado["etapas"][nome] = {
+        "entradas": {caminho: hashes[caminho] for caminho in entradas},
+        "parametros": parametros or {},
+        "executada_em": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    estado["arquivos"].update(hashes)
+    salva_estado(estado)
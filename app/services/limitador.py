@@ -0,0 +1,28 @@
+import threading
+import time
+
+
+class BaldeDeTokens:
+    """
+    Token bucket: libera `taxa` tokens por segundo, acumulando no máximo `capacidade`.
+    `consome()` bloqueia a thread até haver um token disponível.
+    """
+
+    def __init__(self, taxa: float, capacidade: int):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.tokens = float(capacidade)
+        self.ultimo = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consome(self):
+        while True:
+            with self.lock:
+                agora = time.monotonic()
+                self.tokens = min(self.capacidade, self.tokens + (agora - self.ultimo) * self.taxa)
+                self.ultimo = agora
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                espera = (1 - self.tokens) / self.taxa
+            time.sleep(espera)
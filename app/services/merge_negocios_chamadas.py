@@ -1,51 +1,162 @@
+import argparse
+import os
+import tempfile
+
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta, time, timezone
 
+from app.services import armazenamento, metricas, perfil, snapshots
+from app.services.calendario_comercial import CalendarioComercial, assinatura_calendario, calendario_para
+
 UTC = timezone.utc
 
 # Caminhos
-CAMINHO_CHAMADAS = "data/atualizado/chamadas.csv"
+CAMINHO_CHAMADAS_RESUMO = "data/atualizado/chamadas-resumo.csv"
 CAMINHO_NEGOCIOS = "data/atualizado/negocios.csv"
 CAMINHO_NEGOCIOS_CHAMADAS = "data/atualizado/negocios-chamadas"
 
-# Fase 1 – Criar CSV base com colunas desejadas
-def prepara_merge():
-    colunas_desejadas = [
-        "Associated Deal IDs",
-        "Associated Deal",
-        "Data da atividade",
-        "Atividade atribuída a"
-    ]
-    df_chamadas = pd.read_csv(CAMINHO_CHAMADAS)
+COLUNAS_CHAMADAS = [
+    "Associated Deal IDs",
+    "Associated Deal",
+    "Data da atividade",
+    "Atividade atribuída a"
+]
+# Colunas lidas do resumo das chamadas (o ID da chamada só desempata a primeira chamada), com
+# tipos declarados: os IDs são numéricos (float, por causa das chamadas sem negócio) e o resto é texto
+COLUNAS_LEITURA_CHAMADAS = COLUNAS_CHAMADAS + ["ID do objeto"]
+TIPOS_CHAMADAS = {
+    "Associated Deal IDs": "float64",
+    "Associated Deal": str,
+    "Data da atividade": str,
+    "Atividade atribuída a": str,
+    "ID do objeto": "float64",
+}
+FORMATO_DATA = "%Y-%m-%d %H:%M"
+COLUNAS_NEGOCIOS = ["ID do registro.", "Data de criação", "Momento de Compra"]
+
+# As três fases são transformações em memória (DataFrame → DataFrame), encadeadas por main()
+# com uma única escrita no final; também podem ser usadas e medidas separadamente.
+
+# Fase 1 – Primeira chamada de cada negócio, com as colunas desejadas
+def prepara_merge(df_chamadas: pd.DataFrame) -> pd.DataFrame:
+    """
+    Primeira chamada = menor "Data da atividade" do negócio (datas vazias ou inválidas por último),
+    com empate decidido pelo menor ID da chamada. Não depende da ordem das linhas: é um
+    groupby-min sobre a data já convertida, seguido de um groupby-min do ID entre as empatadas,
+    ambos feitos com np.minimum.at sobre o código de cada negócio. Chamadas sem negócio formam
+    um grupo próprio.
+    """
+    colunas = [col for col in COLUNAS_CHAMADAS if col in df_chamadas.columns]
+    df_chamadas = df_chamadas.reset_index(drop=True)
+
+    # Um código por negócio, na ordem dos IDs (sem negócio por último)
+    codigos, negocios = pd.factorize(df_chamadas["Associated Deal IDs"], sort=True, use_na_sentinel=False)
+
+    # Data em minutos (NaT vira o maior inteiro, para ficar por último); do snapshot já vem convertida
+    datas = df_chamadas["Data da atividade"]
+    if not pd.api.types.is_datetime64_any_dtype(datas):
+        datas = pd.to_datetime(datas, format=FORMATO_DATA, errors="coerce", cache=False)
+    minutos = datas.to_numpy(dtype="datetime64[m]").astype(np.int64)
+    minutos[datas.isna().to_numpy()] = np.iinfo(np.int64).max
+    menor_data = np.full(len(negocios), np.iinfo(np.int64).max)
+    np.minimum.at(menor_data, codigos, minutos)
+    empatadas = minutos == menor_data[codigos]
+
+    # Entre as chamadas da menor data, a de menor ID
+    if "ID do objeto" in df_chamadas.columns:
+        ids = pd.to_numeric(df_chamadas["ID do objeto"], errors="coerce").to_numpy(dtype=float, na_value=np.finfo(float).max)
+    else:
+        ids = np.zeros(len(df_chamadas))
+    ids = np.where(empatadas, ids, np.inf)
+    menor_id = np.full(len(negocios), np.inf)
+    np.minimum.at(menor_id, codigos, ids)
+    linhas = np.flatnonzero(ids == menor_id[codigos])
 
-    # Seleciona apenas as colunas desejadas
-    df_filtrado = df_chamadas[[col for col in colunas_desejadas if col in df_chamadas.columns]].copy()
+    # Primeira linha de cada negócio entre as que atingem o mínimo
+    posicoes = np.empty(len(negocios), dtype=np.int64)
+    posicoes[codigos[linhas[::-1]]] = linhas[::-1]
 
-    # Inverte para que as chamadas mais antigas fiquem primeiro
-    df_filtrado = df_filtrado.iloc[::-1].reset_index(drop=True)
+    df_filtrado = df_chamadas.loc[posicoes, colunas].reset_index(drop=True)
 
-    # Remove duplicados, mantendo apenas o primeiro (mais antigo) por ID
-    df_filtrado = df_filtrado.drop_duplicates(subset="Associated Deal IDs", keep="first")
+    # Vindo do snapshot: datas e categorias voltam ao formato do CSV
+    if pd.api.types.is_datetime64_any_dtype(df_filtrado["Data da atividade"]):
+        df_filtrado["Data da atividade"] = snapshots.data_como_texto(df_filtrado["Data da atividade"])
+    for coluna in df_filtrado.columns:
+        if isinstance(df_filtrado[coluna].dtype, pd.CategoricalDtype):
+            df_filtrado[coluna] = df_filtrado[coluna].astype(object)
 
     # Converte o ID para string
     if "Associated Deal IDs" in df_filtrado.columns:
         df_filtrado["Associated Deal IDs"] = df_filtrado["Associated Deal IDs"].astype(str)
 
-    df_filtrado.to_csv(CAMINHO_NEGOCIOS_CHAMADAS, index=False)
     print(f"✅ negocios-chamadas criado com {len(df_filtrado)} registros únicos por ID.")
+    return df_filtrado
+
+
+def le_chamadas(caminho_csv: str = None) -> pd.DataFrame:
+    """
+    Só as colunas usadas no merge: do snapshot Parquet das chamadas quando ele está em dia (datas
+    já convertidas), senão do banco local; sem banco, ou com `caminho_csv` (um resumo ou
+    chamadas.csv completo), do CSV. Do banco e do CSV, com os tipos declarados.
+    """
+    if caminho_csv is None:
+        df = snapshots.le_dataset("chamadas", colunas=COLUNAS_LEITURA_CHAMADAS)
+        if df is not None:
+            return df
+        df = snapshots.le_banco("chamadas", COLUNAS_LEITURA_CHAMADAS)
+        if df is not None:
+            return df.astype({coluna: tipo for coluna, tipo in TIPOS_CHAMADAS.items() if tipo is not str})
+        caminho_csv = CAMINHO_CHAMADAS_RESUMO
+    return pd.read_csv(caminho_csv, usecols=lambda coluna: coluna in COLUNAS_LEITURA_CHAMADAS, dtype=TIPOS_CHAMADAS)
+
+
+def le_negocios(caminho_csv: str = None) -> pd.DataFrame:
+    """
+    Colunas dos negócios usadas no merge, do snapshot Parquet quando ele está em dia (com a data
+    de criação de volta ao texto do CSV), senão do banco local; sem banco, ou com `caminho_csv`,
+    do negocios.csv.
+    """
+    if caminho_csv is None:
+        df = snapshots.le_dataset("negocios", colunas=COLUNAS_NEGOCIOS)
+        if df is not None:
+            return df.assign(**{
+                "Data de criação": snapshots.data_como_texto(df["Data de criação"]),
+                "Momento de Compra": df["Momento de Compra"].astype(object),
+            })
+        df = snapshots.le_banco("negocios", COLUNAS_NEGOCIOS)
+        if df is not None:
+            return df
+    return pd.read_csv(caminho_csv or CAMINHO_NEGOCIOS, usecols=lambda coluna: coluna in COLUNAS_NEGOCIOS)
+
+
+def primeiras_chamadas_do_indice(conn) -> pd.DataFrame:
+    """
+    Mesmo resultado de prepara_merge, lido do índice de primeiras chamadas mantido pela ingestão,
+    sem reler o histórico de chamadas.
+    """
+    df = pd.DataFrame(armazenamento.le_primeiras_chamadas(conn), columns=COLUNAS_CHAMADAS, dtype=object)
+
+    # Mesmas convenções da leitura do CSV: campo vazio vira NaN e o ID sem negócio vira "nan"
+    df["Associated Deal IDs"] = df["Associated Deal IDs"].replace("", "nan")
+    for coluna in COLUNAS_CHAMADAS[1:]:
+        df[coluna] = df[coluna].mask(df[coluna].isna() | (df[coluna] == ""), np.nan)
+
+    print(f"✅ {len(df)} primeiras chamadas lidas do índice.")
+    return df
 
 
 # Fase 2 – Adicionar 'Data de criação' e 'Momento de Compra' com merge baseado no ID
-def merge_csvs():
-    df_leadtime = pd.read_csv(CAMINHO_NEGOCIOS_CHAMADAS)
-    df_negocios = pd.read_csv(CAMINHO_NEGOCIOS)
+def merge_negocios(df_leadtime: pd.DataFrame, df_negocios: pd.DataFrame) -> pd.DataFrame:
+    df_leadtime = df_leadtime.copy()
+    df_negocios = df_negocios[["ID do registro.", "Data de criação", "Momento de Compra"]].copy()
 
     df_leadtime["Associated Deal IDs"] = pd.to_numeric(df_leadtime["Associated Deal IDs"], errors="coerce")
     df_negocios["ID do registro."] = pd.to_numeric(df_negocios["ID do registro."], errors="coerce")
 
     # Merge incluindo 'Data de criação' e 'Momento de Compra'
     df_merged = df_leadtime.merge(
-        df_negocios[["ID do registro.", "Data de criação", "Momento de Compra"]],
+        df_negocios,
         how="left",
         left_on="Associated Deal IDs",
         right_on="ID do registro."
@@ -63,11 +174,11 @@ def merge_csvs():
         "Data da atividade"
     ]
     colunas_restantes = [col for col in df_merged.columns if col not in colunas_ordenadas]
-    df_merged = df_merged[colunas_ordenadas + colunas_restantes]
-
-    df_merged.to_csv(CAMINHO_NEGOCIOS_CHAMADAS, index=False)
+    return df_merged[colunas_ordenadas + colunas_restantes]
 
 # Fase 3 – Calcular e salvar Lead Time
+# arredonda_para_periodo_util e calcula_lead_time_util são a referência escalar (sem feriados) do
+# cálculo; o pipeline usa o CalendarioComercial, que também considera feriados e horários especiais.
 def arredonda_para_periodo_util(dt):
     dia_semana = dt.weekday()
     hora = dt.time()
@@ -139,65 +250,196 @@ def calcula_lead_time_util(data_inicio, data_fim):
     
     return total
 
+def calcula_lead_time_util_vetorizado(datas_inicio, datas_fim, calendario: CalendarioComercial = None) -> np.ndarray:
+    """
+    Versão em lote de calcula_lead_time_util: recebe colunas de datas (datetime64, precisão de minuto)
+    e devolve os minutos úteis entre cada par com duas consultas ao calendário comercial.
+    Sem calendário explícito, usa o padrão do pipeline (com feriados nacionais).
+    """
+    calendario = calendario or calendario_para(datas_inicio, datas_fim)
+    return calendario.lead_time(datas_inicio, datas_fim)
+
+
+def dentro_do_horario_comercial(datas, calendario: CalendarioComercial = None) -> np.ndarray:
+    calendario = calendario or calendario_para(datas)
+    return calendario.dentro_do_horario(datas)
+
+
 def formata_timedelta(td):
     total_segundos = int(td.total_seconds())
     horas, resto = divmod(total_segundos, 3600)
     minutos = resto // 60
     return f"{horas:02}:{minutos:02}"
 
-def processa_e_salva_csv():
-    df = pd.read_csv(CAMINHO_NEGOCIOS_CHAMADAS)
-    dados = df.to_dict(orient="records")
-
-    for row in dados:
-        data_criacao = row.get('Data de criação')
-        data_atividade = row.get('Data da atividade')
-
-        if data_criacao and data_atividade:
-            try:
-                dt_criacao = datetime.strptime(data_criacao, "%Y-%m-%d %H:%M").replace(tzinfo=UTC)
-                dt_atividade = datetime.strptime(data_atividade, "%Y-%m-%d %H:%M").replace(tzinfo=UTC)
-                lead_time = calcula_lead_time_util(dt_criacao, dt_atividade)
-
-                # Verifica se a DATA DE CRIAÇÃO está dentro do horário comercial
-                hora = dt_criacao.time()
-                dia_semana = dt_criacao.weekday()
-                if (
-                    (0 <= dia_semana <= 4 and time(8, 0) <= hora < time(20, 0)) or  # Seg-Sex
-                    (dia_semana == 5 and time(8, 0) <= hora < time(18, 0))           # Sábado
-                ):
-                    row["Horário da atividade"] = "Dentro do horário comercial"
-                else:
-                    row["Horário da atividade"] = "Fora do horário comercial"
-
-                # Formatos: HH:MM e minutos inteiros
-                row["Lead Time"] = formata_timedelta(lead_time)
-                row["Lead Time (min)"] = int(lead_time.total_seconds() // 60)
-
-            except Exception as e:
-                row["Lead Time"] = f"Erro: {str(e)}"
-                row["Lead Time (min)"] = ""
-                row["Horário da atividade"] = "Erro"
-        else:
-            row["Lead Time"] = ""
-            row["Lead Time (min)"] = ""
-            row["Horário da atividade"] = ""
-
-    # Cria o novo DataFrame e ordena por "Data de criação"
-    df_resultado = pd.DataFrame(dados)
+def _lead_time_linha(data_criacao, data_atividade) -> dict:
+    """
+    Caminho escalar, usado só nas linhas que o lote não consegue interpretar (preserva as mensagens de erro).
+    """
+    if not (data_criacao and data_atividade):
+        return {"Lead Time": "", "Lead Time (min)": "", "Horário da atividade": ""}
+    try:
+        inicio = np.array([datetime.strptime(data_criacao, "%Y-%m-%d %H:%M")], dtype="datetime64[m]")
+        fim = np.array([datetime.strptime(data_atividade, "%Y-%m-%d %H:%M")], dtype="datetime64[m]")
+        calendario = calendario_para(inicio, fim)
+        minutos = int(calcula_lead_time_util_vetorizado(inicio, fim, calendario)[0])
+        dentro = dentro_do_horario_comercial(inicio, calendario)[0]
+        return {
+            "Horário da atividade": "Dentro do horário comercial" if dentro else "Fora do horário comercial",
+            "Lead Time": formata_timedelta(timedelta(minutes=minutos)),
+            "Lead Time (min)": minutos,
+        }
+    except Exception as e:
+        return {"Lead Time": f"Erro: {str(e)}", "Lead Time (min)": "", "Horário da atividade": "Erro"}
+
+
+def calcula_lead_time(df: pd.DataFrame, memo: dict = None) -> pd.DataFrame:
+    """
+    Com memo ((data de criação, data da atividade) → (horário, lead time, minutos), "" para data
+    vazia), só calcula os pares que ainda não estão nele, acrescenta os novos ao dicionário e
+    descarta os que nenhum negócio usa mais: o lead time de um negócio só é refeito quando a data
+    de criação ou a da primeira chamada muda, e o memo fica do tamanho do conjunto de negócios.
+    """
+    df = df.reset_index(drop=True)
+
+    # Linhas com as duas datas no formato esperado são calculadas em lote
+    criacao = pd.to_datetime(df["Data de criação"], format=FORMATO_DATA, errors="coerce")
+    atividade = pd.to_datetime(df["Data da atividade"], format=FORMATO_DATA, errors="coerce")
+    validas = (criacao.notna() & atividade.notna()).to_numpy()
+
+    n = len(df)
+    horario = np.empty(n, dtype=object)
+    lead_time_hhmm = np.empty(n, dtype=object)
+    lead_time_min = np.empty(n, dtype=object)
+
+    calcular = np.ones(n, dtype=bool)
+    if memo is not None:
+        chaves = list(zip(_texto_ou_vazio(df["Data de criação"]), _texto_ou_vazio(df["Data da atividade"])))
+        for i, chave in enumerate(chaves):
+            if chave in memo:
+                horario[i], lead_time_hhmm[i], lead_time_min[i] = memo[chave]
+                calcular[i] = False
+
+    lote = validas & calcular
+    if lote.any():
+        inicio = criacao[lote].to_numpy(dtype="datetime64[m]")
+        fim = atividade[lote].to_numpy(dtype="datetime64[m]")
+        calendario = calendario_para(inicio, fim)
+        minutos = calcula_lead_time_util_vetorizado(inicio, fim, calendario)
+
+        # Verifica se a DATA DE CRIAÇÃO está dentro do horário comercial
+        horario[lote] = np.where(dentro_do_horario_comercial(inicio, calendario), "Dentro do horário comercial", "Fora do horário comercial")
+        # Formatos: HH:MM e minutos inteiros
+        lead_time_hhmm[lote] = [f"{h:02}:{m:02}" for h, m in zip(*np.divmod(minutos, 60))]
+        lead_time_min[lote] = minutos.tolist()
+
+    # Demais linhas (datas vazias ou fora do formato) seguem o caminho escalar
+    for i in np.flatnonzero(~validas & calcular):
+        resultado = _lead_time_linha(df.at[i, "Data de criação"], df.at[i, "Data da atividade"])
+        horario[i] = resultado["Horário da atividade"]
+        lead_time_hhmm[i] = resultado["Lead Time"]
+        lead_time_min[i] = resultado["Lead Time (min)"]
+
+    if memo is not None:
+        for chave in set(memo).difference(chaves):
+            del memo[chave]
+        for i in np.flatnonzero(calcular):
+            memo[chaves[i]] = (horario[i], lead_time_hhmm[i], lead_time_min[i])
+        print(f"🧮 Lead time calculado para {int(calcular.sum())} de {n} negócios (demais reaproveitados).")
+
+    # Mantém a ordem de colunas do caminho por linha (depende do ramo da primeira linha)
+    novas = {"Horário da atividade": horario, "Lead Time": lead_time_hhmm, "Lead Time (min)": lead_time_min}
+    if n and not validas[0]:
+        novas = {col: novas[col] for col in ["Lead Time", "Lead Time (min)", "Horário da atividade"]}
+    df_resultado = df.assign(**{col: pd.Series(valores, index=df.index) for col, valores in novas.items()})
+    if n and validas.all():
+        df_resultado["Lead Time (min)"] = df_resultado["Lead Time (min)"].astype("int64")
+
+    # Ordena por "Data de criação"
     df_resultado["Data de criação"] = pd.to_datetime(df_resultado["Data de criação"], errors="coerce")
     df_resultado = df_resultado.sort_values(by="Data de criação", ascending=False)
 
-    # Salva ordenado
-    df_resultado.to_csv(CAMINHO_NEGOCIOS_CHAMADAS, index=False)
-    print("✅ Lead Time calculados e salvos com sucesso.")
+    print("✅ Lead Time calculados com sucesso.")
+    return df_resultado
+
+
+def _texto_ou_vazio(coluna: pd.Series) -> list:
+    return ["" if pd.isna(valor) else str(valor) for valor in coluna]
+
+
+def salva_csv(df: pd.DataFrame, caminho_csv: str = CAMINHO_NEGOCIOS_CHAMADAS):
+    """
+    Escrita atômica: arquivo temporário na mesma pasta + rename, para quem lê o CSV nunca ver um arquivo pela metade.
+    """
+    pasta = os.path.dirname(caminho_csv) or "."
+    os.makedirs(pasta, exist_ok=True)
+    fd, caminho_tmp = tempfile.mkstemp(dir=pasta, suffix=".csv.tmp")
+    try:
+        with os.fdopen(fd, "w", newline='', encoding='utf-8') as f:
+            df.to_csv(f, index=False)
+        os.replace(caminho_tmp, caminho_csv)
+    except BaseException:
+        os.remove(caminho_tmp)
+        raise
+    print(f"💾 {caminho_csv} salvo com {len(df)} registros.")
 
 
 # --- Executar tudo em uma função principal ---
-def main():
-    prepara_merge()
-    merge_csvs()
-    processa_e_salva_csv()
+@perfil.perfilado("merge")
+def main(completo: bool = False):
+    """
+    Modo incremental (padrão): primeiras chamadas lidas do índice no banco local e lead time
+    refeito só para os pares de datas que mudaram (o memo é descartado se o calendário comercial
+    mudou). Modo completo: tudo recalculado a partir do histórico das chamadas, reconstruindo índice
+    e memo (use para verificação).
+    """
+    conn = armazenamento.conecta()
+    try:
+        # Fase 1: negócios e primeira chamada de cada negócio
+        with metricas.mede("merge_primeiras_chamadas") as medida:
+            df_negocios = le_negocios()
+
+            if not completo:
+                armazenamento.garante_primeiras_chamadas(conn)
+            if armazenamento.garante_memo_lead_time(conn, assinatura_calendario()):
+                print("🗓️  Calendário comercial alterado: lead times em memo descartados.")
+            if completo or armazenamento.esta_vazio(conn, "primeira_chamada"):
+                print("🔄 Modo completo: recalculando a partir do histórico de chamadas.")
+                df = prepara_merge(le_chamadas())
+                if not armazenamento.esta_vazio(conn, "chamadas"):
+                    armazenamento.reconstroi_primeiras_chamadas(conn)
+                memo, memo_inicial = {}, {}
+            else:
+                df = primeiras_chamadas_do_indice(conn)
+                memo = armazenamento.le_memo_lead_time(conn)
+                memo_inicial = dict(memo)
+            medida.update(registros_entrada=len(df_negocios), registros_saida=len(df))
+
+        # Fase 2: junção com os negócios
+        with metricas.mede("merge_juncao", registros_entrada=len(df)) as medida:
+            df = merge_negocios(df, df_negocios)
+            medida["registros_saida"] = len(df)
+
+        # Fase 3: lead time (só os pares de datas fora do memo)
+        with metricas.mede("merge_lead_time", registros_entrada=len(df)) as medida:
+            memo_antes = len(memo)
+            df = calcula_lead_time(df, memo)
+            medida.update(registros_saida=len(df), calculados=len(memo) - memo_antes)
+
+        with metricas.mede("merge_gravacao", registros_saida=len(df)) as medida:
+            salva_csv(df, CAMINHO_NEGOCIOS_CHAMADAS)
+            snapshots.salva_dataset("negocios-chamadas", df)
+
+            novos = {chave: valores for chave, valores in memo.items() if chave not in memo_inicial}
+            removidos = [chave for chave in memo_inicial if chave not in memo]
+            armazenamento.salva_memo_lead_time(conn, novos, limpar=not memo_inicial, removidos=removidos)
+            medida["bytes_escritos"] = metricas.tamanho_arquivo(CAMINHO_NEGOCIOS_CHAMADAS)
+    finally:
+        conn.close()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Junta negócios e primeiras chamadas e calcula o lead time.")
+    parser.add_argument("--completo", action="store_true", help="Recalcula tudo a partir do resumo das chamadas (verificação).")
+    perfil.adiciona_argumentos(parser)
+    args = parser.parse_args()
+    with perfil.sessao(args.perfil, args.perfil_memoria, args.perfil_top):
+        main(completo=args.completo)
@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import requests
+
+try:
+    import resource
+except ImportError:  # Windows: sem getrusage, o pico de memória fica vazio
+    resource = None
+
+# Métricas por etapa de uma execução do pipeline: tempo, registros, páginas, bytes e memória. As
+# etapas somam valores (as sincronizações rodam em threads, por isso o lock); o orquestrador grava
+# uma linha JSON por execução em CAMINHO_METRICAS e, opcionalmente, manda um resumo ao Cronitor.
+CAMINHO_METRICAS = "data/atualizado/metricas.jsonl"
+CRONITOR_API_KEY = os.getenv("CRONITOR_API_KEY")
+CRONITOR_MONITOR = os.getenv("CRONITOR_MONITOR", "main")
+CRONITOR_URL = "https://cronitor.link/p/{chave}/{monitor}"
+TIMEOUT_CRONITOR = 10
+
+_lock = threading.Lock()
+_etapas = defaultdict(lambda: defaultdict(float))
+
+
+def rss_pico_mb():
+    """
+    Pico de memória residente do processo até agora, em MB (ru_maxrss vem em KB no Linux).
+    """
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def soma(etapa: str, **valores):
+    with _lock:
+        for chave, valor in valores.items():
+            _etapas[etapa][chave] += valor
+
+
+@contextmanager
+def mede(etapa: str, **valores):
+    """
+    Soma o tempo do bloco (e os valores que o bloco acrescentar ao dicionário devolvido) na etapa,
+    e guarda o pico de memória do processo ao final dela.
+    """
+    extras = dict(valores)
+    inicio = time.perf_counter()
+    try:
+        yield extras
+    finally:
+        soma(etapa, tempo_s=time.perf_counter() - inicio, **extras)
+        pico = rss_pico_mb()
+        if pico is not None:
+            with _lock:
+                _etapas[etapa]["rss_pico_mb"] = max(_etapas[etapa]["rss_pico_mb"], pico)
+
+
+def tamanho_arquivo(caminho: str) -> int:
+    try:
+        return os.path.getsize(caminho)
+    except OSError:
+        return 0
+
+
+def etapas() -> dict:
+    """
+    Cópia das métricas acumuladas; contagens inteiras voltam como int e tempos com 3 casas.
+    """
+    with _lock:
+        return {
+            etapa: {chave: int(valor) if float(valor).is_integer() else round(valor, 3) for chave, valor in valores.items()}
+            for etapa, valores in _etapas.items()
+        }
+
+
+def zera():
+    with _lock:
+        _etapas.clear()
+
+
+def grava_execucao(registro: dict, caminho: str = None):
+    """
+    Acrescenta a execução como uma linha JSON (append: o histórico fica para comparar execuções).
+    """
+    caminho = caminho or CAMINHO_METRICAS
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    with open(caminho, "a", encoding="utf-8") as f:
+        f.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+
+
+def envia_cronitor(registro: dict):
+    """
+    Ping de telemetria no monitor do Cronitor (o mesmo do `cronitor exec main`), com duração,
+    registros sincronizados e erros como métricas. Execução com erro vai com state=fail, para o
+    monitor marcar a falha mesmo sem o `cronitor exec`. Só com CRONITOR_API_KEY; falhas no envio viram aviso.
+    """
+    if not CRONITOR_API_KEY:
+        return
+    params = [
+        ("metric", f"duration:{registro['duracao_s']}"),
+        ("metric", f"count:{registro['registros_sincronizados']}"),
+        ("metric", f"error_count:{registro['erros_http'] + registro['retentativas']}"),
+        ("message", registro["resumo"][:1000]),
+    ]
+    if registro["status"] != "ok":
+        params.append(("state", "fail"))
+    try:
+        requests.get(CRONITOR_URL.format(chave=CRONITOR_API_KEY, monitor=CRONITOR_MONITOR), params=params, timeout=TIMEOUT_CRONITOR)
+    except requests.RequestException as erro:
+        print(f"⚠️  Métricas não enviadas ao Cronitor: {erro}")
+
+
+def monta_registro(inicio: str, duracao_s: float, status: str, hubspot: dict, **extras) -> dict:
+    """
+    Linha de uma execução: totais (registros e páginas da coleta, retentativas e erros HTTP da
+    HubSpot e do Sheets, pico de memória), métricas por etapa e por endpoint, e um resumo de uma
+    linha para o log e o Cronitor.
+    """
+    por_etapa = etapas()
+    coletas = [valores for etapa, valores in por_etapa.items() if etapa.startswith("coleta_")]
+    registro = {
+        "inicio": inicio,
+        "duracao_s": round(duracao_s, 3),
+        "status": status,
+        **extras,
+        "registros_sincronizados": sum(valores.get("registros_saida", 0) for valores in coletas),
+        "paginas_api": sum(valores.get("paginas", 0) for valores in coletas),
+        "retentativas": sum(valores["retentativas"] for valores in hubspot.values()) + por_etapa.get("sheets_escrita", {}).get("retentativas", 0),
+        "erros_http": sum(valores["erros"] for valores in hubspot.values()),
+        "latencia_p95_s": max((valores["latencia_p95"] for valores in hubspot.values()), default=0.0),
+        "rss_pico_mb": rss_pico_mb(),
+        "etapas": por_etapa,
+        "hubspot": hubspot,
+    }
+    registro["resumo"] = (
+        f"{status} em {registro['duracao_s']:.1f}s | {registro['registros_sincronizados']} registros em "
+        f"{registro['paginas_api']} páginas | p95 HubSpot {registro['latencia_p95_s']:.2f}s | "
+        f"{registro['retentativas']} retentativas | RSS {registro['rss_pico_mb']} MB"
+    )
+    return registro
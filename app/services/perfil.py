@@ -0,0 +1,169 @@
+import cProfile
+import functools
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+# Modo de perfil (--perfil / --profile): cada etapa marcada com `perfil.etapa(nome)` ganha um
+# cProfile próprio (e, com --perfil-memoria, as alocações do tracemalloc), gravados numa pasta por
+# execução. Desligado, `etapa()` devolve um nullcontext: nenhum hook de profiling é instalado.
+PASTA_PERFIS = "data/atualizado/perfis"
+TOP_FUNCOES = 20
+LINHAS_RELATORIO = 60
+TOP_ALOCACOES = 25
+
+_perfilador = None
+
+
+def nome_funcao(funcao: tuple) -> str:
+    arquivo, linha, nome = funcao
+    if arquivo == "~":  # funções embutidas (ex.: <built-in method time.sleep>)
+        return nome
+    return f"{nome} ({os.path.basename(arquivo)}:{linha})"
+
+
+class Perfilador:
+    """
+    Perfis por etapa de uma execução. O cProfile só enxerga a thread em que foi ligado e não
+    convive com outro perfil ativo, então as etapas perfiladas rodam uma de cada vez (as que o
+    orquestrador roda em paralelo esperam a vez); uma etapa dentro de outra, na mesma thread,
+    entra no perfil da de fora.
+    """
+
+    def __init__(self, pasta: str = None, memoria: bool = False, top: int = TOP_FUNCOES):
+        self.pasta = os.path.join(pasta or PASTA_PERFIS, datetime.now().strftime("%Y%m%d-%H%M%S"))
+        os.makedirs(self.pasta, exist_ok=True)
+        self.memoria = memoria
+        self.top = top
+        self.etapas = []  # (nome, tempo em segundos, pstats.Stats, pico de memória em MB ou None)
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        if memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _nome_livre(self, nome: str) -> str:
+        usados = {etapa[0] for etapa in self.etapas}
+        if nome not in usados:
+            return nome
+        numero = 2
+        while f"{nome}-{numero}" in usados:
+            numero += 1
+        return f"{nome}-{numero}"
+
+    @contextmanager
+    def etapa(self, nome: str):
+        if getattr(self.local, "ativa", False):
+            yield
+            return
+        with self.lock:
+            self.local.ativa = True
+            antes = None
+            if self.memoria:
+                tracemalloc.reset_peak()
+                antes = tracemalloc.take_snapshot()
+            perfil = cProfile.Profile()
+            inicio = time.perf_counter()
+            perfil.enable()
+            try:
+                yield
+            finally:
+                perfil.disable()
+                tempo = time.perf_counter() - inicio
+                self.local.ativa = False
+                self._grava(self._nome_livre(nome), tempo, perfil, antes)
+
+    def _grava(self, nome: str, tempo: float, perfil: cProfile.Profile, antes):
+        base = os.path.join(self.pasta, nome)
+        perfil.dump_stats(f"{base}.pstats")
+        saida = io.StringIO()
+        stats = pstats.Stats(perfil, stream=saida)
+        saida.write(f"Etapa {nome}: {tempo:.3f}s de parede\n\n=== Por tempo acumulado (cumulative) ===\n")
+        stats.sort_stats("cumulative").print_stats(LINHAS_RELATORIO)
+        saida.write("\n=== Por tempo próprio (tottime) ===\n")
+        stats.sort_stats("tottime").print_stats(LINHAS_RELATORIO)
+        with open(f"{base}.txt", "w", encoding="utf-8") as f:
+            f.write(saida.getvalue())
+
+        pico = None
+        if antes is not None:
+            _, pico_bytes = tracemalloc.get_traced_memory()
+            pico = pico_bytes / 2**20
+            diferencas = tracemalloc.take_snapshot().compare_to(antes, "lineno")
+            with open(f"{base}-memoria.txt", "w", encoding="utf-8") as f:
+                f.write(f"Etapa {nome}: pico de {pico:.1f} MB alocados (tracemalloc)\n\n")
+                f.write(f"=== {TOP_ALOCACOES} linhas com mais memória retida ao fim da etapa ===\n")
+                for diferenca in diferencas[:TOP_ALOCACOES]:
+                    f.write(f"{diferenca}\n")
+        self.etapas.append((nome, tempo, stats, pico))
+
+    def resumo(self) -> str:
+        """
+        Top-N funções por tempo próprio de cada etapa, para o log.
+        """
+        linhas = [f"🔬 Perfis em {self.pasta}"]
+        for nome, tempo, stats, pico in self.etapas:
+            memoria = f", pico {pico:.1f} MB" if pico is not None else ""
+            linhas.append(f"\n⏱️  {nome}: {tempo:.2f}s{memoria}")
+            linhas.append(f"   {'próprio (s)':>11} {'acum. (s)':>10} {'chamadas':>10}  função")
+            funcoes = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:self.top]
+            for funcao, (_, chamadas, proprio, acumulado, _) in funcoes:
+                linhas.append(f"   {proprio:11.3f} {acumulado:10.3f} {chamadas:10d}  {nome_funcao(funcao)}")
+        return "\n".join(linhas)
+
+
+def etapa(nome: str):
+    """
+    Contexto de uma etapa: perfilada se há uma sessão de perfil ativa, senão um nullcontext.
+    """
+    if _perfilador is None:
+        return nullcontext()
+    return _perfilador.etapa(nome)
+
+
+def perfilado(nome: str):
+    """
+    Decorador: a função inteira é a etapa `nome` (sem sessão ativa, só uma checagem por chamada).
+    """
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            if _perfilador is None:
+                return funcao(*args, **kwargs)
+            with _perfilador.etapa(nome):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorador
+
+
+@contextmanager
+def sessao(ativo: bool, memoria: bool = False, top: int = TOP_FUNCOES, pasta: str = None):
+    """
+    Liga o perfil para o bloco (se `ativo`) e, no fim, grava o resumo e imprime as funções mais
+    custosas de cada etapa, também quando o bloco falha.
+    """
+    global _perfilador
+    if not ativo:
+        yield None
+        return
+    _perfilador = Perfilador(pasta, memoria, top)
+    try:
+        yield _perfilador
+    finally:
+        perfilador, _perfilador = _perfilador, None
+        if memoria:
+            tracemalloc.stop()
+        resumo = perfilador.resumo()
+        with open(os.path.join(perfilador.pasta, "resumo.txt"), "w", encoding="utf-8") as f:
+            f.write(resumo + "\n")
+        print(f"\n{resumo}")
+
+
+def adiciona_argumentos(parser):
+    parser.add_argument("--perfil", "--profile", dest="perfil", action="store_true", help=f"Perfila cada etapa (cProfile) e grava relatórios e .pstats em {PASTA_PERFIS}/<execução>.")
+    parser.add_argument("--perfil-memoria", action="store_true", help="Com --perfil, mede também as alocações de cada etapa (tracemalloc, mais lento).")
+    parser.add_argument("--perfil-top", type=int, default=TOP_FUNCOES, help=f"Funções por etapa no resumo do perfil (padrão {TOP_FUNCOES}).")
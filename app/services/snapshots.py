@@ -0,0 +1,428 @@
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from app.services import armazenamento
+
+# Snapshots em Parquet (pyarrow, opcional) de cada estágio, particionados por ano/mês de uma data
+# (pasta/ano=AAAA/mes=M/). Negócios e chamadas vêm do banco local: sem pyarrow, ou com o snapshot
+# de uma versão anterior do banco, os leitores leem o banco direto (e o CSV só sem banco). O
+# negocios-chamadas continua em CSV; com o snapshot mais velho que ele, os leitores voltam ao CSV. O marcador de conclusão guarda o esquema e, por
+# partição, um hash do conteúdo (ou, nos montados do banco, o número de linhas): a gravação
+# seguinte só reescreve as partições que mudaram.
+PASTA_PARQUET = "data/atualizado/parquet"
+FORMATO_DATA = "%Y-%m-%d %H:%M"
+COLUNAS_PARTICAO = ["ano", "mes"]
+ARQUIVO_CONCLUIDO = "_concluido.json"
+
+# Colunas de data: as que começam com um destes prefixos (datetime64); categorias: texto repetitivo.
+# Os datasets com "tipo" são montados direto da tabela do armazenamento, uma partição por vez: o
+# esquema deles é declarado (as colunas de "numericas" com o tipo dado, o resto texto), não
+# inferido dos valores, para que partições gravadas em momentos diferentes tenham o mesmo esquema.
+DATASETS = {
+    "negocios": {
+        "csv": armazenamento.CAMINHO_NEGOCIOS,
+        "tipo": "negocios",
+        "particao": "Data de criação",
+        "prefixos_data": ("Data de criação", "Última modificação", "Date entered "),
+        "categorias": [
+            "Etapa do negócio", "Proprietário do negócio", "Momento de Compra", "status_cadastro",
+            "Foi conectado", "Motivo de Perda", "Sub-motivo de perda do negócio",
+        ],
+        "numericas": {"ID do registro.": "Int64"},
+    },
+    "chamadas": {
+        "csv": armazenamento.CAMINHO_CHAMADAS_RESUMO,
+        "tipo": "chamadas",
+        "particao": "Data da atividade",
+        "prefixos_data": ("Data da atividade",),
+        "categorias": ["Atividade atribuída a", "Resultado da chamada"],
+        "numericas": {"ID do objeto": "float64", "Associated Deal IDs": "float64"},
+    },
+    "negocios-chamadas": {
+        "csv": "data/atualizado/negocios-chamadas",
+        "particao": "Data de criação",
+        "prefixos_data": ("Data de criação", "Data da atividade"),
+        "categorias": ["Momento de Compra", "Atividade atribuída a", "Horário da atividade"],
+    },
+}
+
+_AVISO_MOSTRADO = []
+
+
+def disponivel() -> bool:
+    if importlib.util.find_spec("pyarrow") is not None:
+        return True
+    if not _AVISO_MOSTRADO:
+        print("⚠️  pyarrow não instalado: snapshots Parquet desativados, leitura pelos CSVs.")
+        _AVISO_MOSTRADO.append(True)
+    return False
+
+
+def caminho_dataset(nome: str) -> str:
+    return os.path.join(PASTA_PARQUET, nome)
+
+
+def tipa_colunas(nome: str, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Datas (texto AAAA-MM-DD HH:MM) para datetime64 e colunas repetitivas para category. Nos
+    datasets de esquema declarado, as colunas numéricas viram o tipo declarado (valor inválido
+    vira NaN) e as outras, texto (vazio vira NaN). Nos demais, colunas de objetos misturados (ex.:
+    "Lead Time (min)" com números e "") seguem a regra do read_csv: número se todos os valores
+    preenchidos forem números (vazio vira NaN), texto caso contrário.
+    """
+    config = DATASETS[nome]
+    numericas = config.get("numericas")
+    tipos = {}
+    for coluna in df.columns:
+        if coluna.startswith(config["prefixos_data"]):
+            if not pd.api.types.is_datetime64_any_dtype(df[coluna]):
+                tipos[coluna] = pd.to_datetime(df[coluna], format=FORMATO_DATA, errors="coerce")
+        elif coluna in config["categorias"]:
+            tipos[coluna] = df[coluna].mask(df[coluna] == "").astype("category")
+        elif numericas is not None:
+            valores = df[coluna].mask(df[coluna] == "")
+            if coluna in numericas:
+                tipos[coluna] = pd.to_numeric(valores, errors="coerce").astype(numericas[coluna])
+            else:
+                tipos[coluna] = valores.map(lambda valor: valor if pd.isna(valor) else str(valor))
+        elif df[coluna].dtype == object:
+            valores = df[coluna].mask(df[coluna] == "")
+            try:
+                tipos[coluna] = pd.to_numeric(valores)
+            except (ValueError, TypeError):
+                tipos[coluna] = valores.map(lambda valor: valor if pd.isna(valor) else str(valor))
+    return df.assign(**tipos)
+
+
+def esquema_declarado(nome: str, colunas: list):
+    """
+    Esquema Arrow de um dataset de esquema declarado com estas colunas (mais ano/mês da partição).
+    """
+    import pyarrow as pa
+
+    config = DATASETS[nome]
+    campos = []
+    for coluna in colunas:
+        if coluna.startswith(config["prefixos_data"]):
+            tipo = pa.timestamp("ns")
+        elif coluna in config["categorias"]:
+            tipo = pa.dictionary(pa.int32(), pa.string())
+        elif coluna in config["numericas"]:
+            tipo_pandas = pd.api.types.pandas_dtype(config["numericas"][coluna])
+            tipo = pa.from_numpy_dtype(getattr(tipo_pandas, "numpy_dtype", tipo_pandas))
+        else:
+            tipo = pa.string()
+        campos.append(pa.field(coluna, tipo))
+    return pa.schema(campos + [pa.field("ano", pa.int16()), pa.field("mes", pa.int8())])
+
+
+def _monta_tabela(nome: str, df: pd.DataFrame):
+    """
+    DataFrame tipado com as colunas ano/mês da partição e a tabela Arrow dele (com o esquema
+    declarado, quando o dataset tem um).
+    """
+    import pyarrow as pa
+
+    df = tipa_colunas(nome, df.reset_index(drop=True))
+    data = df[DATASETS[nome]["particao"]]
+    df = df.assign(ano=data.dt.year.astype("Int16"), mes=data.dt.month.astype("Int8"))
+    esquema = esquema_declarado(nome, list(df.columns[:-2])) if "numericas" in DATASETS[nome] else None
+    return df, pa.Table.from_pandas(df, schema=esquema, preserve_index=False)
+
+
+def _assinatura(esquema) -> str:
+    return hashlib.sha1(str(esquema.remove_metadata()).encode("utf-8")).hexdigest()
+
+
+def _pasta_particao(ano, mes) -> str:
+    # Mesmo nome que o pyarrow dá às partições (data vazia vai para a partição nula do Hive)
+    return "/".join(
+        f"{coluna}={'__HIVE_DEFAULT_PARTITION__' if pd.isna(valor) else int(valor)}"
+        for coluna, valor in zip(COLUNAS_PARTICAO, (ano, mes))
+    )
+
+
+def _hashes_particoes(df: pd.DataFrame) -> dict:
+    """
+    Pasta de cada partição → (posições das linhas, hash das linhas na ordem em que são gravadas).
+    """
+    linhas = pd.util.hash_pandas_object(df.drop(columns=COLUNAS_PARTICAO), index=False).to_numpy()
+    return {
+        _pasta_particao(*chave): (indices, hashlib.sha1(linhas[indices].tobytes()).hexdigest())
+        for chave, indices in df.groupby(COLUNAS_PARTICAO, dropna=False, sort=False).indices.items()
+    }
+
+
+def _le_marcador(destino: str) -> dict:
+    try:
+        with open(os.path.join(destino, ARQUIVO_CONCLUIDO), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _remove_particao(destino: str, pasta: str):
+    """
+    Apaga a pasta da partição e a do ano, se ela ficar vazia.
+    """
+    shutil.rmtree(os.path.join(destino, pasta), ignore_errors=True)
+    pasta_ano = os.path.dirname(os.path.join(destino, pasta))
+    if os.path.isdir(pasta_ano) and not os.listdir(pasta_ano):
+        os.rmdir(pasta_ano)
+
+
+def _troca_pasta(origem: str, destino: str):
+    """
+    Põe origem no lugar de destino (a pasta antiga é apagada só depois da troca).
+    """
+    antigo = None
+    if os.path.exists(destino):
+        antigo = tempfile.mkdtemp(dir=PASTA_PARQUET, prefix=".antigo.")
+        os.rmdir(antigo)
+        os.replace(destino, antigo)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    os.replace(origem, destino)
+    if antigo:
+        shutil.rmtree(antigo, ignore_errors=True)
+
+
+def salva_dataset(nome: str, df: pd.DataFrame) -> bool:
+    """
+    Grava o snapshot do estágio, particionado por ano/mês de DATASETS[nome]["particao"] (datas
+    vazias ficam na partição nula). Com o mesmo esquema do snapshot anterior, só as partições cujo
+    conteúdo mudou são regravadas (cada uma trocada inteira) e as que ficaram vazias são apagadas;
+    o marcador sai antes e volta no fim, então durante a troca os leitores usam o CSV. Sem snapshot
+    anterior ou com esquema diferente, o dataset inteiro é montado ao lado e trocado no final.
+    Retorna False se o pyarrow não estiver instalado.
+    """
+    if not disponivel():
+        return False
+    import pyarrow.parquet as pq
+
+    # Uma tabela só para todas as partições: o mesmo esquema em todos os arquivos do dataset
+    df, tabela = _monta_tabela(nome, df)
+    esquema = _assinatura(tabela.schema)
+    particoes = _hashes_particoes(df)
+
+    destino = caminho_dataset(nome)
+    anterior = _le_marcador(destino)
+    if anterior.get("esquema") == esquema and "particoes" in anterior:
+        alteradas = [pasta for pasta, (_, hash_linhas) in particoes.items() if anterior["particoes"].get(pasta) != hash_linhas]
+        removidas = [pasta for pasta in anterior["particoes"] if pasta not in particoes]
+    else:
+        alteradas, removidas = None, []
+
+    os.makedirs(PASTA_PARQUET, exist_ok=True)
+    pasta_tmp = tempfile.mkdtemp(dir=PASTA_PARQUET, prefix=f".{nome}.")
+    try:
+        if alteradas is None:
+            pq.write_to_dataset(tabela, pasta_tmp, partition_cols=COLUNAS_PARTICAO)
+        else:
+            os.remove(os.path.join(destino, ARQUIVO_CONCLUIDO))
+            if alteradas:
+                indices = np.sort(np.concatenate([particoes[pasta][0] for pasta in alteradas]))
+                pq.write_to_dataset(tabela.take(indices), pasta_tmp, partition_cols=COLUNAS_PARTICAO)
+            for pasta in alteradas:
+                _troca_pasta(os.path.join(pasta_tmp, pasta), os.path.join(destino, pasta))
+            for pasta in removidas:
+                _remove_particao(destino, pasta)
+
+        marcador = {
+            "linhas": len(df),
+            "gerado_em": datetime.now().isoformat(timespec="seconds"),
+            "esquema": esquema,
+            "particoes": {pasta: hash_linhas for pasta, (_, hash_linhas) in particoes.items()},
+        }
+        with open(os.path.join(pasta_tmp if alteradas is None else destino, ARQUIVO_CONCLUIDO), "w", encoding="utf-8") as f:
+            json.dump(marcador, f)
+        if alteradas is None:
+            _troca_pasta(pasta_tmp, destino)
+    finally:
+        shutil.rmtree(pasta_tmp, ignore_errors=True)
+
+    if alteradas is None:
+        print(f"🗃️  Snapshot Parquet {destino} salvo com {len(df)} registros.")
+    else:
+        print(f"🗃️  Snapshot Parquet {destino} com {len(df)} registros: {len(alteradas)} de {len(particoes)} partições regravadas, {len(removidas)} removidas.")
+    return True
+
+
+def atualiza_do_banco(conn, nome: str) -> bool:
+    """
+    Snapshot de um dataset de esquema declarado lido da tabela DATASETS[nome]["tipo"] do
+    armazenamento, uma partição por vez (a consulta filtra o mês pelo índice de data), sem passar
+    pelo CSV nem ter a tabela inteira em memória. Com o mesmo esquema do snapshot anterior, só as
+    partições que o upsert marcou como pendentes são relidas e regravadas (cada uma trocada
+    inteira; as que ficaram vazias são apagadas), com o marcador fora durante a troca. Sem snapshot
+    anterior ou com esquema diferente, todas as partições são montadas ao lado e trocadas no final.
+    O marcador guarda a versão do banco lida antes das partições: o snapshot só vale enquanto ela
+    for a atual. Retorna False se o pyarrow não estiver instalado.
+    """
+    if not disponivel():
+        return False
+    import pyarrow.parquet as pq
+
+    tipo = DATASETS[nome]["tipo"]
+    colunas = armazenamento.TABELAS[tipo].get("colunas_resumo") or armazenamento.le_colunas(conn, tipo)
+    esquema = _assinatura(esquema_declarado(nome, colunas))
+    versao_banco = armazenamento.versao(conn, tipo)
+    pendentes = armazenamento.le_particoes_pendentes(conn, tipo)
+
+    destino = caminho_dataset(nome)
+    anterior = _le_marcador(destino)
+    completo = anterior.get("esquema") != esquema or "linhas_particoes" not in anterior
+    if not completo and not pendentes and anterior.get("versao_banco") == versao_banco:
+        return True
+    linhas_particoes = {} if completo else dict(anterior["linhas_particoes"])
+    meses = armazenamento.particoes(conn, tipo) if completo else pendentes
+
+    os.makedirs(PASTA_PARQUET, exist_ok=True)
+    pasta_tmp = tempfile.mkdtemp(dir=PASTA_PARQUET, prefix=f".{nome}.")
+    try:
+        if not completo and meses:
+            os.remove(os.path.join(destino, ARQUIVO_CONCLUIDO))
+        for mes in meses:
+            pasta = _pasta_particao(*(mes.split("-") if mes else (None, None)))
+            linhas = list(armazenamento.itera_linhas(conn, tipo, colunas, particao=mes))
+            if linhas:
+                _, tabela = _monta_tabela(nome, pd.DataFrame(linhas, columns=colunas, dtype=object))
+                pq.write_to_dataset(tabela, pasta_tmp, partition_cols=COLUNAS_PARTICAO)
+                linhas_particoes[pasta] = len(linhas)
+            else:
+                linhas_particoes.pop(pasta, None)
+            if not completo:
+                if linhas:
+                    _troca_pasta(os.path.join(pasta_tmp, pasta), os.path.join(destino, pasta))
+                else:
+                    _remove_particao(destino, pasta)
+
+        marcador = {
+            "linhas": sum(linhas_particoes.values()),
+            "gerado_em": datetime.now().isoformat(timespec="seconds"),
+            "esquema": esquema,
+            "versao_banco": versao_banco,
+            "linhas_particoes": linhas_particoes,
+        }
+        with open(os.path.join(pasta_tmp if completo else destino, ARQUIVO_CONCLUIDO), "w", encoding="utf-8") as f:
+            json.dump(marcador, f)
+        if completo:
+            _troca_pasta(pasta_tmp, destino)
+    finally:
+        shutil.rmtree(pasta_tmp, ignore_errors=True)
+    armazenamento.limpa_particoes_pendentes(conn, tipo, pendentes)
+
+    if completo:
+        print(f"🗃️  Snapshot Parquet {destino} salvo com {marcador['linhas']} registros.")
+    else:
+        print(f"🗃️  Snapshot Parquet {destino} com {marcador['linhas']} registros: {len(meses)} de {len(linhas_particoes)} partições relidas do banco.")
+    return True
+
+
+def atualiza_snapshot(nome: str, caminho_csv: str = None) -> bool:
+    """
+    Snapshot a partir do CSV do estágio (mesma inferência de tipos de quem lia o CSV), lido uma
+    vez aqui para que os estágios seguintes não precisem reler o texto.
+    """
+    if not disponivel():
+        return False
+    caminho_csv = caminho_csv or DATASETS[nome]["csv"]
+    if "numericas" in DATASETS[nome]:
+        # Esquema declarado: os valores entram como texto, como vêm do banco
+        return salva_dataset(nome, pd.read_csv(caminho_csv, dtype=str, keep_default_na=False))
+    return salva_dataset(nome, pd.read_csv(caminho_csv))
+
+
+def atualizado(nome: str, caminho_csv: str = None) -> bool:
+    """
+    O snapshot existe, foi gravado até o fim e está em dia com a fonte: nos datasets montados do
+    banco, foi gravado na versão atual do tipo; nos demais (ou sem banco), não é mais velho que o
+    CSV do mesmo estágio.
+    """
+    marcador = _le_marcador(caminho_dataset(nome))
+    if not marcador:
+        return False
+    if "tipo" in DATASETS[nome] and os.path.exists(armazenamento.CAMINHO_BANCO):
+        conn = armazenamento.conecta()
+        try:
+            return marcador.get("versao_banco") == armazenamento.versao(conn, DATASETS[nome]["tipo"])
+        finally:
+            conn.close()
+    caminho_csv = caminho_csv or DATASETS[nome]["csv"]
+    caminho_marcador = os.path.join(caminho_dataset(nome), ARQUIVO_CONCLUIDO)
+    return not os.path.exists(caminho_csv) or os.path.getmtime(caminho_csv) <= os.path.getmtime(caminho_marcador)
+
+
+def le_banco(nome: str, colunas: list = None, ano: int = None):
+    """
+    As colunas pedidas direto da tabela do armazenamento de um dataset montado do banco, como um
+    read_csv(dtype=str) do CSV do tipo: tudo texto, vazio vira NaN. Com `ano`, só as linhas
+    daquele ano, pelo índice de data. Retorna None se o banco ainda não existe ou não tem
+    registros do tipo.
+    """
+    if not os.path.exists(armazenamento.CAMINHO_BANCO):
+        return None
+    tipo = DATASETS[nome]["tipo"]
+    conn = armazenamento.conecta()
+    try:
+        if armazenamento.esta_vazio(conn, tipo):
+            return None
+        existentes = armazenamento.TABELAS[tipo].get("colunas_resumo") or armazenamento.le_colunas(conn, tipo)
+        colunas = [coluna for coluna in colunas if coluna in existentes] if colunas is not None else existentes
+        prefixo = None if ano is None else f"{int(ano):04}"
+        linhas = list(armazenamento.itera_linhas(conn, tipo, colunas, particao=prefixo))
+    finally:
+        conn.close()
+    df = pd.DataFrame(linhas, columns=colunas, dtype=object)
+    return df.mask(df == "")
+
+
+def le_dataset(nome: str, colunas: list = None, filtros: list = None, caminho_csv: str = None):
+    """
+    Lê só as colunas pedidas (as que existirem no snapshot) das partições que passam nos filtros
+    (ex.: [("ano", "=", 2025)]). Retorna None se o snapshot não puder ser usado; quem chama então
+    lê o banco (le_banco) ou o CSV.
+    """
+    if not disponivel() or not atualizado(nome, caminho_csv):
+        return None
+    if colunas is not None:
+        import pyarrow.dataset
+
+        existentes = set(pyarrow.dataset.dataset(caminho_dataset(nome), format="parquet", partitioning="hive").schema.names)
+        colunas = [coluna for coluna in colunas if coluna in existentes]
+    df = pd.read_parquet(caminho_dataset(nome), engine="pyarrow", columns=colunas, filters=filtros)
+    return df.drop(columns=[coluna for coluna in COLUNAS_PARTICAO if coluna in df.columns and coluna not in (colunas or [])])
+
+
+def data_como_texto(coluna: pd.Series) -> pd.Series:
+    """
+    Volta uma coluna de data do snapshot para o texto do CSV (AAAA-MM-DD HH:MM; vazia vira NaN).
+    """
+    # datetime_as_string em vez de dt.strftime (formata linha a linha em Python, ~15x mais lento)
+    if coluna.empty:
+        return pd.Series([], index=coluna.index, name=coluna.name, dtype=object)
+    vazias = coluna.isna().to_numpy()
+    textos = np.datetime_as_string(coluna.to_numpy(dtype="datetime64[m]"), unit="m")
+    textos = np.char.replace(textos, "T", " ").astype(object)
+    textos[vazias] = np.nan
+    return pd.Series(textos, index=coluna.index, name=coluna.name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera os snapshots Parquet a partir dos CSVs atuais.")
+    parser.add_argument("nomes", nargs="*", help=f"Datasets: {', '.join(DATASETS)} (padrão: todos).")
+    args = parser.parse_args()
+    invalidos = [nome for nome in args.nomes if nome not in DATASETS]
+    if invalidos:
+        parser.error(f"dataset inválido: {', '.join(invalidos)}")
+    for nome in args.nomes or list(DATASETS):
+        if os.path.exists(DATASETS[nome]["csv"]):
+            atualiza_snapshot(nome)
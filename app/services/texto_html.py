@@ -0,0 +1,133 @@
+import re
+from html.entities import html5
+from html.parser import HTMLParser
+
+# Mesma tabela de entidades nomeadas que o BeautifulSoup usa (nomes sem ";", primeira ocorrência vence)
+ENTIDADES = {}
+for _nome, _caractere in sorted(html5.items()):
+    ENTIDADES.setdefault(_nome[:-1] if _nome.endswith(";") else _nome, _caractere)
+
+# Tags cujo texto o get_text() do BeautifulSoup ignora (script, style, template, rt, rp)
+TAGS_SEM_TEXTO = {"script", "style", "template", "rt", "rp"}
+
+# Elementos vazios do HTML: o BeautifulSoup fecha na abertura e ignora um fechamento explícito depois
+TAGS_VAZIAS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link", "menuitem", "meta",
+    "param", "source", "track", "wbr", "basefont", "bgsound", "command", "frame", "image", "isindex",
+    "nextid", "spacer",
+}
+
+MINUSCULA_MAIUSCULA = re.compile(r'(?<=[a-z])(?=[A-Z])')
+
+
+class ExtratorTexto(HTMLParser):
+    """
+    Tokenizador em streaming que reproduz o texto de
+    BeautifulSoup(html, "html.parser").get_text(separator='', strip=True), sem montar a árvore.
+
+    Cada trecho de texto entre dois eventos de tag/comentário/declaração é um "string" do
+    BeautifulSoup: entra no resultado sem espaços nas pontas, e some se ficar vazio ou se estiver
+    dentro de uma tag de TAGS_SEM_TEXTO. Comentários, doctype e instruções de processamento não
+    entram; CDATA entra. Um <br/> depois de um <br> sem fechamento fica aberto na árvore do
+    BeautifulSoup e o replace_with("\n") da versão antiga levava junto o texto dentro dele, por
+    isso texto dentro de um <br> aberto também é descartado.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.partes = []
+        self.trecho = []
+        self.pilha = []
+        self.ja_fechadas = []
+
+    def _fecha_trecho(self, conta: bool = True):
+        if not self.trecho:
+            return
+        texto = "".join(self.trecho).strip()
+        self.trecho = []
+        if texto and conta:
+            self.partes.append(texto)
+
+    def _dentro_de_tag_sem_texto(self) -> bool:
+        return any(nome in TAGS_SEM_TEXTO or nome == "br" for nome in self.pilha)
+
+    def _fecha_tag(self, nome: str):
+        self._fecha_trecho(not self._dentro_de_tag_sem_texto())
+        if nome in self.pilha:
+            posicao = len(self.pilha) - 1 - self.pilha[::-1].index(nome)
+            del self.pilha[posicao:]
+
+    def handle_starttag(self, tag, attrs, fecha_vazia=True):
+        self._fecha_trecho(not self._dentro_de_tag_sem_texto())
+        self.pilha.append(tag)
+        if tag in TAGS_VAZIAS and fecha_vazia:
+            self._fecha_tag(tag)
+            self.ja_fechadas.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs, fecha_vazia=False)
+        self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self.ja_fechadas:
+            self.ja_fechadas.remove(tag)
+        else:
+            self._fecha_tag(tag)
+
+    def handle_data(self, data):
+        self.trecho.append(data)
+
+    def handle_charref(self, name):
+        if name[0] in "xX":
+            codigo = int(name.lstrip(name[0]), 16)
+        else:
+            codigo = int(name)
+
+        data = None
+        if codigo < 256:
+            # Referências numéricas < 256 são lidas como windows-1252 (ex.: &#147; → “)
+            try:
+                data = bytearray([codigo]).decode("windows-1252")
+            except UnicodeDecodeError:
+                pass
+        if not data:
+            try:
+                data = chr(codigo)
+            except (ValueError, OverflowError):
+                pass
+        self.trecho.append(data or "\N{REPLACEMENT CHARACTER}")
+
+    def handle_entityref(self, name):
+        self.trecho.append(ENTIDADES.get(name, f"&{name}"))
+
+    # Comentários, doctype e instruções de processamento só encerram o trecho atual
+    def handle_comment(self, data):
+        self._fecha_trecho(not self._dentro_de_tag_sem_texto())
+
+    def handle_decl(self, data):
+        self._fecha_trecho(not self._dentro_de_tag_sem_texto())
+
+    def handle_pi(self, data):
+        self._fecha_trecho(not self._dentro_de_tag_sem_texto())
+
+    def unknown_decl(self, data):
+        self._fecha_trecho(not self._dentro_de_tag_sem_texto())
+        if data.upper().startswith("CDATA["):
+            self.trecho = [data[len("CDATA["):]]
+            self._fecha_trecho("br" not in self.pilha)
+
+    def texto(self) -> str:
+        self.close()
+        self._fecha_trecho(not self._dentro_de_tag_sem_texto())
+        return "".join(self.partes)
+
+
+def html_para_texto(html: str) -> str:
+    """
+    Remove as tags e junta os trechos de texto (sem espaços nas pontas), quebrando linha entre
+    letra minúscula seguida de maiúscula. Mesmo resultado da antiga versão com BeautifulSoup.
+    """
+    extrator = ExtratorTexto()
+    extrator.feed(html)
+    texto = extrator.texto()
+    return MINUSCULA_MAIUSCULA.sub('\n', texto).strip()
@@ -0,0 +1,144 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.api import exportar_para_sheets as sheets
+
+
+def monta_novas_linhas_por_linha(df_csv: pd.DataFrame, df_sheets: pd.DataFrame) -> list:
+    """
+    Montagem anterior (referência): um filtro no CSV inteiro para cada ID novo.
+    """
+    df_csv = df_csv.sort_values(by=["Data de criação", "ID do registro."], ascending=True)
+    df_sheets["ID do registro."] = df_sheets["ID do registro."].astype(str).str.split('.').str[0]
+    df_csv["ID do registro."] = df_csv["ID do registro."].astype(str).str.split('.').str[0]
+    ids_sheets = set(df_sheets["ID do registro."])
+    novos_ids = [id_ for id_ in df_csv["ID do registro."] if id_ not in ids_sheets]
+    novas_linhas = []
+    for id_ in novos_ids:
+        linha_csv = df_csv[df_csv["ID do registro."] == id_].iloc[0]
+        nova_linha = [
+            linha_csv.get("ID do registro.", ""),
+            linha_csv.get("Nome do negócio", ""),
+            linha_csv.get("Etapa do negócio", ""),
+            linha_csv.get("Data de criação", "").strftime("%Y-%m-%d %H:%M") if pd.notna(linha_csv.get("Data de criação", "")) else "",
+            "", "",
+            linha_csv.get("status_cadastro", ""),
+            linha_csv.get("Momento de Compra", ""),
+            linha_csv.get("Proprietário do negócio", ""),
+            "", "", "",
+        ]
+        novas_linhas.append(sheets.clean_row(nova_linha))
+    novas_linhas.reverse()
+    return novas_linhas
+
+
+def aplica_lead_times_por_linha(df_sheets: pd.DataFrame, df_csv: pd.DataFrame) -> pd.DataFrame:
+    """
+    Atualização anterior (referência): dicionário montado com iterrows e escrita célula a célula.
+    """
+    df_sheets["ID do registro."] = df_sheets["ID do registro."].astype(str).str.split('.').str[0]
+    df_csv["Associated Deal IDs"] = df_csv["Associated Deal IDs"].astype(str).str.split('.').str[0]
+    lookup = {
+        str(row["Associated Deal IDs"]): {
+            "Lead time (min)": row.get("Lead Time (min)", ""),
+            "Data da atividade": row.get("Data da atividade", ""),
+        }
+        for _, row in df_csv.iterrows()
+    }
+    for idx, row in df_sheets.iterrows():
+        id_ = str(row["ID do registro."]).split('.')[0]
+        if id_ in lookup:
+            info = lookup[id_]
+            df_sheets.at[idx, "Lead time (min)"] = info.get("Lead time (min)", "")
+            df_sheets.at[idx, "Data da primeira chamada"] = info.get("Data da atividade", "")
+    return df_sheets
+
+
+def datas(rng: np.random.Generator, total: int) -> np.ndarray:
+    minutos = rng.integers(0, 365 * 1440, total)
+    return np.datetime64("2025-01-01T00:00", "m") + minutos
+
+
+def gera_dados(total: int, fracao_novos: float, semente: int) -> tuple:
+    """
+    Negócios do ano (como le_negocios_do_ano devolve), a aba atual sem os negócios novos (como o
+    get_all_records devolve) e o lead time por negócio (como le_lead_times devolve).
+    """
+    rng = np.random.default_rng(semente)
+    ids = rng.permutation(total) + 10**10
+    criacao = pd.Series(datas(rng, total)).astype("datetime64[ns]")
+    criacao[rng.random(total) < 0.01] = pd.NaT
+    df_negocios = pd.DataFrame({
+        "ID do registro.": ids,
+        "Nome do negócio": [f"Cliente {i}" for i in ids],
+        "Etapa do negócio": np.array(["Fila de atendimento", "FUP docs", "Ganho"], dtype=object)[rng.integers(0, 3, total)],
+        "Data de criação": criacao,
+        "status_cadastro": np.array(["completo", "incompleto", np.nan], dtype=object)[rng.integers(0, 3, total)],
+        "Momento de Compra": np.array(["Imediato", "Até 3 meses", np.nan], dtype=object)[rng.integers(0, 3, total)],
+        "Proprietário do negócio": np.array(["Ana", "Bia", "Caio"], dtype=object)[rng.integers(0, 3, total)],
+    })
+
+    na_planilha = rng.random(total) >= fracao_novos
+    linhas = df_negocios[na_planilha]
+    df_sheets = pd.DataFrame({
+        "ID do registro.": linhas["ID do registro."].to_numpy(),
+        "Nome do negócio": linhas["Nome do negócio"].to_numpy(),
+        "Etapa do negócio": linhas["Etapa do negócio"].to_numpy(),
+        "Data de criação": linhas["Data de criação"].dt.strftime("%Y-%m-%d %H:%M").fillna("").to_numpy(),
+        "Semana de criação": "", "Mês de criação": "",
+        "status_cadastro": linhas["status_cadastro"].fillna("").to_numpy(),
+        "Momento de Compra": linhas["Momento de Compra"].fillna("").to_numpy(),
+        "Proprietário do negócio": linhas["Proprietário do negócio"].to_numpy(),
+        "Horário Comercial": "", "Data da primeira chamada": "", "Lead time (min)": "",
+    }, dtype=object)
+
+    com_chamada = df_negocios["ID do registro."][rng.random(total) < 0.8].to_numpy()
+    lead_time = rng.integers(0, 5000, len(com_chamada)).astype(float)
+    lead_time[rng.random(len(com_chamada)) < 0.05] = np.nan
+    df_lead = pd.DataFrame({
+        "Associated Deal IDs": com_chamada.astype(float),
+        "Lead Time (min)": lead_time,
+        "Data da atividade": np.char.replace(np.datetime_as_string(datas(rng, len(com_chamada)), unit="m"), "T", " ").astype(object),
+    })
+    return df_negocios, df_sheets, df_lead
+
+
+def mede(funcao, *entradas) -> tuple:
+    copias = [entrada.copy() for entrada in entradas]
+    inicio = time.perf_counter()
+    resultado = funcao(*copias)
+    return time.perf_counter() - inicio, resultado
+
+
+def como_planilha(df: pd.DataFrame) -> list:
+    df = df.replace([np.inf, -np.inf], np.nan).fillna('')
+    return [df.columns.tolist()] + df.values.tolist()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara a montagem das linhas novas e do lead time da planilha por junção com a versão linha a linha.")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 50_000, 100_000])
+    parser.add_argument("--fracao-novos", type=float, default=0.05, help="Fração dos negócios do CSV ainda fora da planilha.")
+    parser.add_argument("--limite-referencia", type=int, default=100_000, help="Acima disso a versão linha a linha não é medida.")
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    for total in args.tamanhos:
+        df_negocios, df_sheets, df_lead = gera_dados(total, args.fracao_novos, args.semente)
+        tempo_insere, novas = mede(sheets.monta_novas_linhas, df_negocios, df_sheets)
+        tempo_lead, atualizada = mede(sheets.aplica_lead_times, df_sheets, df_lead)
+        linha = f"⏱️  {total} negócios ({len(novas)} novos) — novas linhas: {tempo_insere:.3f}s | lead time: {tempo_lead:.3f}s"
+
+        if total <= args.limite_referencia:
+            tempo_insere_ref, novas_ref = mede(monta_novas_linhas_por_linha, df_negocios, df_sheets)
+            tempo_lead_ref, atualizada_ref = mede(aplica_lead_times_por_linha, df_sheets, df_lead)
+            if novas != novas_ref:
+                raise SystemExit(f"❌ {total}: linhas novas diferentes da versão linha a linha.")
+            if como_planilha(atualizada) != como_planilha(atualizada_ref):
+                raise SystemExit(f"❌ {total}: lead times diferentes da versão linha a linha.")
+            linha += f" (linha a linha: {tempo_insere_ref:.2f}s | {tempo_lead_ref:.2f}s)"
+        print(linha)
+    print("✅ Mesmas linhas novas e mesmos lead times da versão linha a linha.")
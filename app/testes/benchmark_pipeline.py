@@ -0,0 +1,174 @@
+import argparse
+import contextlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from app.api import atualizar_negocios_chamadas as atualizar
+from app.api import escritor_sheets
+from app.api import exportar_para_sheets as sheets
+from app.services.limitador import BaldeDeTokens
+from app.services import armazenamento, metricas
+from app.services import merge_negocios_chamadas as merge
+from app.testes.dados_hubspot import PortalSintetico
+from app.testes.planilha_falsa import PlanilhaFalsa
+from app.testes.verifica_etapas_puladas import CABECALHO
+from app.testes.verifica_pipeline_paralelo import RespostaHubSpotFalsa, redireciona_arquivos
+
+INTERVALO_AMOSTRAS = 0.01  # segundos entre leituras do RSS durante uma etapa
+
+
+def rss_atual_mb():
+    """
+    Memória residente do processo agora, em MB (/proc/self/statm); None fora do Linux.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            paginas = int(f.read().split()[1])
+    except OSError:
+        return None
+    return paginas * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+class AmostradorMemoria:
+    """
+    Pico de RSS durante um bloco, lido por uma thread a cada INTERVALO_AMOSTRAS (o ru_maxrss só
+    guarda o pico do processo inteiro, que depois da primeira etapa grande não muda mais).
+    """
+
+    def __init__(self):
+        self.inicio = self.pico = rss_atual_mb()
+        self.parar = threading.Event()
+        self.thread = threading.Thread(target=self._amostra, daemon=True)
+
+    def _amostra(self):
+        while not self.parar.wait(INTERVALO_AMOSTRAS):
+            self.pico = max(self.pico, rss_atual_mb())
+
+    def __enter__(self):
+        if self.inicio is not None:
+            self.thread.start()
+        return self
+
+    def __exit__(self, *erro):
+        if self.inicio is None:
+            self.pico = metricas.rss_pico_mb()
+            return
+        self.parar.set()
+        self.thread.join()
+        self.pico = max(self.pico, rss_atual_mb())
+
+
+def prepara_portal(pasta: str, portal: PortalSintetico, latencia_api: float) -> PlanilhaFalsa:
+    """
+    Pipeline gravando em `pasta`, buscando no portal sintético e escrevendo numa aba falsa (sem
+    a cota de escritas do Sheets, que mediria só a espera).
+    """
+    redireciona_arquivos(pasta)
+    tipos = {atualizar.NEGOCIOS_URL: "negocios", atualizar.CHAMADAS_URL: "chamadas"}
+
+    def post(url: str, json: dict, **kwargs) -> RespostaHubSpotFalsa:
+        time.sleep(latencia_api)
+        return RespostaHubSpotFalsa(portal.busca(tipos[url.removesuffix("/search")], json))
+
+    planilha = PlanilhaFalsa([CABECALHO, ["1", "Negócio antigo", "Ganho", "2025-01-02 10:00"] + [""] * 8])
+    atualizar.cliente_hubspot.post = post
+    sheets.abre_aba = lambda: planilha
+    escritor_sheets.balde_escritas = BaldeDeTokens(10_000, 10_000)
+    return planilha
+
+
+def exporta():
+    worksheet, df_sheets = sheets.prepara_planilha()
+    sheets.atualiza_planilha(worksheet, df_sheets)
+
+
+def mede_etapa(nome: str, funcao, registros: int) -> dict:
+    metricas.zera()
+    with open(os.devnull, "w") as silencio, contextlib.redirect_stdout(silencio), AmostradorMemoria() as memoria:
+        inicio = time.perf_counter()
+        funcao()
+        tempo = time.perf_counter() - inicio
+
+    # Na ingestão, o tempo de gerar as páginas (a "rede" do portal sintético) fica de fora da vazão do pipeline
+    coleta = sum(valores.get("tempo_s", 0) for etapa, valores in metricas.etapas().items() if etapa.startswith("coleta_"))
+    resultado = {
+        "etapa": nome,
+        "registros": registros,
+        "tempo_s": round(tempo, 3),
+        "registros_por_s": round(registros / tempo) if tempo else None,
+        "rss_inicio_mb": round(memoria.inicio, 1) if memoria.inicio is not None else None,
+        "rss_pico_mb": round(memoria.pico, 1) if memoria.pico is not None else None,
+    }
+    if coleta:
+        resultado["coleta_s"] = round(coleta, 3)
+        resultado["registros_por_s_sem_coleta"] = round(registros / max(tempo - coleta, 1e-9))
+    return resultado
+
+
+def conta_linhas(tipo: str) -> int:
+    conn = armazenamento.conecta()
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {tipo}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def executa(negocios: int, chamadas: int, semente: int, latencia_api: float, fatiado: bool) -> list:
+    portal = PortalSintetico(negocios, chamadas, semente)
+    pasta = tempfile.mkdtemp(prefix=f"benchmark_{negocios + chamadas}_")
+    planilha = prepara_portal(pasta, portal, latencia_api)
+    desde = portal.inicio.isoformat() if fatiado else None
+
+    resultados = [
+        mede_etapa("ingestao_negocios", lambda: atualizar.sincroniza("negocios", desde=desde), negocios),
+        mede_etapa("ingestao_chamadas", lambda: atualizar.sincroniza("chamadas", desde=desde), chamadas),
+        mede_etapa("merge", merge.main, negocios),
+        mede_etapa("exportacao", exporta, negocios),
+    ]
+
+    problemas = []
+    if conta_linhas("negocios") != negocios:
+        problemas.append(f"banco com {conta_linhas('negocios')} negócios")
+    if conta_linhas("chamadas") != chamadas:
+        problemas.append(f"banco com {conta_linhas('chamadas')} chamadas")
+    if len(planilha.linhas) != negocios + 2:
+        problemas.append(f"aba com {len(planilha.linhas) - 2} negócios novos")
+    if problemas:
+        raise SystemExit(f"❌ {negocios + chamadas} registros: {'; '.join(problemas)} (esperado {negocios} negócios e {chamadas} chamadas).")
+    return resultados
+
+
+def imprime(total: int, resultados: list):
+    print(f"\n📊 {total} registros")
+    print(f"   {'etapa':<18} {'registros':>10} {'tempo (s)':>10} {'reg/s':>10} {'reg/s s/ API':>13} {'RSS início':>11} {'RSS pico':>9}")
+    for r in resultados:
+        sem_coleta = r.get("registros_por_s_sem_coleta", "")
+        print(
+            f"   {r['etapa']:<18} {r['registros']:>10} {r['tempo_s']:>10.2f} {r['registros_por_s'] or 0:>10} {sem_coleta:>13} "
+            f"{r['rss_inicio_mb'] or 0:>8.0f} MB {r['rss_pico_mb'] or 0:>6.0f} MB"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de ponta a ponta (ingestão, merge e exportação) contra um portal HubSpot sintético e uma aba falsa, sem rede.")
+    parser.add_argument("--registros", type=int, nargs="+", default=[10_000], help="Tamanhos (negócios + chamadas) a medir, ex.: 10000 100000 1000000.")
+    parser.add_argument("--chamadas-por-negocio", type=float, default=3.0)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--latencia-api", type=float, default=0.0, help="Segundos por página da busca.")
+    parser.add_argument("--fatiado", action="store_true", help="Ingestão pela busca fatiada do backfill (--desde) em vez da incremental.")
+    parser.add_argument("--saida", help="Acrescenta os resultados como linhas JSON neste arquivo.")
+    args = parser.parse_args()
+
+    for total in args.registros:
+        negocios = max(1, round(total / (1 + args.chamadas_por_negocio)))
+        resultados = executa(negocios, total - negocios, args.semente, args.latencia_api, args.fatiado)
+        imprime(total, resultados)
+        if args.saida:
+            with open(args.saida, "a", encoding="utf-8") as f:
+                for resultado in resultados:
+                    f.write(json.dumps({"total": total, "semente": args.semente, "fatiado": args.fatiado, **resultado}) + "\n")
+
+    print(f"\n✅ Pipeline completo medido em {len(args.registros)} tamanho(s), com banco e aba conferidos.")
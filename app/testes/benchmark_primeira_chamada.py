@@ -0,0 +1,109 @@
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.services.merge_negocios_chamadas import COLUNAS_CHAMADAS, le_chamadas, prepara_merge
+
+
+def prepara_merge_por_ordem_do_arquivo(df_chamadas: pd.DataFrame) -> pd.DataFrame:
+    """
+    Seleção anterior (referência): inverte o arquivo e fica com a primeira linha de cada negócio,
+    o que só é a chamada mais antiga se o arquivo estiver em ordem cronológica decrescente.
+    """
+    df_filtrado = df_chamadas[[col for col in COLUNAS_CHAMADAS if col in df_chamadas.columns]].copy()
+    df_filtrado = df_filtrado.iloc[::-1].reset_index(drop=True)
+    df_filtrado = df_filtrado.drop_duplicates(subset="Associated Deal IDs", keep="first")
+    df_filtrado["Associated Deal IDs"] = df_filtrado["Associated Deal IDs"].astype(str)
+    return df_filtrado
+
+
+def gera_chamadas(total: int, negocios: int, semente: int) -> pd.DataFrame:
+    """
+    Chamadas sintéticas com as colunas do chamadas.csv, ordenadas como o export (mais recentes no
+    topo, datas vazias no topo), com empates de data e chamadas sem negócio.
+    """
+    rng = np.random.default_rng(semente)
+    inicio = np.datetime64("2024-01-01T00:00", "m")
+    minutos = rng.integers(0, 2 * 365 * 1440, total)
+    minutos[rng.random(total) < 0.05] = 600  # empates
+    datas = np.datetime_as_string(inicio + minutos, unit="m")
+    datas = np.char.replace(datas, "T", " ").astype(object)
+    datas[rng.random(total) < 0.01] = np.nan
+
+    ids_negocio = rng.integers(10**10, 10**10 + negocios, total).astype(float)
+    ids_negocio[rng.random(total) < 0.01] = np.nan
+    proprietarios = np.array(["Ana", "Bia", "Caio", "Dora"], dtype=object)
+
+    df = pd.DataFrame({
+        "ID do objeto": rng.permutation(total) + 10**9,
+        "Associated Deal IDs": ids_negocio,
+        "Associated Deal": "Cliente",
+        "Data da atividade": datas,
+        "Atividade atribuída a": proprietarios[rng.integers(0, 4, total)],
+        "Título da chamada": "Chamada com Cliente",
+        "Direção da chamada": "Efetuada",
+        "Resultado da chamada": "Conectado",
+        "Duração da chamada (HH:mm:ss)": "00:03:12",
+        "Observações de chamada": "Cliente atendeu, pediu retorno amanhã às 10h.\nRenda: R$ 8.500,00\nEntrada de 20%",
+        "Última modificação": "2025-06-01 12:00",
+    })
+    vazia = df["Data da atividade"].isna()
+    df = df.assign(_vazia=vazia).sort_values(["_vazia", "Data da atividade", "ID do objeto"], ascending=[False, False, False])
+    return df.drop(columns="_vazia").reset_index(drop=True)
+
+
+def por_negocio(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values("Associated Deal IDs", key=lambda coluna: pd.to_numeric(coluna, errors="coerce")).reset_index(drop=True)
+
+
+def mede(funcao, entrada, repeticoes: int) -> tuple:
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            resultado = funcao(entrada)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara a seleção da primeira chamada por groupby-min com a seleção pela ordem do arquivo.")
+    parser.add_argument("--chamadas", type=int, default=3_000_000)
+    parser.add_argument("--negocios", type=int, default=300_000)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"🧪 Gerando {args.chamadas} chamadas para {args.negocios} negócios...")
+    df = gera_chamadas(args.chamadas, args.negocios, args.semente)
+
+    caminho = os.path.join(tempfile.mkdtemp(prefix="primeira_chamada_"), "chamadas.csv")
+    df.to_csv(caminho, index=False)
+
+    # Caminho completo do modo --completo: leitura do CSV + seleção
+    tempo_arquivo, por_arquivo = mede(lambda c: prepara_merge_por_ordem_do_arquivo(pd.read_csv(c)), caminho, args.repeticoes)
+    tempo_groupby, por_groupby = mede(lambda c: prepara_merge(le_chamadas(c)), caminho, args.repeticoes)
+    print(f"⏱️  leitura + seleção — ordem do arquivo: {tempo_arquivo:.2f}s | groupby-min: {tempo_groupby:.2f}s ({tempo_arquivo / tempo_groupby:.2f}x)")
+
+    tempo_so_arquivo, _ = mede(prepara_merge_por_ordem_do_arquivo, df, args.repeticoes)
+    tempo_so_groupby, _ = mede(prepara_merge, df, args.repeticoes)
+    print(f"   só a seleção (em memória) — ordem do arquivo: {tempo_so_arquivo:.2f}s | groupby-min: {tempo_so_groupby:.2f}s")
+    os.remove(caminho)
+
+    # Com o arquivo em ordem cronológica as duas seleções têm de coincidir
+    if not por_negocio(por_arquivo).equals(por_negocio(por_groupby)):
+        raise SystemExit("❌ Seleções diferentes com a entrada ordenada.")
+
+    # Embaralhado, só o groupby-min continua igual
+    embaralhado = df.sample(frac=1, random_state=args.semente).reset_index(drop=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        if not por_negocio(prepara_merge(embaralhado)).equals(por_negocio(por_groupby)):
+            raise SystemExit("❌ groupby-min mudou com a ordem das linhas.")
+        iguais_arquivo = por_negocio(prepara_merge_por_ordem_do_arquivo(embaralhado)).equals(por_negocio(por_arquivo))
+    print(f"✅ Mesma seleção com a entrada ordenada; embaralhando, groupby-min não muda (ordem do arquivo {'também não' if iguais_arquivo else 'muda'}).")
@@ -0,0 +1,269 @@
+import argparse
+import bisect
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+from app.api import atualizar_negocios_chamadas as atualizar
+
+# Portal HubSpot sintético: negócios e chamadas gerados sob demanda a partir do índice, sem nada em
+# memória, para medir o pipeline de 10 mil a milhões de registros. O hs_lastmodifieddate cresce com
+# o índice (registros espalhados pela janela [fim - periodo, fim)), então os filtros da busca viram
+# faixas de índices e qualquer página sai em tempo constante, com o mesmo conteúdo a cada chamada.
+TIPOS = {"negocios": "deals", "chamadas": "calls"}
+PRIMEIRO_ID = {"negocios": 10**10, "chamadas": 5 * 10**10}
+PROPRIEDADES_PADRAO = {  # devolvidas pela busca mesmo sem serem pedidas
+    "negocios": {"hs_object_id", "createdate", "hs_lastmodifieddate"},
+    "chamadas": {"hs_object_id", "hs_createdate", "hs_lastmodifieddate"},
+}
+LIMITE_PAGINA = 200  # maior limit aceito pela search API
+ANO_CRIACAO = 2025
+PERIODO_MODIFICACAO = timedelta(days=3)  # dentro da janela de recuperação: a primeira sincronização pega tudo
+
+NOMES = ["Ana", "Bruno", "Carla", "Diego", "Elisa", "Fábio", "Gabriela", "Heitor", "Isabela", "João", "Larissa", "Márcio", "Natália", "Otávio", "Paula", "Rafael", "Sofia", "Tiago", "Vanessa", "Wagner"]
+SOBRENOMES = ["Souza", "Oliveira", "Santos", "Lima", "Pereira", "Costa", "Ferreira", "Almeida", "Ribeiro", "Carvalho", "Gomes", "Martins", "Araújo", "Barbosa", "Rocha", "Dias"]
+ETAPAS_FUNIL = ["94896182", "94896183", "94896184", "94896185", "94896186", "94944032", "94944033", "94944035"]
+MOTIVOS_PERDA = ["Sem renda comprovada", "Desistiu da compra", "Comprou com concorrente", "Sem contato", None]
+ANALISES_CREDITO = ["Aprovado", "Reprovado", "Em análise", "Condicionado", None]
+QUENTURAS = ["Quente", "Morno", "Frio", None]
+FRASES_CHAMADA = [
+    "Cliente pediu retorno amanhã à tarde.",
+    "Não atendeu, caixa postal.",
+    "Enviou os documentos por e-mail, falta o comprovante de renda.",
+    "Interessado no apartamento de 2 quartos, quer agendar visita.",
+    "Pediu simulação com entrada de R$&nbsp;20.000.",
+    "Número informado é de outra pessoa.",
+    "Conversamos sobre o FGTS & a documentação do cônjuge.",
+]
+PASSOS = ["enviar simulação", "agendar visita", "cobrar documentos", "ligar de novo"]
+ESTAGIOS = list(atualizar.DEALSTAGE_MAP)
+PROPRIETARIOS = list(atualizar.OWNER_MAP)
+MOMENTOS_COMPRA = list(atualizar.PURCHASE_MOMENT_MAP) + [None]
+DISPOSICOES = list(atualizar.CALL_DISPOSITION_MAP)
+
+
+def _ms(instante: datetime) -> int:
+    return int(instante.timestamp() * 1000)
+
+
+def iso(ms: int) -> str:
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.") + f"{ms % 1000:03d}Z"
+
+
+def nome_cliente(indice: int) -> str:
+    return f"{NOMES[indice * 7 % len(NOMES)]} {SOBRENOMES[indice * 13 % len(SOBRENOMES)]} {indice}"
+
+
+def corpo_chamada(rng: random.Random) -> str:
+    """
+    Observação como o editor da HubSpot grava: parágrafos, quebras, negrito, listas e entidades.
+    """
+    sorteio = rng.random()
+    if sorteio < 0.1:
+        return None
+    if sorteio < 0.2:
+        return ""
+    partes = [f"<p>{rng.choice(FRASES_CHAMADA)}</p>" for _ in range(rng.randint(1, 3))]
+    if rng.random() < 0.4:
+        partes.append(f"<p><strong>Próximo passo:</strong> {rng.choice(PASSOS)}<br>até {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}</p>")
+    if rng.random() < 0.2:
+        partes.append("<ul>" + "".join(f"<li>{rng.choice(PASSOS)}</li>" for _ in range(rng.randint(2, 4))) + "</ul>")
+    return "".join(partes)
+
+
+class PortalSintetico:
+    """
+    `negocios` negócios e `chamadas` chamadas determinísticos para a `semente`. Cada chamada aponta
+    para um negócio e acontece depois da criação dele (lead time de minutos a dias).
+    """
+
+    def __init__(self, negocios: int, chamadas: int, semente: int = 0, fim: datetime = None, periodo: timedelta = PERIODO_MODIFICACAO):
+        self.totais = {"negocios": negocios, "chamadas": chamadas}
+        self.semente = semente
+        self.fim_ms = _ms(fim or datetime.now(timezone.utc))
+        self.periodo_ms = _ms(datetime.fromtimestamp(0, timezone.utc) + periodo)
+        # Do dia 2 em diante: no fuso do Brasil nenhum negócio cai no ano anterior
+        self.inicio_criacao_ms = _ms(datetime(ANO_CRIACAO, 1, 2, tzinfo=timezone.utc))
+        self.periodo_criacao_ms = _ms(datetime(ANO_CRIACAO, 12, 1, tzinfo=timezone.utc)) - self.inicio_criacao_ms
+
+    @property
+    def inicio(self) -> datetime:
+        return datetime.fromtimestamp((self.fim_ms - self.periodo_ms) / 1000, timezone.utc)
+
+    def _rng(self, tipo: str, indice: int) -> random.Random:
+        return random.Random(f"{self.semente}:{tipo}:{indice}")
+
+    def modificacao_ms(self, tipo: str, indice: int) -> int:
+        total = self.totais[tipo]
+        return self.fim_ms - self.periodo_ms + (indice * self.periodo_ms) // max(total, 1)
+
+    def criacao_negocio_ms(self, indice: int) -> int:
+        # Negócios espalhados pelo ano em ordem de índice, com um desvio de até uma hora
+        base = self.inicio_criacao_ms + (indice * self.periodo_criacao_ms) // max(self.totais["negocios"], 1)
+        return base + indice * 2654435761 % 3_600_000
+
+    def indice_modificado_em(self, tipo: str, instante_ms: int) -> int:
+        """
+        Primeiro índice com hs_lastmodifieddate >= instante_ms.
+        """
+        return bisect.bisect_left(range(self.totais[tipo]), instante_ms, key=lambda indice: self.modificacao_ms(tipo, indice))
+
+    def id_registro(self, tipo: str, indice: int) -> str:
+        return str(PRIMEIRO_ID[tipo] + indice)
+
+    def _envelope(self, tipo: str, indice: int, criacao_ms: int, propriedades: dict) -> dict:
+        return {
+            "id": self.id_registro(tipo, indice),
+            "properties": propriedades,
+            "createdAt": iso(criacao_ms),
+            "updatedAt": propriedades["hs_lastmodifieddate"],
+            "archived": False,
+        }
+
+    def negocio(self, indice: int) -> dict:
+        rng = self._rng("negocios", indice)
+        criacao = self.criacao_negocio_ms(indice)
+        nome = nome_cliente(indice)
+        avancou = rng.randint(0, len(ETAPAS_FUNIL))
+        entradas, instante = {}, criacao
+        for posicao, etapa in enumerate(ETAPAS_FUNIL):
+            if posicao < avancou:
+                instante += rng.randrange(60_000, 3 * 86_400_000)
+                entradas[f"hs_v2_date_entered_{etapa}"] = iso(instante)
+            else:
+                entradas[f"hs_v2_date_entered_{etapa}"] = None
+        propriedades = {
+            "hs_object_id": self.id_registro("negocios", indice),
+            "dealname": nome,
+            "dealstage": ETAPAS_FUNIL[avancou - 1] if avancou and rng.random() < 0.7 else rng.choice(ESTAGIOS),
+            "hubspot_owner_id": rng.choice(PROPRIETARIOS),
+            "createdate": iso(criacao),
+            "status_cadastro": rng.choice(["completo", "incompleto", None]),
+            "hs_tag_ids": ";".join(str(rng.randrange(10**6, 10**7)) for _ in range(rng.randint(0, 2))) or None,
+            "purchase_moment": rng.choice(MOMENTOS_COMPRA),
+            "foi_conectado": rng.choice(["true", "false", None]),
+            "valor_original": f"{rng.randrange(150, 900) * 1000}",
+            "renda_cadastrada": rng.choice([f"{rng.randrange(1500, 20000)}.00", None]),
+            **entradas,
+            "email": f"{nome.split()[0].lower()}.{indice}@exemplo.com.br",
+            "motivo_de_perda_do_negocio": rng.choice(MOTIVOS_PERDA),
+            "analise_de_credito": rng.choice(ANALISES_CREDITO),
+            "quentura_do_lead": rng.choice(QUENTURAS),
+            "score_report": rng.choice([str(rng.randrange(300, 1000)), None]),
+            "score_report_2o_prop": rng.choice([f"{rng.randrange(100)}%", None]),
+            "hs_lastmodifieddate": iso(self.modificacao_ms("negocios", indice)),
+        }
+        return self._envelope("negocios", indice, criacao, propriedades)
+
+    def chamada(self, indice: int) -> dict:
+        rng = self._rng("chamadas", indice)
+        negocio = rng.randrange(self.totais["negocios"]) if self.totais["negocios"] else None
+        if negocio is not None:
+            # Lead time de minutos a alguns dias depois da criação do negócio
+            instante = self.criacao_negocio_ms(negocio) + int(rng.expovariate(1 / 7_200_000))
+        else:
+            instante = self.inicio_criacao_ms + rng.randrange(self.periodo_criacao_ms)
+        disposicao = rng.choice(DISPOSICOES)
+        conectado = atualizar.CALL_DISPOSITION_MAP[disposicao] == "Conectado"
+        nome = nome_cliente(negocio) if negocio is not None else nome_cliente(indice)
+        propriedades = {
+            "hs_object_id": self.id_registro("chamadas", indice),
+            "hs_call_title": f"Chamada com {nome}",
+            "hs_timestamp": iso(instante),
+            "hs_call_direction": rng.choice(["OUTBOUND", "OUTBOUND", "OUTBOUND", "INBOUND"]),
+            "hs_call_disposition": disposicao,
+            "hubspot_owner_id": rng.choice(PROPRIETARIOS),
+            "hs_call_duration": str(rng.randrange(30_000, 1_200_000) if conectado else rng.randrange(0, 30_000)),
+            "hs_call_body": corpo_chamada(rng),
+            "hs_call_title_nome": nome,
+            "hs_call_primary_deal": self.id_registro("negocios", negocio) if negocio is not None and rng.random() < 0.95 else None,
+            "hs_call_deal_stage_during_call": rng.choice(ETAPAS_FUNIL),
+            "hs_createdate": iso(instante),
+            "hs_lastmodifieddate": iso(self.modificacao_ms("chamadas", indice)),
+        }
+        return self._envelope("chamadas", indice, instante, propriedades)
+
+    def registro(self, tipo: str, indice: int) -> dict:
+        return self.negocio(indice) if tipo == "negocios" else self.chamada(indice)
+
+    def faixa_filtrada(self, tipo: str, filter_groups: list) -> tuple:
+        """
+        Faixa de índices [inicio, fim) que atende aos filtros de hs_lastmodifieddate (GT, GTE, LT e
+        LTE) do primeiro grupo; outros filtros são ignorados.
+        """
+        inicio, fim = 0, self.totais[tipo]
+        filtros = filter_groups[0].get("filters", []) if filter_groups else []
+        for filtro in filtros:
+            if filtro.get("propertyName") != "hs_lastmodifieddate":
+                continue
+            instante = _ms(atualizar.converte_data_corte(str(filtro["value"]))) if not str(filtro["value"]).isdigit() else int(filtro["value"])
+            operador = filtro.get("operator")
+            if operador == "GT":
+                inicio = max(inicio, self.indice_modificado_em(tipo, instante + 1))
+            elif operador == "GTE":
+                inicio = max(inicio, self.indice_modificado_em(tipo, instante))
+            elif operador == "LT":
+                fim = min(fim, self.indice_modificado_em(tipo, instante))
+            elif operador == "LTE":
+                fim = min(fim, self.indice_modificado_em(tipo, instante + 1))
+        return inicio, max(inicio, fim)
+
+    def busca(self, tipo: str, payload: dict) -> dict:
+        """
+        Resposta de POST /crm/v3/objects/{deals,calls}/search: `total`, `results` (só as
+        propriedades pedidas, mais as que a HubSpot sempre devolve) e `paging.next.after` enquanto
+        houver mais resultados. A ordem é sempre por hs_lastmodifieddate crescente.
+        """
+        inicio, fim = self.faixa_filtrada(tipo, payload.get("filterGroups", []))
+        deslocamento = int(payload.get("after") or 0)
+        limite = min(int(payload.get("limit") or 10), LIMITE_PAGINA)
+        pedidas = set(payload.get("properties") or []) | PROPRIEDADES_PADRAO[tipo]
+
+        resultados = []
+        for indice in range(inicio + deslocamento, min(fim, inicio + deslocamento + limite)):
+            registro = self.registro(tipo, indice)
+            registro["properties"] = {campo: valor for campo, valor in registro["properties"].items() if campo in pedidas}
+            resultados.append(registro)
+
+        resposta = {"total": fim - inicio, "results": resultados}
+        if inicio + deslocamento + limite < fim:
+            resposta["paging"] = {"next": {"after": str(deslocamento + limite), "link": f"?after={deslocamento + limite}"}}
+        return resposta
+
+    def paginas(self, tipo: str, tamanho: int = 100):
+        """
+        Todas as respostas de busca do tipo, página por página (como a sincronização pede).
+        """
+        payload = {"properties": atualizar.PROPERTIES_NEGOCIOS if tipo == "negocios" else atualizar.PROPERTIES_CHAMADAS, "limit": tamanho}
+        while True:
+            resposta = self.busca(tipo, payload)
+            yield resposta
+            after = resposta.get("paging", {}).get("next", {}).get("after")
+            if not after:
+                return
+            payload["after"] = after
+
+
+def grava_paginas(portal: PortalSintetico, pasta: str):
+    """
+    Uma resposta de busca por linha em <pasta>/deals.jsonl e <pasta>/calls.jsonl.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    for tipo, objeto in TIPOS.items():
+        caminho = os.path.join(pasta, f"{objeto}.jsonl")
+        with open(caminho, "w", encoding="utf-8") as f:
+            for resposta in portal.paginas(tipo):
+                f.write(json.dumps(resposta, ensure_ascii=False) + "\n")
+        print(f"💾 {portal.totais[tipo]} {tipo} em {caminho}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera respostas da search API da HubSpot (negócios e chamadas) sintéticas, uma página por linha.")
+    parser.add_argument("--negocios", type=int, default=10_000)
+    parser.add_argument("--chamadas", type=int, default=30_000)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", default="data/sintetico", help="Pasta dos arquivos deals.jsonl e calls.jsonl.")
+    args = parser.parse_args()
+
+    grava_paginas(PortalSintetico(args.negocios, args.chamadas, args.semente), args.saida)
@@ -1,18 +1,12 @@
-import requests
-import json
-from dotenv import load_dotenv
-import os
-
-load_dotenv()
-API_KEY = os.getenv("HUBSPOT_API_KEY")
-HEADERS = {"Authorization": f"Bearer {API_KEY}"}
+from app.api import cliente_hubspot
+from app.api.cliente_hubspot import HUBSPOT_BASE_URL
 
 def descobrir_nome_etapa_por_id(stage_id):
     """
     Procura em todos os pipelines de deals o nome da etapa com ID fornecido.
     """
-    url = "https://api.hubapi.com/crm/v3/pipelines/deals"
-    response = requests.get(url, headers=HEADERS)
+    url = f"{HUBSPOT_BASE_URL}/crm/v3/pipelines/deals"
+    response = cliente_hubspot.get(url)
     response.raise_for_status()
     data = response.json()
 
@@ -31,8 +25,8 @@ def listar_estagios_pipeline(pipeline_id):
     """
     Lista todas as etapas de um pipeline de negócios com base no pipeline_id.
     """
-    url = f"https://api.hubapi.com/crm/v3/pipelines/deals/{pipeline_id}"
-    response = requests.get(url, headers=HEADERS)
+    url = f"{HUBSPOT_BASE_URL}/crm/v3/pipelines/deals/{pipeline_id}"
+    response = cliente_hubspot.get(url)
     response.raise_for_status()
     data = response.json()
 
@@ -45,8 +39,8 @@ def listar_propriedades_calls():
     """
     Lista todas as propriedades disponíveis no objeto de chamadas (calls).
     """
-    url = "https://api.hubapi.com/crm/v3/properties/calls"
-    response = requests.get(url, headers=HEADERS)
+    url = f"{HUBSPOT_BASE_URL}/crm/v3/properties/calls"
+    response = cliente_hubspot.get(url)
     response.raise_for_status()
     data = response.json()
 
@@ -61,8 +55,8 @@ def mostrar_opcoes_propriedade_calls(property_name):
     """
     Exibe os valores possíveis de uma propriedade de chamada do tipo enum (ex: hs_call_disposition).
     """
-    url = f"https://api.hubapi.com/crm/v3/properties/calls/{property_name}"
-    response = requests.get(url, headers=HEADERS)
+    url = f"{HUBSPOT_BASE_URL}/crm/v3/properties/calls/{property_name}"
+    response = cliente_hubspot.get(url)
 
     if response.status_code != 200:
         print(f"Erro {response.status_code} ao buscar a propriedade '{property_name}'")
@@ -84,8 +78,8 @@ def mostrar_opcoes_propriedade_calls(property_name):
         print(f'"{option["value"]}": "{option["label"]}",')
 
 def gerar_owner_map():
-    url = "https://api.hubapi.com/crm/v3/owners/"
-    response = requests.get(url, headers=HEADERS)
+    url = f"{HUBSPOT_BASE_URL}/crm/v3/owners/"
+    response = cliente_hubspot.get(url)
 
     if not response.ok:
         print(f"❌ Erro {response.status_code}: {response.text}")
@@ -108,10 +102,8 @@ def gerar_owner_map():
 
 
 
-url = "https://api.hubapi.com/calling/v1/dispositions"
-headers = {"Authorization": f"Bearer {API_KEY}"}
-
-response = requests.get(url, headers=headers)
+url = f"{HUBSPOT_BASE_URL}/calling/v1/dispositions"
+response = cliente_hubspot.get(url)
 
 if response.ok:
     data = response.json()
@@ -0,0 +1,132 @@
+from gspread.exceptions import APIError
+from gspread.utils import a1_to_rowcol, numericise_all
+
+
+class RespostaFalsa:
+    """
+    Resposta HTTP mínima para montar um gspread APIError (status, Retry-After e corpo de erro).
+    """
+
+    def __init__(self, status_code, retry_after=None):
+        self.status_code = status_code
+        self.headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+        self.text = f"HTTP {status_code}"
+
+    def json(self):
+        return {"error": {"code": self.status_code, "message": self.text}}
+
+
+class ArquivoFalso:
+    """
+    Planilha (gspread.Spreadsheet) da aba falsa: só o batch_update com updateCells.
+    """
+
+    def __init__(self, aba):
+        self.aba = aba
+
+    @staticmethod
+    def _valor(celula):
+        valor = celula.get("userEnteredValue", {})
+        return next(iter(valor.values()), "")
+
+    def batch_update(self, body):
+        aba = self.aba
+        aba._falha_se_programado()
+        for requisicao in body["requests"]:
+            atualizacao = requisicao["updateCells"]
+            if "rows" not in atualizacao:
+                grade = atualizacao["range"]
+                for linha in aba.linhas[grade["startRowIndex"]:grade["endRowIndex"]]:
+                    for coluna in range(grade["startColumnIndex"], min(grade["endColumnIndex"], len(linha))):
+                        linha[coluna] = ""
+                continue
+            inicio = atualizacao["start"]
+            valores = [[self._valor(celula) for celula in linha["values"]] for linha in atualizacao["rows"]]
+            aba._escreve(inicio["rowIndex"] + 1, inicio["columnIndex"] + 1, valores)
+        return {"replies": [{} for _ in body["requests"]]}
+
+
+class PlanilhaFalsa:
+    """
+    Aba do gspread em memória, com os métodos usados pelo exportar_para_sheets. Guarda os valores
+    como texto (como o Sheets mostra) e conta requisições e células escritas. `falhas` programa
+    erros nas próximas escritas: cada item é um status HTTP (ou None para a escrita passar).
+    """
+
+    def __init__(self, valores=None):
+        self.linhas = [[self._texto(valor) for valor in linha] for linha in (valores or [])]
+        self.requisicoes = 0
+        self.celulas_escritas = 0
+        self.id = 0
+        self.spreadsheet = ArquivoFalso(self)
+        self.falhas = []
+        self.falhas_levantadas = 0
+
+    def _falha_se_programado(self):
+        self.requisicoes += 1
+        status = self.falhas.pop(0) if self.falhas else None
+        if status is not None:
+            self.falhas_levantadas += 1
+            raise APIError(RespostaFalsa(status, retry_after=0 if status == 429 else None))
+
+    @staticmethod
+    def _texto(valor):
+        if isinstance(valor, float) and valor.is_integer():
+            return str(int(valor))
+        return str(valor)
+
+    @staticmethod
+    def _intervalo(rotulo):
+        inicio, _, fim = rotulo.partition(":")
+        return a1_to_rowcol(inicio), a1_to_rowcol(fim or inicio)
+
+    def _escreve(self, linha, coluna, valores):
+        for i, valores_linha in enumerate(valores):
+            while len(self.linhas) < linha + i:
+                self.linhas.append([])
+            destino = self.linhas[linha + i - 1]
+            for j, valor in enumerate(valores_linha):
+                while len(destino) < coluna + j:
+                    destino.append("")
+                destino[coluna + j - 1] = self._texto(valor)
+                self.celulas_escritas += 1
+
+    def get_all_values(self):
+        self.requisicoes += 1
+        largura = max((len(linha) for linha in self.linhas), default=0)
+        return [linha + [""] * (largura - len(linha)) for linha in self.linhas]
+
+    def get_all_records(self):
+        valores = self.get_all_values()
+        if not valores:
+            return []
+        cabecalho = valores[0]
+        return [dict(zip(cabecalho, numericise_all(linha, empty2zero=False, default_blank=""))) for linha in valores[1:]]
+
+    def update(self, range_name, values=None, **kwargs):
+        self._falha_se_programado()
+        (linha, coluna), _ = self._intervalo(range_name)
+        self._escreve(linha, coluna, values)
+
+    def batch_update(self, data, **kwargs):
+        self._falha_se_programado()
+        for intervalo in data:
+            (linha, coluna), _ = self._intervalo(intervalo["range"])
+            self._escreve(linha, coluna, intervalo["values"])
+
+    def update_acell(self, label, value):
+        self.update(label, [[value]])
+
+    def insert_rows(self, values, row=1, **kwargs):
+        self._falha_se_programado()
+        for deslocamento, linha in enumerate(values):
+            self.linhas.insert(row - 1 + deslocamento, [self._texto(valor) for valor in linha])
+            self.celulas_escritas += len(linha)
+
+    def batch_clear(self, ranges):
+        self.requisicoes += 1
+        for rotulo in ranges:
+            (linha_inicio, coluna_inicio), (linha_fim, coluna_fim) = self._intervalo(rotulo)
+            for linha in self.linhas[linha_inicio - 1:linha_fim]:
+                for coluna in range(coluna_inicio - 1, min(coluna_fim, len(linha))):
+                    linha[coluna] = ""
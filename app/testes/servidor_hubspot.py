@@ -0,0 +1,279 @@
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.api import atualizar_negocios_chamadas as atualizar
+from app.testes.dados_hubspot import TIPOS, PortalSintetico
+
+# Servidor local no lugar da API da HubSpot, para testar concorrência, retentativas e backfill sem
+# rede: HUBSPOT_BASE_URL=http://127.0.0.1:8765 python3 -m app.api.main. Responde a busca de
+# negócios e chamadas (com o limite de 10 mil resultados por consulta), pipelines, owners,
+# propriedades e dispositions, servindo um portal sintético ou páginas gravadas, e injeta latência,
+# 429 com Retry-After e erros 5xx.
+PORTA = 8765
+LIMITE_BUSCA = atualizar.LIMITE_BUSCA_HUBSPOT
+OBJETOS = {objeto: tipo for tipo, objeto in TIPOS.items()}
+ROTA_BUSCA = re.compile(r"^/crm/v3/objects/(deals|calls)/search$")
+ROTA_PIPELINE = re.compile(r"^/crm/v3/pipelines/deals/([^/]+)$")
+ROTA_PROPRIEDADE = re.compile(r"^/crm/v3/properties/calls/([^/]+)$")
+PIPELINE_ID = "default"
+
+
+class PortalGravado(PortalSintetico):
+    """
+    Portal a partir de respostas de busca gravadas (deals.jsonl e calls.jsonl, uma resposta por
+    linha, como o `app.testes.dados_hubspot` grava), servidas em ordem de hs_lastmodifieddate.
+    """
+
+    def __init__(self, pasta: str):
+        self.registros, self.modificacoes = {}, {}
+        for tipo, objeto in TIPOS.items():
+            caminho = os.path.join(pasta, f"{objeto}.jsonl")
+            registros = []
+            if os.path.exists(caminho):
+                with open(caminho, encoding="utf-8") as f:
+                    for linha in f:
+                        registros.extend(json.loads(linha).get("results", []))
+            registros.sort(key=self._chave)
+            self.registros[tipo] = registros
+            self.modificacoes[tipo] = [self._chave(registro) for registro in registros]
+        self.totais = {tipo: len(registros) for tipo, registros in self.registros.items()}
+
+    @staticmethod
+    def _chave(registro: dict) -> int:
+        valor = registro.get("properties", {}).get("hs_lastmodifieddate")
+        try:
+            return int(atualizar.converte_data_corte(valor).timestamp() * 1000)
+        except (AttributeError, TypeError, ValueError):
+            return 0
+
+    def modificacao_ms(self, tipo: str, indice: int) -> int:
+        return self.modificacoes[tipo][indice]
+
+    def registro(self, tipo: str, indice: int) -> dict:
+        return dict(self.registros[tipo][indice])
+
+
+def pipelines() -> dict:
+    estagios = [{"id": estagio, "label": rotulo, "displayOrder": ordem, "archived": False} for ordem, (estagio, rotulo) in enumerate(atualizar.DEALSTAGE_MAP.items())]
+    return {"results": [{"id": PIPELINE_ID, "label": "Funil Vendas", "displayOrder": 0, "archived": False, "stages": estagios}]}
+
+
+def owners() -> dict:
+    resultados = []
+    for owner_id, nome in atualizar.OWNER_MAP.items():
+        primeiro, _, resto = nome.partition(" ")
+        resultados.append({"id": owner_id, "email": f"{owner_id}@exemplo.com.br", "firstName": primeiro, "lastName": resto, "archived": False})
+    return {"results": resultados}
+
+
+def dispositions() -> list:
+    return [{"id": disposicao, "label": rotulo, "deleted": False} for disposicao, rotulo in atualizar.CALL_DISPOSITION_MAP.items()]
+
+
+def propriedades_calls() -> dict:
+    return {"results": [{"name": nome, "label": rotulo} for nome, rotulo in atualizar.API_TO_CSV_CHAMADAS.items()]}
+
+
+def propriedade_call(nome: str):
+    opcoes = {
+        "hs_call_disposition": atualizar.CALL_DISPOSITION_MAP,
+        "hubspot_owner_id": atualizar.OWNER_MAP,
+    }.get(nome)
+    if nome not in atualizar.PROPERTIES_CHAMADAS:
+        return None
+    rotulo = atualizar.API_TO_CSV_CHAMADAS.get(nome, nome)
+    return {"name": nome, "label": rotulo, "type": "enumeration" if opcoes else "string", "options": [{"value": valor, "label": texto} for valor, texto in (opcoes or {}).items()]}
+
+
+def erro(categoria: str, mensagem: str) -> dict:
+    return {"status": "error", "message": mensagem, "correlationId": str(uuid.uuid4()), "category": categoria}
+
+
+class ServidorHubSpot(ThreadingHTTPServer):
+    """
+    Cada requisição espera `latencia` (mais até `variacao` segundos) e pode falhar: primeiro pelos
+    status programados em `falhas` (um por requisição, None deixa passar), depois pelo limite de
+    `buscas_por_segundo` nas buscas (429) e, por fim, ao acaso com `taxa_429` e `taxa_5xx`.
+    `contagem` guarda requisições e erros injetados por endpoint.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, portal, porta: int = PORTA, latencia: float = 0.0, variacao: float = 0.0, taxa_429: float = 0.0,
+                 taxa_5xx: float = 0.0, retry_after: float = 1, buscas_por_segundo: float = 0, semente: int = 0, verboso: bool = False):
+        super().__init__(("127.0.0.1", porta), ManipuladorHubSpot)
+        self.portal = portal
+        self.latencia, self.variacao = latencia, variacao
+        self.taxa_429, self.taxa_5xx, self.retry_after = taxa_429, taxa_5xx, retry_after
+        self.buscas_por_segundo = buscas_por_segundo
+        self.verboso = verboso
+        self.falhas = []
+        self.rng = random.Random(semente)
+        self.lock = threading.Lock()
+        self.buscas_recentes = deque()
+        self.contagem = Counter()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def sorteia_falha(self, busca: bool):
+        """
+        Espera da requisição, status a devolver no lugar da resposta (None deixa passar) e o
+        Retry-After dos 429.
+        """
+        with self.lock:
+            agora = time.monotonic()
+            espera = self.latencia + (self.rng.uniform(0, self.variacao) if self.variacao else 0)
+            if self.falhas:
+                status = self.falhas.pop(0)
+                if status is not None:
+                    return espera, status, self.retry_after if status == 429 else None
+            if busca and self.buscas_por_segundo:
+                while self.buscas_recentes and agora - self.buscas_recentes[0] >= 1:
+                    self.buscas_recentes.popleft()
+                if len(self.buscas_recentes) >= self.buscas_por_segundo:
+                    return espera, 429, self.retry_after
+                self.buscas_recentes.append(agora)
+            sorteio = self.rng.random()
+            if sorteio < self.taxa_429:
+                return espera, 429, self.retry_after
+            if sorteio < self.taxa_429 + self.taxa_5xx:
+                return espera, self.rng.choice([500, 502, 503, 504]), None
+            return espera, None, None
+
+    def conta(self, chave: str):
+        with self.lock:
+            self.contagem[chave] += 1
+
+    def inicia(self) -> threading.Thread:
+        """
+        Atende em segundo plano (testes); `shutdown()` para.
+        """
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class ManipuladorHubSpot(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, como o pool do cliente_hubspot espera
+
+    def log_message(self, formato, *args):
+        if self.server.verboso:
+            super().log_message(formato, *args)
+
+    def _responde(self, status: int, corpo, cabecalhos: dict = None):
+        dados = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json;charset=utf-8")
+        self.send_header("Content-Length", str(len(dados)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, str(valor))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _falha_injetada(self, endpoint: str) -> bool:
+        espera, status, retry_after = self.server.sorteia_falha(busca=endpoint.endswith("/search"))
+        if espera:
+            time.sleep(espera)
+        if status is None:
+            return False
+        self.server.conta(f"{status} {endpoint}")
+        if status == 429:
+            self._responde(429, erro("RATE_LIMITS", "You have reached your secondly limit."), {"Retry-After": retry_after})
+        else:
+            self._responde(status, erro("INTERNAL_ERROR", "Erro interno simulado."))
+        return True
+
+    def do_POST(self):
+        caminho = self.path.split("?")[0]
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        corpo = self.rfile.read(tamanho) if tamanho else b""
+        rota = ROTA_BUSCA.match(caminho)
+        if not rota:
+            self._responde(404, erro("OBJECT_NOT_FOUND", f"Rota {caminho} não simulada."))
+            return
+        self.server.conta(f"POST {caminho}")
+        if self._falha_injetada(caminho):
+            return
+
+        try:
+            payload = json.loads(corpo or b"{}")
+        except ValueError:
+            self._responde(400, erro("VALIDATION_ERROR", "Corpo da requisição não é JSON."))
+            return
+        # A search API não pagina além de 10 mil resultados por consulta
+        if int(payload.get("after") or 0) + min(int(payload.get("limit") or 10), 200) > LIMITE_BUSCA:
+            self._responde(400, erro("VALIDATION_ERROR", f"Paging beyond {LIMITE_BUSCA} results is not supported."))
+            return
+        self._responde(200, self.server.portal.busca(OBJETOS[rota.group(1)], payload))
+
+    def do_GET(self):
+        caminho = self.path.split("?")[0].rstrip("/")
+        self.server.conta(f"GET {caminho}")
+        if self._falha_injetada(caminho):
+            return
+
+        rota_pipeline, rota_propriedade = ROTA_PIPELINE.match(caminho), ROTA_PROPRIEDADE.match(caminho)
+        if caminho == "/crm/v3/pipelines/deals":
+            self._responde(200, pipelines())
+        elif rota_pipeline:
+            pipeline = next((p for p in pipelines()["results"] if p["id"] == rota_pipeline.group(1)), None)
+            if pipeline:
+                self._responde(200, pipeline)
+            else:
+                self._responde(404, erro("OBJECT_NOT_FOUND", "Pipeline não encontrado."))
+        elif caminho == "/crm/v3/owners":
+            self._responde(200, owners())
+        elif caminho == "/calling/v1/dispositions":
+            self._responde(200, dispositions())
+        elif caminho == "/crm/v3/properties/calls":
+            self._responde(200, propriedades_calls())
+        elif rota_propriedade:
+            propriedade = propriedade_call(rota_propriedade.group(1))
+            if propriedade:
+                self._responde(200, propriedade)
+            else:
+                self._responde(404, erro("OBJECT_NOT_FOUND", "Propriedade não encontrada."))
+        else:
+            self._responde(404, erro("OBJECT_NOT_FOUND", f"Rota {caminho} não simulada."))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local no lugar da API da HubSpot (busca, pipelines, owners e dispositions), com latência e erros simulados.")
+    parser.add_argument("--porta", type=int, default=PORTA)
+    parser.add_argument("--gravado", help="Pasta com deals.jsonl e calls.jsonl gravados; sem ela, serve o portal sintético.")
+    parser.add_argument("--negocios", type=int, default=10_000)
+    parser.add_argument("--chamadas", type=int, default=30_000)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--latencia", type=float, default=0.0, help="Segundos por requisição.")
+    parser.add_argument("--variacao", type=float, default=0.0, help="Até quantos segundos a mais, ao acaso, por requisição.")
+    parser.add_argument("--taxa-429", type=float, default=0.0, help="Fração das requisições respondidas com 429.")
+    parser.add_argument("--taxa-5xx", type=float, default=0.0, help="Fração das requisições respondidas com 500/502/503/504.")
+    parser.add_argument("--retry-after", type=float, default=1, help="Segundos no cabeçalho Retry-After dos 429.")
+    parser.add_argument("--buscas-por-segundo", type=float, default=0, help="Limite de buscas por segundo (429 acima dele); 0 desliga.")
+    parser.add_argument("--verboso", action="store_true", help="Mostra cada requisição.")
+    args = parser.parse_args()
+
+    portal = PortalGravado(args.gravado) if args.gravado else PortalSintetico(args.negocios, args.chamadas, args.semente)
+    servidor = ServidorHubSpot(
+        portal, args.porta, args.latencia, args.variacao, args.taxa_429, args.taxa_5xx, args.retry_after,
+        args.buscas_por_segundo, args.semente, args.verboso,
+    )
+    print(f"🛰️  HubSpot local em {servidor.url} ({portal.totais['negocios']} negócios, {portal.totais['chamadas']} chamadas)")
+    print(f"   HUBSPOT_BASE_URL={servidor.url} python3 -m app.api.main")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        print(f"\n📊 Requisições e erros injetados: {dict(servidor.contagem)}")
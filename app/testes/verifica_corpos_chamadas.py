@@ -0,0 +1,205 @@
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import random
+import tempfile
+import time
+
+import pandas as pd
+
+from app.services import armazenamento
+from app.services import merge_negocios_chamadas as merge
+from app.testes.verifica_merge_incremental import nova_chamada, novo_negocio
+
+COLUNAS_CHAMADAS = [
+    "ID do objeto", "Título da chamada", "Data da atividade", "Direção da chamada", "Resultado da chamada",
+    "Atividade atribuída a", "Duração da chamada (HH:mm:ss)", "Observações de chamada", "Associated Deal IDs",
+    "Última modificação", "Associated Deal",
+]
+
+
+def chamada_completa(rng: random.Random, chamada_id: str, negocios: list) -> dict:
+    linha = nova_chamada(rng, chamada_id, negocios)
+    linha.update({
+        "Direção da chamada": rng.choice(["Efetuada", "Recebida"]),
+        "Resultado da chamada": rng.choice(["Conectado", "Ocupado", ""]),
+        "Duração da chamada (HH:mm:ss)": f"00:0{rng.randint(0, 9)}:{rng.randint(10, 59)}",
+        "Observações de chamada": rng.choice(["", "Retornar amanhã", "Cliente, \"esposa\" e filhos\nvisita sábado", "ó" * rng.randint(100, 2000)]),
+        "Última modificação": "2025-06-01 12:00",
+    })
+    return linha
+
+
+def csv_de_referencia(linhas_por_id: dict, ordem: list) -> str:
+    """
+    Mesmo CSV que o banco com a linha inteira num JSON só geraria (referência do formato legado).
+    """
+    saida = io.StringIO(newline='')
+    writer = csv.DictWriter(saida, fieldnames=COLUNAS_CHAMADAS, quoting=csv.QUOTE_ALL)
+    writer.writeheader()
+    for hs_id in ordem:
+        row = linhas_por_id[hs_id]
+        writer.writerow({col: str(row.get(col, "") or "") for col in COLUNAS_CHAMADAS})
+    return saida.getvalue()
+
+
+def le_arquivo(caminho: str) -> str:
+    with open(caminho, newline='', encoding='utf-8') as f:
+        return f.read()
+
+
+def verifica_ida_e_volta(pasta: str, rng: random.Random, rodadas: int) -> int:
+    """
+    Upserts com alterações parciais (com e sem observações): o CSV completo reconstruído a partir
+    das duas tabelas tem de ser igual ao da referência.
+    """
+    conn = armazenamento.conecta(os.path.join(pasta, "ida_e_volta.sqlite3"))
+    armazenamento.adiciona_colunas(conn, "chamadas", COLUNAS_CHAMADAS)
+    negocios = [str(10**10 + i) for i in range(50)]
+    referencia, ordem = {}, []
+    divergencias = 0
+    for rodada in range(rodadas):
+        linhas = []
+        for _ in range(200):
+            chamada_id = str(len(ordem) + len(linhas) + 1)
+            linhas.append(chamada_completa(rng, chamada_id, negocios))
+        for chamada_id in rng.sample(ordem, min(60, len(ordem))):
+            campos = rng.sample(["Observações de chamada", "Resultado da chamada", "Data da atividade"], rng.randint(1, 2))
+            alteracao = {"ID do objeto": chamada_id}
+            for campo in campos:
+                alteracao[campo] = chamada_completa(rng, chamada_id, negocios)[campo]
+            linhas.append(alteracao)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            armazenamento.upsert(conn, "chamadas", linhas)
+            conn.commit()
+        for linha in linhas:
+            hs_id = linha["ID do objeto"]
+            if hs_id in referencia:
+                referencia[hs_id].update(linha)
+            else:
+                referencia[hs_id] = dict(linha)
+                ordem.insert(0, hs_id)
+
+        caminho = os.path.join(pasta, "chamadas.csv")
+        with contextlib.redirect_stdout(io.StringIO()):
+            armazenamento.exporta_csv(conn, "chamadas", caminho)
+        if le_arquivo(caminho) != csv_de_referencia(referencia, ordem):
+            divergencias += 1
+            print(f"❌ Rodada {rodada}: CSV completo diferente da referência.")
+    conn.close()
+    return divergencias
+
+
+def verifica_migracao(pasta: str, rng: random.Random) -> int:
+    """
+    Banco no formato antigo (observações dentro do JSON da linha): ao conectar, os corpos vão
+    para chamadas_corpos e o CSV completo continua o mesmo.
+    """
+    caminho_banco = os.path.join(pasta, "antigo.sqlite3")
+    conn = armazenamento.conecta(caminho_banco)
+    armazenamento.adiciona_colunas(conn, "chamadas", COLUNAS_CHAMADAS)
+    negocios = [str(10**10 + i) for i in range(20)]
+    linhas = [chamada_completa(rng, str(i), negocios) for i in range(1, 501)]
+    for ordem, linha in enumerate(linhas):
+        conn.execute(
+            "INSERT INTO chamadas (id, ordem, data, proprietario, negocio_id, dados) VALUES (?, ?, ?, ?, ?, ?)",
+            (linha["ID do objeto"], ordem, None, None, None, json.dumps(linha, ensure_ascii=False)),
+        )
+    conn.execute("DELETE FROM metadados WHERE chave = 'colunas_frias'")
+    conn.commit()
+    conn.close()
+
+    conn = armazenamento.conecta(caminho_banco)
+    caminho = os.path.join(pasta, "migrado.csv")
+    with contextlib.redirect_stdout(io.StringIO()):
+        armazenamento.exporta_csv(conn, "chamadas", caminho)
+    esperado = csv_de_referencia({linha["ID do objeto"]: linha for linha in linhas}, [linha["ID do objeto"] for linha in linhas])
+    restantes = conn.execute("""SELECT COUNT(*) FROM chamadas WHERE json_type(dados, '$."Observações de chamada"') IS NOT NULL""").fetchone()[0]
+    conn.close()
+
+    divergencias = int(le_arquivo(caminho) != esperado) + int(restantes != 0)
+    if divergencias:
+        print(f"❌ Migração: CSV igual = {le_arquivo(caminho) == esperado}, linhas ainda com observações = {restantes}.")
+    return divergencias
+
+
+def verifica_merge(pasta: str, rng: random.Random, total: int) -> int:
+    """
+    O merge a partir do resumo (usecols + tipos declarados) gera o mesmo arquivo que o merge a
+    partir do chamadas.csv completo lido sem tipos.
+    """
+    negocios = [novo_negocio(rng, str(10**10 + i)) for i in range(total // 10)]
+    ids_negocios = [negocio["ID do registro."] for negocio in negocios]
+    chamadas = [chamada_completa(rng, str(i), ids_negocios) for i in range(1, total + 1)]
+    caminho_completo = os.path.join(pasta, "chamadas-completo.csv")
+    caminho_resumo = os.path.join(pasta, "chamadas-resumo.csv")
+    with open(caminho_completo, "w", newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUNAS_CHAMADAS, quoting=csv.QUOTE_ALL)
+        writer.writeheader()
+        writer.writerows(chamadas)
+    pd.read_csv(caminho_completo, dtype=str, keep_default_na=False)[armazenamento.TABELAS["chamadas"]["colunas_resumo"]].to_csv(
+        caminho_resumo, index=False, quoting=csv.QUOTE_ALL
+    )
+    df_negocios = pd.DataFrame(negocios).replace("", float("nan"))
+
+    saidas = []
+    for df_chamadas in (pd.read_csv(caminho_completo), merge.le_chamadas(caminho_resumo)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            df = merge.calcula_lead_time(merge.merge_negocios(merge.prepara_merge(df_chamadas), df_negocios))
+        saidas.append(df.to_csv(index=False))
+    if saidas[0] != saidas[1]:
+        print("❌ Merge a partir do resumo diferente do merge a partir do CSV completo.")
+        return 1
+    return 0
+
+
+def benchmark(pasta: str, rng: random.Random, total: int):
+    negocios = [str(10**10 + i) for i in range(total // 10)]
+    modelos = [chamada_completa(rng, str(i), negocios) for i in range(1, 1001)]
+    caminho_completo = os.path.join(pasta, "bench-completo.csv")
+    caminho_resumo = os.path.join(pasta, "bench-resumo.csv")
+    colunas_resumo = armazenamento.TABELAS["chamadas"]["colunas_resumo"]
+    with open(caminho_completo, "w", newline='', encoding='utf-8') as completo, open(caminho_resumo, "w", newline='', encoding='utf-8') as resumo:
+        escritor_completo = csv.DictWriter(completo, fieldnames=COLUNAS_CHAMADAS, quoting=csv.QUOTE_ALL)
+        escritor_resumo = csv.DictWriter(resumo, fieldnames=colunas_resumo, quoting=csv.QUOTE_ALL, extrasaction="ignore")
+        escritor_completo.writeheader()
+        escritor_resumo.writeheader()
+        for i in range(total):
+            linha = dict(modelos[i % len(modelos)], **{"ID do objeto": str(i + 1)})
+            escritor_completo.writerow(linha)
+            escritor_resumo.writerow(linha)
+
+    inicio = time.perf_counter()
+    pd.read_csv(caminho_completo)
+    tempo_completo = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    merge.le_chamadas(caminho_resumo)
+    tempo_resumo = time.perf_counter() - inicio
+    tamanho = lambda caminho: os.path.getsize(caminho) / 2**20
+    print(f"⏱️  {total} chamadas — chamadas.csv completo ({tamanho(caminho_completo):.0f} MB): {tempo_completo:.2f}s | "
+          f"resumo com usecols e tipos ({tamanho(caminho_resumo):.0f} MB): {tempo_resumo:.2f}s ({tempo_completo / tempo_resumo:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Confere a separação das chamadas em tabela quente (resumo) e corpos.")
+    parser.add_argument("--rodadas", type=int, default=5)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--benchmark", action="store_true", help="Mede a leitura do CSV completo contra a do resumo.")
+    parser.add_argument("--chamadas", type=int, default=1_000_000, help="Chamadas sintéticas do benchmark.")
+    args = parser.parse_args()
+
+    rng = random.Random(args.semente)
+    pasta = tempfile.mkdtemp(prefix="corpos_chamadas_")
+    divergencias = verifica_ida_e_volta(pasta, rng, args.rodadas)
+    divergencias += verifica_migracao(pasta, rng)
+    divergencias += verifica_merge(pasta, rng, 5000)
+    if divergencias:
+        raise SystemExit(f"❌ {divergencias} divergências.")
+    print("✅ CSV completo reconstruído igual ao original, migração sem perdas e merge a partir do resumo idêntico.")
+
+    if args.benchmark:
+        benchmark(pasta, rng, args.chamadas)
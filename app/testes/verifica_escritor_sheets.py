@@ -0,0 +1,166 @@
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+
+from gspread.exceptions import APIError
+
+from app.api import escritor_sheets
+from app.api import exportar_para_sheets as sheets
+from app.services.limitador import BaldeDeTokens
+from app.testes.planilha_falsa import PlanilhaFalsa
+
+
+def valores_aleatorios(rng: random.Random, linhas: int, colunas: int) -> list:
+    cabecalho = [f"Coluna {c}" for c in range(colunas)]
+    return [cabecalho] + [
+        [rng.choice([rng.randint(0, 10**6), f"texto {rng.randint(0, 999)}", ""]) for _ in range(colunas)]
+        for _ in range(linhas)
+    ]
+
+
+def como_texto(valores: list) -> list:
+    return [[PlanilhaFalsa._texto(valor) for valor in linha] for linha in valores]
+
+
+def escreve(planilha: PlanilhaFalsa, valores: list):
+    with contextlib.redirect_stdout(io.StringIO()):
+        sheets.envia_intervalos(planilha, [{"range": "A1", "values": valores}])
+
+
+def verifica_lotes(rng: random.Random) -> int:
+    """
+    Reescrita de uma aba grande em lotes: mesma aba que uma escrita só, com o número de lotes
+    esperado pelo limite de células.
+    """
+    valores = valores_aleatorios(rng, 2000, 12)
+    planilha = PlanilhaFalsa()
+    escreve(planilha, valores)
+    esperado = -(-len(valores) * 12 // escritor_sheets.MAX_CELULAS_POR_LOTE)
+    if planilha.get_all_values() != como_texto(valores) or planilha.requisicoes - 1 != esperado:
+        print(f"❌ Lotes: aba igual = {planilha.get_all_values() == como_texto(valores)}, {planilha.requisicoes - 2} requisições (esperado {esperado}).")
+        return 1
+    return 0
+
+
+def verifica_retentativas(rng: random.Random) -> int:
+    """
+    429 e 5xx no meio da escrita são repetidos e a aba termina igual.
+    """
+    valores = valores_aleatorios(rng, 2000, 12)
+    planilha = PlanilhaFalsa()
+    planilha.falhas = [None, 429, 503, None, 500, 429]
+    escreve(planilha, valores)
+    if planilha.get_all_values() != como_texto(valores) or planilha.falhas_levantadas != 4:
+        print(f"❌ Retentativas: aba igual = {planilha.get_all_values() == como_texto(valores)}, {planilha.falhas_levantadas} falhas levantadas.")
+        return 1
+    return 0
+
+
+def verifica_retomada(rng: random.Random) -> int:
+    """
+    Escrita que desiste no meio (falhas seguidas) e é repetida: a segunda tentativa pula os lotes
+    já gravados e a aba termina igual; erro não retentável (400) não é repetido.
+    """
+    divergencias = 0
+    valores = valores_aleatorios(rng, 2000, 12)
+    planilha = PlanilhaFalsa()
+    planilha.falhas = [None, None] + [503] * escritor_sheets.MAX_TENTATIVAS
+    try:
+        escreve(planilha, valores)
+        divergencias += 1
+        print("❌ Retomada: a escrita devia ter desistido.")
+    except APIError:
+        pass
+    if not os.path.exists(escritor_sheets.CAMINHO_PROGRESSO):
+        divergencias += 1
+        print("❌ Retomada: progresso não gravado.")
+
+    antes = planilha.celulas_escritas
+    escreve(planilha, valores)
+    restantes = len(valores) * 12 - 2 * (escritor_sheets.MAX_CELULAS_POR_LOTE // 12 * 12)
+    if planilha.get_all_values() != como_texto(valores) or planilha.celulas_escritas - antes != restantes:
+        divergencias += 1
+        print(f"❌ Retomada: {planilha.celulas_escritas - antes} células reenviadas (esperado {restantes}).")
+    if os.path.exists(escritor_sheets.CAMINHO_PROGRESSO):
+        divergencias += 1
+        print("❌ Retomada: progresso não apagado depois da escrita completa.")
+
+    planilha.falhas = [400]
+    try:
+        escreve(planilha, valores)
+        divergencias += 1
+        print("❌ Erro 400 devia ser relançado.")
+    except APIError:
+        if planilha.falhas_levantadas != escritor_sheets.MAX_TENTATIVAS + 1:
+            divergencias += 1
+            print("❌ Erro 400 foi repetido.")
+    return divergencias
+
+
+def verifica_insercao(rng: random.Random) -> int:
+    """
+    Inserção em lotes mantém a ordem das linhas; 429 é repetido, 503 não (a inserção pode ter
+    sido aplicada).
+    """
+    divergencias = 0
+    existentes = valores_aleatorios(rng, 10, 12)
+    novas = [[f"novo {i}"] + [""] * 11 for i in range(1500)]
+    planilha = PlanilhaFalsa(existentes)
+    planilha.falhas = [None, 429]
+    with contextlib.redirect_stdout(io.StringIO()):
+        escritor_sheets.EscritorSheets(planilha).insere_linhas(novas, 2)
+    if planilha.get_all_values() != como_texto(existentes[:1] + novas + existentes[1:]):
+        divergencias += 1
+        print("❌ Inserção em lotes fora de ordem.")
+
+    planilha.falhas = [503]
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            escritor_sheets.EscritorSheets(planilha).insere_linhas(novas[:10], 2)
+        divergencias += 1
+        print("❌ Inserção repetida depois de 503.")
+    except APIError:
+        pass
+    return divergencias
+
+
+def verifica_ritmo() -> int:
+    """
+    Com a cota em 120 escritas por minuto e rajada 1, 5 lotes levam pelo menos 2 s.
+    """
+    escritor_sheets.balde_escritas = BaldeDeTokens(120 / 60, 1)
+    planilha = PlanilhaFalsa()
+    valores = [[f"c{c}" for c in range(10)] for _ in range(5 * escritor_sheets.MAX_CELULAS_POR_LOTE // 10)]
+    inicio = time.perf_counter()
+    escreve(planilha, valores)
+    tempo = time.perf_counter() - inicio
+    if tempo < 1.9:
+        print(f"❌ Ritmo: 5 lotes em {tempo:.2f}s com cota de 2 por segundo.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Confere o escritor do Sheets (lotes, cota, retentativas e retomada) contra uma aba falsa.")
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    pasta = tempfile.mkdtemp(prefix="escritor_sheets_")
+    escritor_sheets.CAMINHO_PROGRESSO = os.path.join(pasta, "planilha-progresso.json")
+    escritor_sheets.MAX_CELULAS_POR_LOTE = 5000
+    escritor_sheets.BACKOFF_BASE = 0.0
+    escritor_sheets.balde_escritas = BaldeDeTokens(10_000, 10_000)
+
+    rng = random.Random(args.semente)
+    divergencias = verifica_lotes(rng)
+    divergencias += verifica_retentativas(rng)
+    divergencias += verifica_retomada(rng)
+    divergencias += verifica_insercao(rng)
+    divergencias += verifica_ritmo()
+    if divergencias:
+        raise SystemExit(f"❌ {divergencias} divergências.")
+    print("✅ Escritas em lotes iguais à escrita única, com cota, retentativas e retomada do último lote gravado.")
@@ -0,0 +1,109 @@
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+
+from app.api import atualizar_negocios_chamadas as atualizar
+from app.api import exportar_para_sheets as sheets
+from app.api import main as pipeline
+from app.testes.verifica_pipeline_paralelo import gera_registros, prepara_pasta
+
+CABECALHO = [
+    "ID do registro.", "Nome do negócio", "Etapa do negócio", "Data de criação", "Semana de criação", "Mês de criação",
+    "status_cadastro", "Momento de Compra", "Proprietário do negócio", "Horário Comercial", "Data da primeira chamada",
+    "Lead time (min)",
+]
+
+executadas = []
+leituras_aba = []
+falhas_leitura = []
+
+
+def conta(nome: str, funcao):
+    def envolvida(*args, **kwargs):
+        executadas.append(nome)
+        return funcao(*args, **kwargs)
+    return envolvida
+
+
+def rodada(descricao: str, esperadas: list, **opcoes) -> int:
+    """
+    Uma execução do orquestrador; confere quais etapas (merge, sheets) rodaram e que a aba foi
+    lida uma vez, junto com as sincronizações, também quando o Sheets foi pulado.
+    """
+    executadas.clear()
+    leituras_aba.clear()
+    saida = io.StringIO()
+    with contextlib.redirect_stdout(saida):
+        pipeline.executar_pipeline_completo(**opcoes)
+    if executadas != esperadas:
+        motivos = [linha for linha in saida.getvalue().splitlines() if "⏭️" in linha or "▶️" in linha]
+        print(f"❌ {descricao}: rodaram {executadas or 'nenhuma'}, esperado {esperadas or 'nenhuma'}. {motivos}")
+        return 1
+    if len(leituras_aba) != 1:
+        print(f"❌ {descricao}: aba lida {len(leituras_aba)} vez(es).")
+        return 1
+    if falhas_leitura and "⚠️  Leitura da aba do Sheets falhou" not in saida.getvalue():
+        print(f"❌ {descricao}: falha na leitura da aba não foi avisada.")
+        return 1
+    return 0
+
+
+def le_aba_contando(prepara_planilha):
+    def envolvida():
+        leituras_aba.append(True)
+        if falhas_leitura:
+            raise ConnectionError("aba indisponível")
+        return prepara_planilha()
+    return envolvida
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Confere quando o orquestrador pula merge e Sheets (entradas sem mudança) e o --forcar.")
+    parser.add_argument("--negocios", type=int, default=500)
+    parser.add_argument("--chamadas", type=int, default=1500)
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.semente)
+    registros = gera_registros(rng, args.negocios, args.chamadas)
+    pasta = tempfile.mkdtemp(prefix="etapas_puladas_")
+    planilha = prepara_pasta(pasta, registros, 0.0, 0.0, [CABECALHO, ["1", "Negócio antigo", "Ganho", "2025-01-02 10:00"] + [""] * 8])
+    pipeline.merge_dados = conta("merge", pipeline.merge_dados)
+    pipeline.atualiza_planilha = conta("sheets", pipeline.atualiza_planilha)
+    pipeline.prepara_planilha = le_aba_contando(pipeline.prepara_planilha)
+
+    divergencias = rodada("Primeira execução", ["merge", "sheets"])
+    aba = planilha.get_all_values()
+    escritas = planilha.celulas_escritas
+    divergencias += rodada("Sem mudanças na HubSpot", [])
+    if planilha.get_all_values() != aba or planilha.celulas_escritas != escritas:
+        divergencias += 1
+        print("❌ A aba foi escrita numa execução pulada.")
+
+    # Uma chamada nova muda o resumo das chamadas: merge e Sheets voltam a rodar
+    chamadas = registros[atualizar.CHAMADAS_URL]
+    novo_id = str(int(chamadas[-1]["id"]) + 1)
+    chamadas.append({"id": novo_id, "properties": dict(chamadas[-1]["properties"], hs_object_id=novo_id, hs_timestamp="2024-12-31T12:00:00.000Z")})
+    divergencias += rodada("Chamada nova", ["merge", "sheets"])
+    divergencias += rodada("Sem mudanças depois da chamada nova", [])
+
+    # Leitura da aba falhando numa execução em que o Sheets é pulado: só um aviso
+    falhas_leitura.append(True)
+    divergencias += rodada("Aba indisponível sem mudanças", [])
+    falhas_leitura.clear()
+
+    divergencias += rodada("--forcar", ["merge", "sheets"], forcar=True)
+    divergencias += rodada("--merge-completo", ["merge", "sheets"], merge_completo=True)
+
+    # Saída apagada (forma documentada de forçar a reescrita da aba): o Sheets roda, com o merge
+    # antes para refazer o negocios-chamadas que ele lê
+    os.remove(sheets.PLANILHA_ENVIADA_PATH)
+    divergencias += rodada("Cópia do último envio apagada", ["merge", "sheets"])
+    divergencias += rodada("Sem mudanças depois da reescrita", [])
+
+    if divergencias:
+        raise SystemExit(f"❌ {divergencias} divergências.")
+    print("✅ Merge e Sheets pulados só quando entradas e saídas não mudaram (aba lida com as sincronizações e descartada), e executados com --forcar.")
@@ -0,0 +1,81 @@
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.api.atualizar_negocios_chamadas import formata_data, formata_datas
+
+INICIO_AMOSTRA = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def sorteia_timestamp(rng: random.Random) -> str:
+    """
+    Timestamps no formato da HubSpot, com parte das amostras em formatos alternativos ou inválidos
+    (que devem cair no caminho escalar com o mesmo resultado).
+    """
+    instante = INICIO_AMOSTRA + timedelta(milliseconds=rng.randrange(7 * 365 * 86400 * 1000))
+    sorteio = rng.random()
+    if sorteio < 0.75:
+        return instante.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+    if sorteio < 0.9:
+        return instante.strftime("%Y-%m-%dT%H:%M:%SZ")
+    return rng.choice([
+        instante.strftime("%Y-%m-%d"),
+        instante.strftime("%Y-%m-%dT%H:%M:%S+00:00"),
+        instante.strftime("%Y-%m-%dT%H:%M:%S.%f-03:00"),
+        "2025-02-30T10:00:00.000Z",
+        "2025-03-10T24:00:00Z",
+        "0001-01-01T01:00:00Z",
+        "data-invalida",
+        "",
+        None,
+    ])
+
+
+def verifica(timestamps: list) -> int:
+    esperado = [formata_data(valor) for valor in timestamps]
+    divergencias = 0
+    # Em blocos do tamanho de uma página, como no processamento, e também tudo de uma vez
+    for tamanho in (100 * 11, len(timestamps)):
+        obtido = []
+        for inicio in range(0, len(timestamps), tamanho):
+            obtido.extend(formata_datas(timestamps[inicio:inicio + tamanho]))
+        for valor, a, b in zip(timestamps, esperado, obtido):
+            if a != b:
+                divergencias += 1
+                if divergencias <= 10:
+                    print(f"❌ {valor!r}: formata_data {a!r}, formata_datas {b!r}")
+    return divergencias
+
+
+def benchmark(timestamps: list):
+    inicio = time.perf_counter()
+    [formata_data(valor) for valor in timestamps]
+    tempo_escalar = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    formata_datas(timestamps)
+    tempo_lote = time.perf_counter() - inicio
+
+    print(f"⏱️  {len(timestamps)} timestamps")
+    print(f"   formata_data:  {tempo_escalar:.2f}s")
+    print(f"   formata_datas: {tempo_lote:.2f}s ({tempo_escalar / tempo_lote:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara formata_datas (lote) com formata_data (escalar).")
+    parser.add_argument("--amostras", type=int, default=1_000_000)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--benchmark", action="store_true", help="Mede o tempo das duas versões.")
+    args = parser.parse_args()
+
+    rng = random.Random(args.semente)
+    timestamps = [sorteia_timestamp(rng) for _ in range(args.amostras)]
+
+    divergencias = verifica(timestamps)
+    if divergencias:
+        raise SystemExit(f"❌ {divergencias} divergências em {len(timestamps)} timestamps.")
+    print(f"✅ {len(timestamps)} timestamps com o mesmo resultado nas duas versões.")
+
+    if args.benchmark:
+        benchmark(timestamps)
@@ -0,0 +1,83 @@
+import argparse
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.services.calendario_comercial import CalendarioComercial, feriados_nacionais
+from app.services.merge_negocios_chamadas import (
+    UTC,
+    arredonda_para_periodo_util,
+    calcula_lead_time_util,
+    calcula_lead_time_util_vetorizado,
+)
+
+INICIO_AMOSTRA = datetime(2024, 1, 1)
+FIM_AMOSTRA = datetime(2026, 12, 31)
+
+
+def sorteia_data(rng: random.Random) -> datetime:
+    """
+    Sorteia um instante com precisão de minuto, puxando parte das amostras para as bordas do horário comercial.
+    """
+    dias = rng.randrange((FIM_AMOSTRA - INICIO_AMOSTRA).days)
+    if rng.random() < 0.3:
+        minuto = rng.choice([0, 479, 480, 481, 1079, 1080, 1081, 1199, 1200, 1201, 1439])
+    else:
+        minuto = rng.randrange(1440)
+    return INICIO_AMOSTRA + timedelta(days=dias, minutes=minuto)
+
+
+def verifica(amostras: int, semente: int) -> int:
+    """
+    Compara a versão vetorizada com a escalar em pares aleatórios (inclusive fim antes do início,
+    mesmo dia e intervalos de semanas), usando um calendário sem feriados, que é a regra da versão
+    escalar. Também confere o próximo instante útil contra arredonda_para_periodo_util e que os
+    feriados só tiram minutos. Retorna o número de divergências.
+    """
+    sem_feriados = CalendarioComercial(INICIO_AMOSTRA.date(), FIM_AMOSTRA.date() + timedelta(days=7), feriados={})
+    feriados = {}
+    for ano in range(INICIO_AMOSTRA.year, FIM_AMOSTRA.year + 1):
+        feriados.update(feriados_nacionais(ano))
+    com_feriados = CalendarioComercial(INICIO_AMOSTRA.date(), FIM_AMOSTRA.date() + timedelta(days=7), feriados=feriados)
+
+    rng = random.Random(semente)
+    inicios, fins = [], []
+    for _ in range(amostras):
+        inicio = sorteia_data(rng)
+        if rng.random() < 0.3:
+            fim = inicio + timedelta(minutes=rng.randrange(-600, 2 * 1440))
+        else:
+            fim = sorteia_data(rng)
+        inicios.append(inicio)
+        fins.append(fim)
+
+    inicios_np = np.array(inicios, dtype="datetime64[m]")
+    fins_np = np.array(fins, dtype="datetime64[m]")
+    vetorizado = calcula_lead_time_util_vetorizado(inicios_np, fins_np, sem_feriados)
+    proximos = sem_feriados.proximo_instante_util(inicios_np)
+
+    divergencias = 0
+    for inicio, fim, minutos, proximo in zip(inicios, fins, vetorizado, proximos):
+        esperado = int(calcula_lead_time_util(inicio.replace(tzinfo=UTC), fim.replace(tzinfo=UTC)).total_seconds() // 60)
+        proximo_esperado = np.datetime64(arredonda_para_periodo_util(inicio.replace(tzinfo=UTC)).replace(tzinfo=None), "m")
+        if esperado != minutos or proximo_esperado != proximo:
+            divergencias += 1
+            if divergencias <= 10:
+                print(f"❌ {inicio} → {fim}: escalar {esperado} min / {proximo_esperado}, vetorizado {minutos} min / {proximo}")
+
+    descontado = vetorizado - calcula_lead_time_util_vetorizado(inicios_np, fins_np, com_feriados)
+    divergencias += int((descontado < 0).sum())
+    return divergencias
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verifica se o lead time vetorizado bate com o escalar.")
+    parser.add_argument("--amostras", type=int, default=20_000)
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    divergencias = verifica(args.amostras, args.semente)
+    if divergencias:
+        raise SystemExit(f"❌ {divergencias} divergências em {args.amostras} amostras.")
+    print(f"✅ {args.amostras} amostras idênticas entre a versão escalar e a vetorizada.")
@@ -0,0 +1,103 @@
+import argparse
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+
+from app.api import cliente_hubspot
+from app.api.cliente_hubspot import ClienteHubSpot, LimiteDiarioExcedido
+from app.services.limitador import BaldeDeTokens
+
+
+class RespostaFalsa:
+    def __init__(self, restante=None):
+        self.status_code = 200
+        self.ok = True
+        self.headers = {cliente_hubspot.CABECALHO_RESTANTE_DIARIO: str(restante)} if restante is not None else {}
+
+
+def novo_cliente(restante=None) -> ClienteHubSpot:
+    """
+    Um cliente por "execução do cron" (processo novo), respondendo sem rede e sem espera local.
+    """
+    cliente = ClienteHubSpot(api_key="chave-teste")
+    cliente.balde = cliente.balde_busca = BaldeDeTokens(10_000, 10_000)
+    cliente.session.request = lambda metodo, url, **kwargs: RespostaFalsa(restante)
+    return cliente
+
+
+def requisicoes_ate_o_limite(cliente: ClienteHubSpot, maximo: int) -> int:
+    """
+    Faz até `maximo` requisições e encerra a "execução" gravando a contagem, como o atexit do processo.
+    """
+    feitas = 0
+    try:
+        for _ in range(maximo):
+            cliente.get("/crm/v3/owners")
+            feitas += 1
+    except LimiteDiarioExcedido:
+        pass
+    cliente.grava_contagem()
+    return feitas
+
+
+def confere(condicao: bool, mensagem: str) -> int:
+    if not condicao:
+        print(f"❌ {mensagem}")
+    return 0 if condicao else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Confere que o limite diário da HubSpot vale entre execuções (processos) do mesmo dia.")
+    parser.add_argument("--limite", type=int, default=50)
+    args = parser.parse_args()
+
+    cliente_hubspot.LIMITE_DIARIO = args.limite
+    cliente_hubspot.CAMINHO_CONTAGEM_DIARIA = os.path.join(tempfile.mkdtemp(prefix="limite_diario_"), "hubspot-requisicoes-dia.json")
+    divergencias = 0
+
+    # Três execuções no mesmo dia dividem o mesmo limite
+    primeira = requisicoes_ate_o_limite(novo_cliente(), args.limite // 2)
+    segunda = requisicoes_ate_o_limite(novo_cliente(), args.limite)
+    terceira = requisicoes_ate_o_limite(novo_cliente(), args.limite)
+    divergencias += confere(
+        (primeira, segunda, terceira) == (args.limite // 2, args.limite - args.limite // 2, 0),
+        f"Requisições por execução: {primeira}, {segunda}, {terceira} (limite {args.limite}).",
+    )
+
+    # A contagem fica em memória: o arquivo só muda a cada GRAVA_CONTAGEM_A_CADA requisições
+    gravacoes = []
+    grava_original = cliente_hubspot.grava_contagem_diaria
+
+    def grava_anotando(dia: str, requisicoes: int):
+        gravacoes.append(requisicoes)
+        grava_original(dia, requisicoes)
+
+    cliente_hubspot.grava_contagem_diaria = grava_anotando
+    cliente_hubspot.LIMITE_DIARIO, cliente_hubspot.GRAVA_CONTAGEM_A_CADA = 10 * args.limite, args.limite // 5
+    os.remove(cliente_hubspot.CAMINHO_CONTAGEM_DIARIA)
+    requisicoes_ate_o_limite(novo_cliente(), args.limite)
+    divergencias += confere(
+        gravacoes == list(range(args.limite // 5, args.limite + 1, args.limite // 5)),
+        f"Gravações da contagem: {gravacoes}.",
+    )
+    cliente_hubspot.grava_contagem_diaria = grava_original
+    cliente_hubspot.LIMITE_DIARIO, cliente_hubspot.GRAVA_CONTAGEM_A_CADA = args.limite, 100
+
+    # Num dia novo a contagem recomeça
+    ontem = (date.today() - timedelta(days=1)).isoformat()
+    with open(cliente_hubspot.CAMINHO_CONTAGEM_DIARIA, "w", encoding="utf-8") as f:
+        json.dump({"dia": ontem, "requisicoes": args.limite}, f)
+    divergencias += confere(requisicoes_ate_o_limite(novo_cliente(), 3) == 3, "Contagem de ontem bloqueou as requisições de hoje.")
+
+    # O restante informado pela HubSpot (outras integrações gastando o mesmo limite) adianta a contagem
+    requisicoes_ate_o_limite(novo_cliente(restante=2), 1)
+    divergencias += confere(
+        cliente_hubspot.le_contagem_diaria(date.today().isoformat()) == args.limite - 2,
+        f"Contagem não seguiu o cabeçalho: {cliente_hubspot.le_contagem_diaria(date.today().isoformat())}.",
+    )
+    divergencias += confere(requisicoes_ate_o_limite(novo_cliente(), args.limite) == 2, "Restante da HubSpot não limitou a execução seguinte.")
+
+    if divergencias:
+        raise SystemExit(f"❌ {divergencias} divergências.")
+    print(f"✅ Limite diário de {args.limite} requisições dividido entre execuções, gravado em lotes, zerado no dia seguinte e ajustado pelo cabeçalho da HubSpot.")
@@ -0,0 +1,122 @@
+import argparse
+import random
+import re
+import time
+
+from bs4 import BeautifulSoup
+
+from app.api import atualizar_negocios_chamadas
+from app.api.atualizar_negocios_chamadas import limpa_html
+from app.services.texto_html import html_para_texto
+
+# Corpos no formato que a HubSpot devolve em hs_call_body
+CORPUS_FIXO = [
+    "<p>Cliente atendeu, pediu retorno amanhã às 10h.</p>",
+    "<p>Liguei 3x</p><p>Não atendeu</p><p>Deixei recado no WhatsApp</p>",
+    "<p>Renda: R$&nbsp;8.500,00<br>Imóvel em SP<br/>Entrada de 20%</p>",
+    "<div><p><strong>Resumo:</strong> quer comprar em 6 meses</p><ul><li>2 quartos</li><li>Zona Sul</li></ul></div>",
+    "<p>Cliente &amp; esposa vão visitar o imóvel &#8211; sábado</p>",
+    "Sem tags, só texto corrido. TudoJunto",
+    "<p></p><p> </p><br><br>",
+    "<p>Aguardando docs<!-- nota interna --></p><script>alert(1)</script><style>p{color:red}</style>",
+    "<p>Falou com o corretor<br>Pediu proposta</p><p>Enviar simulação</p>",
+    "<p>&#147;Quero fechar logo&#148; &copy; &naoexiste; &lt;fim&gt;</p>",
+    "<table><tr><td>Valor</td><td>R$ 500 mil</td></tr></table>",
+    "<p>Texto<br>com quebra<br/>sem fechamento<br/>de novo</p>",
+    "<P>Maiúsculas</P><BR>Depois",
+    "<p>Ligação caiu<![CDATA[ trecho cdata ]]>retornar</p>",
+    "",
+]
+
+PEDACOS_ALEATORIOS = [
+    "<p>", "</p>", "<br>", "<br/>", "</br>", "<b>", "</b>", '<div class="x">', "</div>",
+    "<script>var a=1<b>;</script>", "<style>p{}</style>", "<template>t</template>", "<rt>r</rt>",
+    "<!-- c -->", "<!DOCTYPE html>", "<![CDATA[ cd ]]>", "<?pi x?>", "&amp;", "&nbsp;", "&#147;",
+    "&#x41;", "&#129;", "&foo;", "&copy", "&", "<", ">", " ", "\n", "\t", "\xa0", "Olá", "mundo",
+    "Tudo bem", "aB", "João Silva", "ligar amanhã", "<img src=x>", "<hr>", "<span>", "</span>",
+    "<ul><li>item</li></ul>", '<a href="#">link</a>', "<P>", "<BR>", "</", "<!", "<a",
+]
+
+
+def limpa_html_beautifulsoup(html: str) -> str:
+    """
+    Implementação anterior de limpa_html, mantida como referência.
+    """
+    if not html:
+        return ""
+
+    soup = BeautifulSoup(html, "html.parser")
+
+    for br in soup.find_all("br"):
+        br.replace_with("\n")
+
+    for p in soup.find_all("p"):
+        if p.text and not p.text.endswith("\n"):
+            p.append("\n")
+
+    texto = soup.get_text(separator='', strip=True)
+    texto_formatado = re.sub(r'(?<=[a-z])(?=[A-Z])', '\n', texto)
+    return texto_formatado.strip()
+
+
+def gera_corpus(amostras: int, semente: int) -> list:
+    rng = random.Random(semente)
+    corpus = list(CORPUS_FIXO)
+    for _ in range(amostras):
+        corpus.append("".join(rng.choice(PEDACOS_ALEATORIOS) for _ in range(rng.randint(1, 30))))
+    return corpus
+
+
+def verifica(corpus: list) -> int:
+    divergencias = 0
+    for html in corpus:
+        esperado = limpa_html_beautifulsoup(html)
+        obtido = html_para_texto(html) if html else ""
+        if esperado != obtido:
+            divergencias += 1
+            if divergencias <= 10:
+                print(f"❌ {html!r}\n   BeautifulSoup: {esperado!r}\n   novo:          {obtido!r}")
+    return divergencias
+
+
+def benchmark(corpus: list, repeticoes: int):
+    corpos = [html for html in corpus if html] * repeticoes
+
+    inicio = time.perf_counter()
+    for html in corpos:
+        limpa_html_beautifulsoup(html)
+    tempo_bs = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for html in corpos:
+        html_para_texto(html)
+    tempo_novo = time.perf_counter() - inicio
+
+    atualizar_negocios_chamadas._CACHE_HTML.clear()
+    inicio = time.perf_counter()
+    for html in corpos:
+        limpa_html(html)
+    tempo_cache = time.perf_counter() - inicio
+
+    print(f"⏱️  {len(corpos)} corpos")
+    print(f"   BeautifulSoup:        {tempo_bs:.2f}s")
+    print(f"   tokenizador:          {tempo_novo:.2f}s ({tempo_bs / tempo_novo:.1f}x)")
+    print(f"   limpa_html com cache: {tempo_cache:.2f}s ({tempo_bs / tempo_cache:.1f}x, {repeticoes} repetições de cada corpo)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara limpa_html com a versão anterior (BeautifulSoup).")
+    parser.add_argument("--amostras", type=int, default=20_000, help="Corpos aleatórios além do corpus fixo.")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--benchmark", action="store_true", help="Mede o tempo das duas versões.")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Repetições de cada corpo no benchmark.")
+    args = parser.parse_args()
+
+    corpus = gera_corpus(args.amostras, args.semente)
+    divergencias = verifica(corpus)
+    if divergencias:
+        raise SystemExit(f"❌ {divergencias} divergências em {len(corpus)} corpos.")
+    print(f"✅ {len(corpus)} corpos com saída idêntica à versão com BeautifulSoup.")
+
+    if args.benchmark:
+        benchmark(corpus, args.repeticoes)
@@ -0,0 +1,186 @@
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+
+import pandas as pd
+
+from app.services import armazenamento, calendario_comercial, snapshots
+from app.services import merge_negocios_chamadas as merge
+
+TAMANHO_PAGINA = 100
+
+
+def sorteia_data(rng: random.Random) -> str:
+    sorteio = rng.random()
+    if sorteio < 0.03:
+        return ""
+    if sorteio < 0.04:
+        return "2025-13-01 10:00"
+    if sorteio < 0.1:
+        return "2025-03-10 09:00"  # empates, decididos pelo ID da chamada
+    return f"202{rng.randint(4, 5)}-{rng.randint(1, 12):02}-{rng.randint(1, 28):02} {rng.randint(0, 23):02}:{rng.randint(0, 59):02}"
+
+
+def novo_negocio(rng: random.Random, negocio_id: str) -> dict:
+    return {
+        "ID do registro.": negocio_id,
+        "Nome do negócio": f"Negócio {negocio_id}",
+        "Data de criação": sorteia_data(rng),
+        "Momento de Compra": rng.choice(["Estou no começo da jornada", "Só quero saber como funciona", ""]),
+        "Proprietário do negócio": rng.choice(["Ana", "Bia"]),
+    }
+
+
+def nova_chamada(rng: random.Random, chamada_id: str, negocios: list) -> dict:
+    negocio_id = rng.choice(negocios) if rng.random() < 0.95 else ""
+    return {
+        "ID do objeto": chamada_id,
+        "Título da chamada": f"Chamada com Cliente {negocio_id}",
+        "Data da atividade": sorteia_data(rng),
+        "Atividade atribuída a": rng.choice(["Ana", "Bia", "Caio", ""]),
+        "Associated Deal IDs": negocio_id,
+        "Associated Deal": f"Cliente {negocio_id}",
+        "Observações de chamada": rng.choice(["Retornar amanhã", "Não atendeu\nligar de novo", ""]),
+    }
+
+
+def grava_em_paginas(conn, tipo: str, linhas: list):
+    for inicio in range(0, len(linhas), TAMANHO_PAGINA):
+        armazenamento.upsert(conn, tipo, linhas[inicio:inicio + TAMANHO_PAGINA])
+    conn.commit()
+
+
+def rodada(rng: random.Random, conn, negocios: list, chamadas: list, inicial: bool):
+    """
+    Simula uma sincronização: negócios e chamadas novos, chamadas que mudam de data, de dono
+    ou de negócio, e negócios com data de criação alterada.
+    """
+    novos_negocios = [novo_negocio(rng, str(rng.randrange(10**10, 10**11))) for _ in range(400 if inicial else 20)]
+    negocios.extend(negocio["ID do registro."] for negocio in novos_negocios)
+    alterados = []
+    if not inicial:
+        for negocio_id in rng.sample(negocios, 15):
+            alterados.append({"ID do registro.": negocio_id, "Data de criação": sorteia_data(rng)})
+    grava_em_paginas(conn, "negocios", novos_negocios + alterados)
+
+    linhas = []
+    for _ in range(3000 if inicial else 150):
+        chamada_id = str(len(chamadas) + 1)
+        chamadas.append(chamada_id)
+        linhas.append(nova_chamada(rng, chamada_id, negocios))
+    if not inicial:
+        for chamada_id in rng.sample(chamadas, 60):
+            alteracao = {"ID do objeto": chamada_id}
+            campo = rng.choice(["Data da atividade", "Atividade atribuída a", "Associated Deal IDs"])
+            if campo == "Data da atividade":
+                alteracao[campo] = sorteia_data(rng)
+            elif campo == "Atividade atribuída a":
+                alteracao[campo] = rng.choice(["Ana", "Bia", "Dora"])
+            else:
+                alteracao[campo] = rng.choice(negocios)
+            linhas.append(alteracao)
+    rng.shuffle(linhas)
+    grava_em_paginas(conn, "chamadas", linhas)
+
+
+def altera_calendario():
+    """
+    Feriado e horário especial novos em datas usadas pelos negócios: o memo do lead time não vale mais.
+    """
+    with open(calendario_comercial.CAMINHO_FERIADOS, "w", encoding="utf-8") as f:
+        f.write("data,nome\n2025-03-10,Feriado municipal\n")
+    with open(calendario_comercial.CAMINHO_HORARIOS_ESPECIAIS, "w", encoding="utf-8") as f:
+        f.write("data,abertura,fechamento\n2024-12-24,08:00,12:00\n2025-06-02,10:00,16:00\n")
+    calendario_comercial.calendario_padrao.cache_clear()
+
+
+def volta_ao_banco_antigo(conn):
+    """
+    Banco como antes da coluna data_chave (regra antiga, ordenando pela data do texto): ao
+    conectar de novo, a coluna é preenchida e o índice de primeiras chamadas é refeito.
+    """
+    conn.execute("DROP INDEX idx_chamadas_primeira")
+    for tipo in armazenamento.TABELAS:
+        conn.execute(f"DROP INDEX idx_{tipo}_data_chave")
+        conn.execute(f"ALTER TABLE {tipo} DROP COLUMN data_chave")
+    conn.execute(
+        "UPDATE metadados SET valor = 'chave_data(data) IS NULL, chave_data(data), CAST(id AS INTEGER), id' WHERE chave = 'regra_primeira_chamada'"
+    )
+    conn.commit()
+    conn.close()
+    return armazenamento.conecta()
+
+
+def recalcula_tudo(caminho_saida: str):
+    """
+    Referência: o caminho completo a partir dos CSVs, sem índice nem memo.
+    """
+    df = merge.prepara_merge(merge.le_chamadas())
+    df = merge.merge_negocios(df, pd.read_csv(merge.CAMINHO_NEGOCIOS))
+    merge.salva_csv(merge.calcula_lead_time(df), caminho_saida)
+
+
+def verifica(rodadas: int, semente: int) -> int:
+    rng = random.Random(semente)
+    pasta = tempfile.mkdtemp(prefix="merge_incremental_")
+    armazenamento.CAMINHO_BANCO = os.path.join(pasta, "hubspot.sqlite3")
+    snapshots.PASTA_PARQUET = os.path.join(pasta, "parquet")
+    merge.CAMINHO_NEGOCIOS = os.path.join(pasta, "negocios.csv")
+    merge.CAMINHO_CHAMADAS_RESUMO = os.path.join(pasta, "chamadas-resumo.csv")
+    merge.CAMINHO_NEGOCIOS_CHAMADAS = os.path.join(pasta, "negocios-chamadas")
+    calendario_comercial.CAMINHO_FERIADOS = os.path.join(pasta, "feriados.csv")
+    calendario_comercial.CAMINHO_HORARIOS_ESPECIAIS = os.path.join(pasta, "horarios_especiais.csv")
+    referencia = os.path.join(pasta, "negocios-chamadas-completo")
+
+    conn = armazenamento.conecta()
+    for tipo, colunas in (("negocios", list(novo_negocio(rng, "0"))), ("chamadas", list(nova_chamada(rng, "0", ["0"])))):
+        armazenamento.adiciona_colunas(conn, tipo, colunas)
+
+    negocios, chamadas = [], []
+    divergencias = 0
+    for numero in range(rodadas + 1):
+        saida = io.StringIO()
+        with contextlib.redirect_stdout(saida):
+            if numero == 1:
+                conn = volta_ao_banco_antigo(conn)
+            rodada(rng, conn, negocios, chamadas, inicial=numero == 0)
+            if numero == 2:
+                altera_calendario()
+            armazenamento.exporta_csv(conn, "negocios", merge.CAMINHO_NEGOCIOS)
+            armazenamento.exporta_resumo(conn, "chamadas", merge.CAMINHO_CHAMADAS_RESUMO)
+
+            merge.main()
+            recalcula_tudo(referencia)
+        print(f"Rodada {numero}: " + next((linha for linha in saida.getvalue().splitlines() if linha.startswith("🧮")), ""))
+
+        pares_memo = conn.execute("SELECT COUNT(*) FROM memo_lead_time").fetchone()[0]
+        if pares_memo > len(negocios) + 1:  # + o grupo das chamadas sem negócio
+            divergencias += 1
+            print(f"❌ Rodada {numero}: memo com {pares_memo} pares para {len(negocios)} negócios.")
+
+        with open(merge.CAMINHO_NEGOCIOS_CHAMADAS, encoding="utf-8") as a, open(referencia, encoding="utf-8") as b:
+            incremental, completo = a.read(), b.read()
+        if incremental != completo:
+            divergencias += 1
+            print(f"❌ Rodada {numero}: saída incremental diferente da completa.")
+            for linha_a, linha_b in zip(incremental.splitlines(), completo.splitlines()):
+                if linha_a != linha_b:
+                    print(f"   incremental: {linha_a}\n   completo:    {linha_b}")
+                    break
+    conn.close()
+    return divergencias
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara o merge incremental (índice + memo) com o recálculo completo.")
+    parser.add_argument("--rodadas", type=int, default=5, help="Sincronizações simuladas depois da carga inicial.")
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    divergencias = verifica(args.rodadas, args.semente)
+    if divergencias:
+        raise SystemExit(f"❌ {divergencias} rodadas com divergência.")
+    print(f"✅ {args.rodadas + 1} rodadas com saída incremental idêntica ao recálculo completo (inclusive após migrar o banco e mudar o calendário) e memo restrito aos pares em uso.")
@@ -0,0 +1,96 @@
+import argparse
+import contextlib
+import io
+import json
+import random
+import tempfile
+
+from gspread.exceptions import APIError
+
+from app.api import escritor_sheets
+from app.api import main as pipeline
+from app.services import metricas
+from app.testes.verifica_etapas_puladas import CABECALHO
+from app.testes.verifica_pipeline_paralelo import TAMANHO_PAGINA, gera_registros, prepara_pasta
+
+ETAPAS_ESPERADAS = [
+    "coleta_negocios", "coleta_chamadas", "processa_negocios", "processa_chamadas", "upsert_negocios",
+    "upsert_chamadas", "snapshot_negocios", "snapshot_chamadas", "atualiza_csv_negocios", "atualiza_csv_chamadas",
+    "merge_primeiras_chamadas", "merge_juncao", "merge_lead_time", "merge_gravacao", "sheets_autenticacao",
+    "sheets_leitura", "sheets_escrita", "pipeline_sincronizacao", "pipeline_merge", "pipeline_sheets",
+]
+
+
+def le_linhas() -> list:
+    with open(metricas.CAMINHO_METRICAS, encoding="utf-8") as f:
+        return [json.loads(linha) for linha in f]
+
+
+def confere(condicao: bool, mensagem: str) -> int:
+    if not condicao:
+        print(f"❌ {mensagem}")
+    return 0 if condicao else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Confere a linha JSON de métricas por execução do pipeline (HubSpot e Sheets locais).")
+    parser.add_argument("--negocios", type=int, default=700)
+    parser.add_argument("--chamadas", type=int, default=2100)
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    registros = gera_registros(random.Random(args.semente), args.negocios, args.chamadas)
+    pasta = tempfile.mkdtemp(prefix="metricas_")
+    planilha = prepara_pasta(pasta, registros, 0.0, 0.0, [CABECALHO, ["1", "Negócio antigo", "Ganho", "2025-01-02 10:00"] + [""] * 8])
+    escritor_sheets.BACKOFF_BASE = 0.0
+
+    # Cronitor: captura o ping em vez de mandar
+    pings = []
+    metricas.CRONITOR_API_KEY = "chave-teste"
+    metricas.requests.get = lambda url, params=None, **kwargs: pings.append((url, params))
+
+    # Uma retentativa do Sheets (429 no primeiro lote) entra nas métricas
+    planilha.falhas = [None, 429]
+    with contextlib.redirect_stdout(io.StringIO()):
+        pipeline.executar_pipeline_completo()
+
+    divergencias = 0
+    linhas = le_linhas()
+    divergencias += confere(len(linhas) == 1, f"{len(linhas)} linhas de métricas depois de uma execução.")
+    registro = linhas[-1]
+    etapas = registro["etapas"]
+    faltando = [etapa for etapa in ETAPAS_ESPERADAS if etapa not in etapas]
+    divergencias += confere(not faltando, f"Etapas sem métricas: {faltando}")
+    divergencias += confere(registro["status"] == "ok", f"Status {registro['status']}.")
+
+    paginas = -(-args.negocios // TAMANHO_PAGINA) + -(-args.chamadas // TAMANHO_PAGINA)
+    divergencias += confere(registro["registros_sincronizados"] == args.negocios + args.chamadas, f"{registro['registros_sincronizados']} registros sincronizados.")
+    divergencias += confere(registro["paginas_api"] == paginas, f"{registro['paginas_api']} páginas (esperado {paginas}).")
+    for tipo, total in (("negocios", args.negocios), ("chamadas", args.chamadas)):
+        divergencias += confere(etapas[f"processa_{tipo}"]["registros_saida"] == total, f"processa_{tipo}: {etapas[f'processa_{tipo}']}")
+        divergencias += confere(etapas[f"upsert_{tipo}"]["novos"] == total, f"upsert_{tipo}: {etapas[f'upsert_{tipo}']}")
+    divergencias += confere(etapas["merge_juncao"]["registros_saida"] == etapas["merge_gravacao"]["registros_saida"] > 0, "Registros do merge inconsistentes.")
+    divergencias += confere(etapas["merge_lead_time"]["calculados"] > 0, "Lead time calculado não contado.")
+    divergencias += confere(etapas["sheets_escrita"].get("retentativas") == 1 == registro["retentativas"], f"Retentativas do Sheets: {etapas['sheets_escrita']}.")
+    divergencias += confere(etapas["sheets_escrita"]["celulas"] >= (args.negocios + 1) * len(CABECALHO), f"Células escritas: {etapas['sheets_escrita']}.")
+    divergencias += confere((registro["rss_pico_mb"] or 0) > 0, "Pico de memória ausente.")
+    divergencias += confere(len(pings) == 1 and ("metric", f"count:{args.negocios + args.chamadas}") in pings[0][1], f"Pings do Cronitor: {pings}")
+    divergencias += confere(not any(chave == "state" for chave, _ in pings[0][1]), f"Ping de sucesso com state: {pings[0][1]}")
+
+    # Execução que falha: a linha é gravada com o erro e o erro continua subindo
+    planilha.falhas = [400]
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            pipeline.executar_pipeline_completo(forcar=True)
+        divergencias += confere(False, "Erro 400 do Sheets não interrompeu o pipeline.")
+    except APIError:
+        pass
+    linhas = le_linhas()
+    divergencias += confere(len(linhas) == 2 and linhas[-1]["status"].startswith("erro: APIError"), f"Execução com erro: {[linha['status'] for linha in linhas]}")
+    divergencias += confere(linhas[-1]["registros_sincronizados"] == args.negocios + args.chamadas, "Métricas da execução com erro não foram zeradas no início.")
+    divergencias += confere(len(pings) == 2 and ("state", "fail") in pings[-1][1], f"Ping da execução com erro sem state=fail: {pings[-1][1]}")
+
+    if divergencias:
+        raise SystemExit(f"❌ {divergencias} divergências.")
+    print(f"📈 {registro['resumo']}")
+    print("✅ Uma linha JSON por execução (inclusive com erro), com métricas de todas as etapas e ping ao Cronitor (state=fail quando falha).")
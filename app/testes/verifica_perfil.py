@@ -0,0 +1,86 @@
+import argparse
+import contextlib
+import io
+import os
+import pstats
+import random
+import sys
+import tempfile
+
+from app.api import atualizar_negocios_chamadas as atualizar
+from app.api import main as pipeline
+from app.services import perfil
+from app.testes.verifica_etapas_puladas import CABECALHO
+from app.testes.verifica_pipeline_paralelo import gera_registros, prepara_pasta, saidas
+
+ETAPAS = ["sincroniza_negocios", "sincroniza_chamadas", "sheets_leitura", "merge", "sheets_escrita"]
+
+perfis_vistos = []
+
+
+def registra_perfil(funcao):
+    """
+    Anota se havia um hook de profiling ligado na thread durante a etapa.
+    """
+    def envolvida(*args, **kwargs):
+        perfis_vistos.append(sys.getprofile() is not None)
+        return funcao(*args, **kwargs)
+    return envolvida
+
+
+def executa(pasta_dados: str, registros: dict, **opcoes_perfil):
+    planilha = prepara_pasta(pasta_dados, registros, 0.0, 0.0, [CABECALHO, ["1", "Negócio antigo", "Ganho", "2025-01-02 10:00"] + [""] * 8])
+    saida = io.StringIO()
+    with contextlib.redirect_stdout(saida), perfil.sessao(**opcoes_perfil):
+        pipeline.executar_pipeline_completo()
+    return saidas(pasta_dados, planilha), saida.getvalue()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Confere o modo --perfil (relatórios e .pstats por etapa) e que, desligado, nenhum profiler é instalado.")
+    parser.add_argument("--negocios", type=int, default=500)
+    parser.add_argument("--chamadas", type=int, default=1500)
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    registros = gera_registros(random.Random(args.semente), args.negocios, args.chamadas)
+    atualizar.atualiza_csv = registra_perfil(atualizar.atualiza_csv)
+    divergencias = 0
+
+    # Desligado: nenhum hook de profiling nas etapas e nenhuma pasta de perfis
+    pasta_perfis = tempfile.mkdtemp(prefix="perfis_")
+    perfil.PASTA_PERFIS = pasta_perfis
+    sem_perfil, _ = executa(tempfile.mkdtemp(prefix="perfil_desligado_"), registros, ativo=False)
+    if any(perfis_vistos) or os.listdir(pasta_perfis):
+        divergencias += 1
+        print(f"❌ Perfil desligado instalou profiler ({perfis_vistos}) ou gravou arquivos ({os.listdir(pasta_perfis)}).")
+
+    # Ligado, com memória: um .pstats, um relatório e um de memória por etapa, resumo no log
+    perfis_vistos.clear()
+    com_perfil, log = executa(tempfile.mkdtemp(prefix="perfil_ligado_"), registros, ativo=True, memoria=True, top=5, pasta=pasta_perfis)
+    if not perfis_vistos or not all(perfis_vistos):
+        divergencias += 1
+        print(f"❌ Etapas de sincronização sem profiler: {perfis_vistos}")
+    execucoes = os.listdir(pasta_perfis)
+    arquivos = set(os.listdir(os.path.join(pasta_perfis, execucoes[0]))) if len(execucoes) == 1 else set()
+    esperados = {f"{etapa}{sufixo}" for etapa in ETAPAS for sufixo in (".pstats", ".txt", "-memoria.txt")} | {"resumo.txt"}
+    if arquivos != esperados:
+        divergencias += 1
+        print(f"❌ Arquivos de perfil: faltando {sorted(esperados - arquivos)}, sobrando {sorted(arquivos - esperados)}.")
+    else:
+        stats = pstats.Stats(os.path.join(pasta_perfis, execucoes[0], "merge.pstats"))
+        if not any(nome == "calcula_lead_time" for _, _, nome in stats.stats):
+            divergencias += 1
+            print("❌ Perfil do merge sem calcula_lead_time.")
+    faltando_no_log = [etapa for etapa in ETAPAS if f"⏱️  {etapa}:" not in log]
+    if faltando_no_log:
+        divergencias += 1
+        print(f"❌ Resumo do perfil sem as etapas {faltando_no_log}.")
+
+    if com_perfil != sem_perfil:
+        divergencias += 1
+        print("❌ Saídas diferentes com e sem perfil.")
+
+    if divergencias:
+        raise SystemExit(f"❌ {divergencias} divergências.")
+    print("✅ Perfil por etapa (.pstats, relatórios, memória e resumo) com as mesmas saídas; desligado, nenhum profiler ativo.")
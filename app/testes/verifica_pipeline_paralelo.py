@@ -0,0 +1,182 @@
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.api import atualizar_negocios_chamadas as atualizar
+from app.api import cliente_hubspot
+from app.api import escritor_sheets
+from app.api import exportar_para_sheets as sheets
+from app.api import main as pipeline
+from app.services import armazenamento, estado_etapas, metricas, snapshots
+from app.services import merge_negocios_chamadas as merge
+from app.testes.planilha_falsa import PlanilhaFalsa
+
+TAMANHO_PAGINA = 100
+
+
+class RespostaHubSpotFalsa:
+    def __init__(self, dados: dict):
+        self.ok = True
+        self.dados = dados
+        self.text = ""
+
+    def json(self):
+        return self.dados
+
+
+def data_iso(rng: random.Random) -> str:
+    instante = datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=rng.randrange(300 * 1440))
+    return instante.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def gera_registros(rng: random.Random, total_negocios: int, total_chamadas: int) -> dict:
+    """
+    Registros brutos como a busca da HubSpot devolve (só as propriedades que o pipeline usa).
+    """
+    negocios = [
+        {"id": str(10**10 + i), "properties": {
+            "hs_object_id": str(10**10 + i),
+            "dealname": f"Cliente {i}",
+            "dealstage": rng.choice(list(atualizar.DEALSTAGE_MAP)),
+            "hubspot_owner_id": rng.choice(list(atualizar.OWNER_MAP)),
+            "createdate": data_iso(rng),
+            "purchase_moment": rng.choice(list(atualizar.PURCHASE_MOMENT_MAP)),
+            "hs_lastmodifieddate": data_iso(rng),
+        }}
+        for i in range(total_negocios)
+    ]
+    chamadas = []
+    for i in range(1, total_chamadas + 1):
+        negocio = rng.randrange(total_negocios)
+        chamadas.append({"id": str(i), "properties": {
+            "hs_object_id": str(i),
+            "hs_call_title": f"Chamada com Cliente {negocio}",
+            "hs_timestamp": data_iso(rng),
+            "hs_call_disposition": rng.choice(list(atualizar.CALL_DISPOSITION_MAP)),
+            "hubspot_owner_id": rng.choice(list(atualizar.OWNER_MAP)),
+            "hs_call_duration": str(rng.randrange(600_000)),
+            "hs_call_body": rng.choice(["<p>Retornar amanhã</p>", "<p>Não atendeu<br>ligar de novo</p>", ""]),
+            "hs_call_primary_deal": str(10**10 + negocio),
+            "hs_lastmodifieddate": data_iso(rng),
+        }})
+    return {atualizar.NEGOCIOS_URL: negocios, atualizar.CHAMADAS_URL: chamadas}
+
+
+def redireciona_arquivos(pasta: str):
+    """
+    Aponta todos os arquivos que o pipeline lê e grava (banco, CSVs, cursor, snapshots, estado,
+    progresso, métricas e contagem diária da HubSpot) para `pasta`.
+    """
+    armazenamento.CAMINHO_BANCO = os.path.join(pasta, "hubspot.sqlite3")
+    armazenamento.TABELAS["chamadas"]["resumo"] = merge.CAMINHO_CHAMADAS_RESUMO = os.path.join(pasta, "chamadas-resumo.csv")
+    atualizar.NEGOCIOS_CSV = merge.CAMINHO_NEGOCIOS = sheets.NEGOCIOS_CSV_PATH = os.path.join(pasta, "negocios.csv")
+    atualizar.CHAMADAS_CSV = os.path.join(pasta, "chamadas.csv")
+    atualizar.CURSOR_SINCRONIZACAO = os.path.join(pasta, "cursor_sincronizacao.json")
+    merge.CAMINHO_NEGOCIOS_CHAMADAS = sheets.NEGOCIOS_CHAMADAS_CSV_PATH = os.path.join(pasta, "negocios-chamadas")
+    snapshots.PASTA_PARQUET = os.path.join(pasta, "parquet")
+    sheets.PLANILHA_ENVIADA_PATH = os.path.join(pasta, "planilha-enviada.json")
+    escritor_sheets.CAMINHO_PROGRESSO = os.path.join(pasta, "planilha-progresso.json")
+    estado_etapas.CAMINHO_ESTADO = os.path.join(pasta, "estado-etapas.json")
+    metricas.CAMINHO_METRICAS = os.path.join(pasta, "metricas.jsonl")
+    cliente_hubspot.CAMINHO_CONTAGEM_DIARIA = os.path.join(pasta, "hubspot-requisicoes-dia.json")
+
+
+def prepara_pasta(pasta: str, registros: dict, latencia_api: float, latencia_sheets: float, planilha_inicial: list) -> PlanilhaFalsa:
+    """
+    Redireciona todos os arquivos do pipeline para `pasta` e troca a busca da HubSpot e a abertura
+    da aba por versões locais com latência (a aba falsa é devolvida).
+    """
+    redireciona_arquivos(pasta)
+
+    # A busca de verdade (busca_pagina_api, com as métricas de coleta) roda sobre um POST local
+    def post(url: str, json: dict, **kwargs) -> RespostaHubSpotFalsa:
+        time.sleep(latencia_api)
+        url = url.removesuffix("/search")
+        inicio = int(json.get("after") or 0)
+        resposta = {"results": registros[url][inicio:inicio + TAMANHO_PAGINA]}
+        if inicio + TAMANHO_PAGINA < len(registros[url]):
+            resposta["paging"] = {"next": {"after": str(inicio + TAMANHO_PAGINA)}}
+        return RespostaHubSpotFalsa(resposta)
+
+    planilha = PlanilhaFalsa(planilha_inicial)
+
+    def abre_aba():
+        time.sleep(latencia_sheets)  # autenticação + gc.open + worksheet
+        return planilha
+
+    atualizar.cliente_hubspot.post = post
+    sheets.abre_aba = abre_aba
+    return planilha
+
+
+def executa_sequencial():
+    """
+    Ordem anterior do orquestrador (referência): um estágio depois do outro.
+    """
+    atualizar.sincroniza("negocios")
+    atualizar.sincroniza("chamadas")
+    merge.main()
+    worksheet, df_sheets = sheets.prepara_planilha()
+    sheets.atualiza_planilha(worksheet, df_sheets)
+
+
+def exporta_csvs(pasta: str):
+    """
+    CSVs de negócios e do resumo das chamadas gerados sob demanda a partir do banco (a
+    sincronização não os grava).
+    """
+    conn = armazenamento.conecta()
+    armazenamento.exporta_csv(conn, "negocios", os.path.join(pasta, "negocios.csv"))
+    armazenamento.exporta_resumo(conn, "chamadas", os.path.join(pasta, "chamadas-resumo.csv"))
+    conn.close()
+
+
+def saidas(pasta: str, planilha: PlanilhaFalsa) -> dict:
+    with contextlib.redirect_stdout(io.StringIO()):
+        exporta_csvs(pasta)
+    arquivos = ["negocios.csv", "chamadas-resumo.csv", "negocios-chamadas", "cursor_sincronizacao.json"]
+    resultado = {"aba": planilha.get_all_values()}
+    for arquivo in arquivos:
+        with open(os.path.join(pasta, arquivo), encoding="utf-8") as f:
+            resultado[arquivo] = f.read()
+    return resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Confere o orquestrador em paralelo contra a execução sequencial, com HubSpot e Sheets locais.")
+    parser.add_argument("--negocios", type=int, default=2000)
+    parser.add_argument("--chamadas", type=int, default=6000)
+    parser.add_argument("--latencia-api", type=float, default=0.05, help="Segundos por página da busca.")
+    parser.add_argument("--latencia-sheets", type=float, default=1.0, help="Segundos para autenticar e abrir a aba.")
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    registros = gera_registros(random.Random(args.semente), args.negocios, args.chamadas)
+    cabecalho = [
+        "ID do registro.", "Nome do negócio", "Etapa do negócio", "Data de criação", "Semana de criação", "Mês de criação",
+        "status_cadastro", "Momento de Compra", "Proprietário do negócio", "Horário Comercial", "Data da primeira chamada",
+        "Lead time (min)",
+    ]
+    planilha_inicial = [cabecalho, ["1", "Negócio antigo", "Ganho", "2025-01-02 10:00", "", "", "", "", "Ana", "", "", ""]]
+
+    resultados, tempos = {}, {}
+    for modo, executa in (("sequencial", executa_sequencial), ("paralelo", pipeline.executar_pipeline_completo)):
+        pasta = tempfile.mkdtemp(prefix=f"pipeline_{modo}_")
+        planilha = prepara_pasta(pasta, registros, args.latencia_api, args.latencia_sheets, planilha_inicial)
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            executa()
+        tempos[modo] = time.perf_counter() - inicio
+        resultados[modo] = saidas(pasta, planilha)
+
+    diferentes = [nome for nome in resultados["sequencial"] if resultados["sequencial"][nome] != resultados["paralelo"][nome]]
+    if diferentes:
+        raise SystemExit(f"❌ Saídas diferentes entre sequencial e paralelo: {', '.join(diferentes)}")
+    linhas_aba = len(resultados["paralelo"]["aba"]) - 1
+    print(f"⏱️  sequencial {tempos['sequencial']:.2f}s | paralelo {tempos['paralelo']:.2f}s ({tempos['sequencial'] / tempos['paralelo']:.2f}x)")
+    print(f"✅ Mesmo banco/CSVs, cursor e aba ({linhas_aba} linhas) com negócios, chamadas e Sheets em paralelo.")
@@ -0,0 +1,192 @@
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.api.atualizar_negocios_chamadas import (
+    API_TO_CSV_CHAMADAS,
+    API_TO_CSV_NEGOCIOS,
+    CALL_DISPOSITION_MAP,
+    DEALSTAGE_MAP,
+    FOI_CONECTADO_MAP,
+    OWNER_MAP,
+    PROPERTIES_CHAMADAS,
+    PROPERTIES_NEGOCIOS,
+    PURCHASE_MOMENT_MAP,
+    converte_ms_para_hms,
+    formata_data,
+    limpa_associated_deal_id,
+    limpa_html,
+    mapeia_valores,
+    processa_pagina,
+)
+
+TAMANHO_PAGINA = 100
+
+
+def processa_pagina_por_registro(tipo: str, dados_brutos: list, mapa_api_to_csv: dict) -> list:
+    """
+    Implementação anterior de processa_pagina (registro a registro), mantida como referência.
+    """
+    resultados = []
+
+    for item in dados_brutos:
+        props_api = item.get("properties", {})
+        props_csv = {mapa_api_to_csv.get(k, k): v for k, v in props_api.items()}
+
+        if tipo == "negocios":
+            dealstage_id = props_api.get("dealstage")
+            if dealstage_id in DEALSTAGE_MAP:
+                props_csv["Etapa do negócio"] = DEALSTAGE_MAP[dealstage_id]
+
+            props_csv["Proprietário do negócio"] = mapeia_valores(OWNER_MAP, props_api.get("hubspot_owner_id"))
+            props_csv["Momento de Compra"] = mapeia_valores(PURCHASE_MOMENT_MAP, props_api.get("purchase_moment"))
+
+            foi_conectado_valor = props_api.get("foi_conectado")
+            if foi_conectado_valor is not None:
+                props_csv["Foi conectado"] = FOI_CONECTADO_MAP.get(str(foi_conectado_valor).lower(), "Não informado")
+
+        if tipo == "chamadas":
+            props_csv["Atividade atribuída a"] = mapeia_valores(OWNER_MAP, props_api.get("hubspot_owner_id"))
+            props_csv["Resultado da chamada"] = mapeia_valores(CALL_DISPOSITION_MAP, props_api.get("hs_call_disposition"))
+
+            props_csv["Observações de chamada"] = limpa_html(props_api.get("hs_call_body"))
+            props_csv["Duração da chamada (HH:mm:ss)"] = converte_ms_para_hms(props_api.get("hs_call_duration"))
+            props_csv["Associated Deal IDs"] = limpa_associated_deal_id(props_api.get("hs_call_primary_deal"))
+
+            titulo_chamada = props_csv.get("Título da chamada", "")
+            props_csv["Associated Deal"] = titulo_chamada.replace("Chamada com ", "").strip()
+
+        for campo_api in props_api:
+            if "date" in campo_api.lower() or "timestamp" in campo_api.lower():
+                valor_bruto = props_api[campo_api]
+                nome_csv = mapa_api_to_csv.get(campo_api, campo_api)
+
+                if isinstance(valor_bruto, str) and ("T" in valor_bruto or "-" in valor_bruto):
+                    props_csv[nome_csv] = formata_data(valor_bruto)
+                else:
+                    props_csv[nome_csv] = ""
+
+        for col in mapa_api_to_csv.values():
+            props_csv.setdefault(col, "")
+
+        resultados.append(props_csv)
+
+    return resultados
+
+
+def sorteia_data(rng: random.Random):
+    instante = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=rng.randrange(3 * 365 * 86400))
+    sorteio = rng.random()
+    if sorteio < 0.7:
+        return instante.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+    if sorteio < 0.8:
+        return instante.strftime("%Y-%m-%dT%H:%M:%SZ")
+    if sorteio < 0.9:
+        return None
+    return rng.choice([instante.strftime("%Y-%m-%d"), "data-invalida", ""])
+
+
+def sorteia_valor(rng: random.Random, campo: str):
+    if "date" in campo or "timestamp" in campo:
+        return sorteia_data(rng)
+    if rng.random() < 0.1:
+        return rng.choice([None, ""])
+    if campo == "dealstage":
+        return rng.choice(list(DEALSTAGE_MAP) + ["999"])
+    if campo == "hubspot_owner_id":
+        return rng.choice(list(OWNER_MAP) + ["123"])
+    if campo == "purchase_moment":
+        return rng.choice(list(PURCHASE_MOMENT_MAP) + ["outro"])
+    if campo == "foi_conectado":
+        return rng.choice(["true", "false", "True", "talvez"])
+    if campo == "hs_call_disposition":
+        return rng.choice(list(CALL_DISPOSITION_MAP) + ["x"])
+    if campo == "hs_call_duration":
+        return rng.choice([str(rng.randrange(10**7)), "abc"])
+    if campo == "hs_call_body":
+        return rng.choice(["<p>Retornar amanhã</p>", "<p>Não atendeu<br>ligar de novo</p>", "texto"])
+    if campo == "hs_call_primary_deal":
+        return rng.choice(["0-3-" + str(rng.randrange(10**10)), str(rng.randrange(10**10))])
+    if campo == "hs_call_title":
+        return rng.choice(["Chamada com Maria Souza", "Chamada com  João ", "Retorno"])
+    return f"{campo}-{rng.randrange(1000)}"
+
+
+def gera_pagina(rng: random.Random, props: list, tamanho: int) -> list:
+    """
+    Página com alguns esquemas diferentes: propriedades faltando, extras da HubSpot e ordem trocada.
+    """
+    esquemas = [list(props) + ["hs_createdate"]]
+    for _ in range(2):
+        esquema = [campo for campo in props if rng.random() > 0.1] + ["hs_createdate"]
+        if rng.random() < 0.5:
+            rng.shuffle(esquema)
+        esquemas.append(esquema)
+
+    pagina = []
+    for _ in range(tamanho):
+        esquema = esquemas[0] if rng.random() < 0.8 else rng.choice(esquemas)
+        propriedades = {campo: sorteia_valor(rng, campo) for campo in esquema}
+        if "hs_call_title" in propriedades and propriedades["hs_call_title"] is None:
+            propriedades["hs_call_title"] = ""
+        pagina.append({"id": propriedades.get("hs_object_id"), "properties": propriedades})
+    return pagina
+
+
+def gera_paginas(rng: random.Random, tipo: str, total: int) -> list:
+    props = PROPERTIES_NEGOCIOS if tipo == "negocios" else PROPERTIES_CHAMADAS
+    return [gera_pagina(rng, props, min(TAMANHO_PAGINA, total - inicio)) for inicio in range(0, total, TAMANHO_PAGINA)]
+
+
+def verifica(paginas_por_tipo: dict) -> int:
+    divergencias = 0
+    for tipo, paginas in paginas_por_tipo.items():
+        mapa = API_TO_CSV_NEGOCIOS if tipo == "negocios" else API_TO_CSV_CHAMADAS
+        for pagina in paginas:
+            esperado = processa_pagina_por_registro(tipo, pagina, mapa)
+            obtido = processa_pagina(tipo, pagina, mapa)
+            for linha_esperada, linha_obtida in zip(esperado, obtido):
+                if linha_esperada != linha_obtida or list(linha_esperada) != list(linha_obtida):
+                    divergencias += 1
+                    if divergencias <= 5:
+                        print(f"❌ {tipo}:\n   por registro: {linha_esperada}\n   em lote:      {linha_obtida}")
+            divergencias += abs(len(esperado) - len(obtido))
+    return divergencias
+
+
+def benchmark(paginas_por_tipo: dict):
+    for tipo, paginas in paginas_por_tipo.items():
+        mapa = API_TO_CSV_NEGOCIOS if tipo == "negocios" else API_TO_CSV_CHAMADAS
+        total = sum(len(pagina) for pagina in paginas)
+
+        inicio = time.perf_counter()
+        for pagina in paginas:
+            processa_pagina_por_registro(tipo, pagina, mapa)
+        tempo_registro = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        for pagina in paginas:
+            processa_pagina(tipo, pagina, mapa)
+        tempo_lote = time.perf_counter() - inicio
+
+        print(f"⏱️  {tipo}: {total} registros — por registro {tempo_registro:.2f}s, em lote {tempo_lote:.2f}s ({tempo_registro / tempo_lote:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara processa_pagina com a versão registro a registro.")
+    parser.add_argument("--registros", type=int, default=20_000, help="Registros sorteados por tipo.")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--benchmark", action="store_true", help="Mede o tempo das duas versões.")
+    args = parser.parse_args()
+
+    rng = random.Random(args.semente)
+    paginas_por_tipo = {tipo: gera_paginas(rng, tipo, args.registros) for tipo in ("negocios", "chamadas")}
+
+    divergencias = verifica(paginas_por_tipo)
+    if divergencias:
+        raise SystemExit(f"❌ {divergencias} linhas divergentes.")
+    print(f"✅ {2 * args.registros} registros com linhas idênticas (valores e ordem das colunas).")
+
+    if args.benchmark:
+        benchmark(paginas_por_tipo)
@@ -0,0 +1,165 @@
+import argparse
+import contextlib
+import importlib
+import io
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from app.api import atualizar_negocios_chamadas as atualizar
+from app.api import cliente_hubspot
+from app.api.cliente_hubspot import ClienteHubSpot
+from app.services.limitador import BaldeDeTokens
+from app.testes.dados_hubspot import PortalSintetico, grava_paginas
+from app.testes.servidor_hubspot import PIPELINE_ID, PortalGravado, ServidorHubSpot
+from app.testes.verifica_pipeline_paralelo import exporta_csvs, redireciona_arquivos
+
+
+def sobe_servidor(portal, **opcoes) -> ServidorHubSpot:
+    """
+    Servidor numa porta livre, com o pipeline apontado para ele (como faz o HUBSPOT_BASE_URL) e um
+    cliente sem o limitador local, para que só o servidor decida quando limitar.
+    """
+    servidor = ServidorHubSpot(portal, porta=0, **opcoes)
+    servidor.inicia()
+    cliente_hubspot.HUBSPOT_BASE_URL = servidor.url
+    atualizar.NEGOCIOS_URL = f"{servidor.url}/crm/v3/objects/deals"
+    atualizar.CHAMADAS_URL = f"{servidor.url}/crm/v3/objects/calls"
+    cliente = ClienteHubSpot(api_key="chave-teste", base_url=servidor.url)
+    cliente.balde = cliente.balde_busca = BaldeDeTokens(10_000, 10_000)
+    cliente_hubspot.cliente = cliente
+    return servidor
+
+
+def sincroniza(tipos: list, desde: str = None, recuperacao: bool = False, cursor: str = None) -> str:
+    """
+    Sincroniza os tipos em paralelo (como o orquestrador) numa pasta nova, opcionalmente partindo
+    de um cursor já salvo, e gera os CSVs a partir do banco; devolve a pasta.
+    """
+    pasta = tempfile.mkdtemp(prefix="servidor_hubspot_")
+    redireciona_arquivos(pasta)
+    erros = []
+
+    def executa(tipo):
+        try:
+            if cursor:
+                atualizar.salva_cursor(tipo, cursor)
+            atualizar.sincroniza(tipo, recuperacao=recuperacao, desde=desde)
+        except Exception as erro:
+            erros.append(erro)
+
+    threads = [threading.Thread(target=executa, args=(tipo,)) for tipo in tipos]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    if erros:
+        raise erros[0]
+    with contextlib.redirect_stdout(io.StringIO()):
+        exporta_csvs(pasta)
+    return pasta
+
+
+def linhas(pasta: str, arquivo: str) -> int:
+    with open(os.path.join(pasta, arquivo), encoding="utf-8") as f:
+        return sum(1 for _ in f) - 1
+
+
+def le(pasta: str, arquivo: str) -> str:
+    with open(os.path.join(pasta, arquivo), encoding="utf-8") as f:
+        return f.read()
+
+
+def erros_injetados(servidor: ServidorHubSpot, status: str = "") -> int:
+    return sum(total for chave, total in servidor.contagem.items() if chave[:3].isdigit() and chave.startswith(status))
+
+
+def confere(condicao: bool, mensagem: str) -> int:
+    if not condicao:
+        print(f"❌ {mensagem}")
+    return 0 if condicao else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Confere paginação, limite de 10 mil, 429/5xx, dados gravados e os endpoints de mapeamento contra o servidor HubSpot local.")
+    parser.add_argument("--negocios", type=int, default=800)
+    parser.add_argument("--chamadas", type=int, default=2400)
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    cliente_hubspot.BACKOFF_BASE = 0.01
+    divergencias = 0
+
+    # Paginação com 429 (Retry-After) e 5xx ao acaso: as duas sincronizações terminam completas
+    portal = PortalSintetico(args.negocios, args.chamadas, args.semente)
+    servidor = sobe_servidor(portal, taxa_429=0.1, taxa_5xx=0.05, retry_after=0, semente=args.semente)
+    pasta = sincroniza(["negocios", "chamadas"])
+    retentativas = sum(valores["retentativas"] for valores in cliente_hubspot.metricas().values())
+    divergencias += confere(linhas(pasta, "negocios.csv") == args.negocios, f"{linhas(pasta, 'negocios.csv')} negócios sincronizados de {args.negocios}.")
+    divergencias += confere(linhas(pasta, "chamadas-resumo.csv") == args.chamadas, f"{linhas(pasta, 'chamadas-resumo.csv')} chamadas sincronizadas de {args.chamadas}.")
+    divergencias += confere(erros_injetados(servidor, "429") > 0 and erros_injetados(servidor, "5") > 0, f"Erros injetados: {dict(servidor.contagem)}")
+    divergencias += confere(retentativas == erros_injetados(servidor), f"{retentativas} retentativas para {erros_injetados(servidor)} erros injetados.")
+    servidor.shutdown()
+
+    # Dados gravados: o mesmo portal servido das páginas em JSONL gera os mesmos CSVs
+    pasta_gravada = tempfile.mkdtemp(prefix="hubspot_gravado_")
+    with contextlib.redirect_stdout(io.StringIO()):
+        grava_paginas(portal, pasta_gravada)
+    servidor = sobe_servidor(PortalGravado(pasta_gravada))
+    pasta_gravado = sincroniza(["negocios", "chamadas"])
+    for arquivo in ("negocios.csv", "chamadas-resumo.csv"):
+        divergencias += confere(le(pasta, arquivo) == le(pasta_gravado, arquivo), f"{arquivo} diferente servindo as páginas gravadas.")
+    servidor.shutdown()
+
+    # Limite de 10 mil resultados: a sincronização incremental passa sozinha para a busca fatiada
+    # (sem chegar ao 400 do servidor) e o backfill fatiado também traz tudo
+    grande = PortalSintetico(100, atualizar.LIMITE_BUSCA_HUBSPOT + 500, args.semente)
+    servidor = sobe_servidor(grande)
+    pasta = sincroniza(["chamadas"])
+    divergencias += confere(linhas(pasta, "chamadas-resumo.csv") == grande.totais["chamadas"], f"Sincronização acima do limite trouxe {linhas(pasta, 'chamadas-resumo.csv')} de {grande.totais['chamadas']} chamadas.")
+    pasta = sincroniza(["chamadas"], desde=grande.inicio.isoformat())
+    divergencias += confere(linhas(pasta, "chamadas-resumo.csv") == grande.totais["chamadas"], f"Backfill fatiado trouxe {linhas(pasta, 'chamadas-resumo.csv')} de {grande.totais['chamadas']} chamadas.")
+    servidor.shutdown()
+
+    # Recuperação depois de uma parada mais longa que a janela de recuperação: parte do cursor antigo
+    parado = PortalSintetico(300, 600, args.semente, periodo=timedelta(days=atualizar.DIAS_RECUPERACAO * 3))
+    servidor = sobe_servidor(parado)
+    pasta = sincroniza(["negocios", "chamadas"], recuperacao=True, cursor=parado.inicio.isoformat())
+    for tipo, arquivo in (("negocios", "negocios.csv"), ("chamadas", "chamadas-resumo.csv")):
+        divergencias += confere(linhas(pasta, arquivo) == parado.totais[tipo], f"Recuperação trouxe {linhas(pasta, arquivo)} de {parado.totais[tipo]} {tipo}.")
+    servidor.shutdown()
+
+    # Limite de buscas por segundo: 429 com Retry-After, e o cliente espera o tempo pedido
+    limitado = PortalSintetico(1000, 0, args.semente)
+    servidor = sobe_servidor(limitado, buscas_por_segundo=5, retry_after=1)
+    inicio = time.perf_counter()
+    pasta = sincroniza(["negocios"])
+    tempo = time.perf_counter() - inicio
+    divergencias += confere(linhas(pasta, "negocios.csv") == 1000, f"{linhas(pasta, 'negocios.csv')} negócios com limite de buscas.")
+    divergencias += confere(erros_injetados(servidor, "429") > 0 and tempo >= 1, f"Limite de buscas: {dict(servidor.contagem)} em {tempo:.1f}s.")
+
+    # Endpoints de mapeamento (pipelines, owners, propriedades e dispositions) do devolve_mapeamento
+    saida = io.StringIO()
+    with contextlib.redirect_stdout(saida):
+        devolve_mapeamento = importlib.import_module("app.testes.devolve_mapeamento")  # pede as dispositions ao importar
+        devolve_mapeamento.gerar_owner_map()
+        devolve_mapeamento.descobrir_nome_etapa_por_id("94896182")
+        devolve_mapeamento.listar_estagios_pipeline(PIPELINE_ID)
+        devolve_mapeamento.mostrar_opcoes_propriedade_calls("hs_call_disposition")
+    texto = saida.getvalue()
+    esperados = (
+        [f"{chave}: {rotulo}" for chave, rotulo in atualizar.CALL_DISPOSITION_MAP.items()]
+        + [f'"{chave}": "{nome}",' for chave, nome in atualizar.OWNER_MAP.items()]
+        + ['🔹 "94896182": "Fila de atendimento"']
+        + [f'"{chave}": "{rotulo}",' for chave, rotulo in atualizar.DEALSTAGE_MAP.items()]
+    )
+    faltando = [linha for linha in esperados if linha not in texto]
+    divergencias += confere(not faltando, f"Saída do devolve_mapeamento sem {faltando[:5]}")
+    servidor.shutdown()
+
+    if divergencias:
+        raise SystemExit(f"❌ {divergencias} divergências.")
+    print("✅ Busca paginada com 429/5xx, páginas gravadas, recuperação a partir do cursor antigo, limite de 10 mil (busca fatiada automática e backfill), limite por segundo e mapeamentos servidos localmente.")
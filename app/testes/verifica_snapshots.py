@@ -0,0 +1,255 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from app.api import exportar_para_sheets as sheets
+from app.services import armazenamento, snapshots
+from app.services import merge_negocios_chamadas as merge
+from app.testes.verifica_corpos_chamadas import chamada_completa
+from app.testes.verifica_merge_incremental import novo_negocio
+
+
+def data_do_pipeline(rng: random.Random) -> str:
+    """
+    Data como o formata_data grava no CSV: AAAA-MM-DD HH:MM válida ou vazia.
+    """
+    if rng.random() < 0.03:
+        return ""
+    return f"20{rng.randint(19, 26)}-{rng.randint(1, 12):02}-{rng.randint(1, 28):02} {rng.randint(0, 23):02}:{rng.randint(0, 59):02}"
+
+
+def prepara_pasta(pasta: str):
+    armazenamento.CAMINHO_BANCO = os.path.join(pasta, "hubspot.sqlite3")
+    snapshots.PASTA_PARQUET = os.path.join(pasta, "parquet")
+    merge.CAMINHO_NEGOCIOS = sheets.NEGOCIOS_CSV_PATH = os.path.join(pasta, "negocios.csv")
+    merge.CAMINHO_CHAMADAS_RESUMO = os.path.join(pasta, "chamadas-resumo.csv")
+    merge.CAMINHO_NEGOCIOS_CHAMADAS = sheets.NEGOCIOS_CHAMADAS_CSV_PATH = os.path.join(pasta, "negocios-chamadas")
+
+
+def gera_dados(rng: random.Random, total_negocios: int, total_chamadas: int):
+    conn = armazenamento.conecta()
+    negocios = []
+    for i in range(total_negocios):
+        negocio = novo_negocio(rng, str(10**10 + i))
+        negocio.update({
+            "Data de criação": data_do_pipeline(rng),
+            "Etapa do negócio": rng.choice(["Fila de atendimento", "FUP docs", "Ganho", ""]),
+            "status_cadastro": rng.choice(["completo", "incompleto", ""]),
+        })
+        negocios.append(negocio)
+    ids_negocios = [negocio["ID do registro."] for negocio in negocios]
+    chamadas = []
+    for i in range(1, total_chamadas + 1):
+        chamada = chamada_completa(rng, str(i), ids_negocios)
+        chamada["Data da atividade"] = data_do_pipeline(rng)
+        chamadas.append(chamada)
+
+    for tipo, linhas in (("negocios", negocios), ("chamadas", chamadas)):
+        armazenamento.adiciona_colunas(conn, tipo, list(linhas[0]))
+        for inicio in range(0, len(linhas), 1000):
+            armazenamento.upsert(conn, tipo, linhas[inicio:inicio + 1000])
+        conn.commit()
+    armazenamento.exporta_csv(conn, "negocios", merge.CAMINHO_NEGOCIOS)
+    armazenamento.exporta_resumo(conn, "chamadas", merge.CAMINHO_CHAMADAS_RESUMO)
+    conn.close()
+
+
+def gera_snapshots():
+    conn = armazenamento.conecta()
+    snapshots.atualiza_do_banco(conn, "negocios")
+    snapshots.atualiza_do_banco(conn, "chamadas")
+    conn.close()
+
+
+@contextlib.contextmanager
+def sem_banco():
+    """
+    Leitores sem o banco local (instalação só com os CSVs legados).
+    """
+    caminho_banco = armazenamento.CAMINHO_BANCO
+    armazenamento.CAMINHO_BANCO = os.path.join(os.path.dirname(caminho_banco), "inexistente", "hubspot.sqlite3")
+    try:
+        yield
+    finally:
+        armazenamento.CAMINHO_BANCO = caminho_banco
+
+
+def apaga_snapshots():
+    shutil.rmtree(snapshots.PASTA_PARQUET, ignore_errors=True)
+
+
+def linhas_da_planilha(df: pd.DataFrame, colunas: list) -> list:
+    df = df.copy()
+    for coluna in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[coluna]):
+            df[coluna] = df[coluna].dt.strftime("%Y-%m-%d %H:%M")
+    return sorted(tuple(sheets.clean_row([linha.get(coluna, "") for coluna in colunas])) for linha in df.to_dict("records"))
+
+
+def leituras() -> tuple:
+    """
+    Saída do merge completo e leituras do Sheets, com a fonte que os leitores escolherem.
+    """
+    merge.main(completo=True)
+    with open(merge.CAMINHO_NEGOCIOS_CHAMADAS, encoding="utf-8") as f:
+        saida = f.read()
+    return saida, sheets.le_negocios_do_ano(), sheets.le_lead_times()
+
+
+def verifica() -> int:
+    """
+    Merge e Sheets leem o mesmo dos CSVs (sem banco), do banco (sem snapshots) e dos snapshots.
+    """
+    divergencias = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        apaga_snapshots()
+        with sem_banco():
+            resultados = {"CSV": leituras()}
+        apaga_snapshots()
+        resultados["banco"] = leituras()
+        gera_snapshots()
+        resultados["snapshot"] = leituras()
+
+    for nome in snapshots.DATASETS:
+        if not snapshots.atualizado(nome, merge.CAMINHO_NEGOCIOS_CHAMADAS if nome == "negocios-chamadas" else None):
+            divergencias += 1
+            print(f"❌ Snapshot {nome} ausente ou desatualizado (a leitura caiu no banco ou no CSV).")
+    saida_csv, negocios_csv, lead_times_csv = resultados["CSV"]
+    for fonte in ("banco", "snapshot"):
+        saida, negocios, lead_times = resultados[fonte]
+        if saida != saida_csv:
+            divergencias += 1
+            print(f"❌ negocios-chamadas diferente lendo do {fonte}.")
+        if linhas_da_planilha(negocios, sheets.COLUNAS_NEGOCIOS) != linhas_da_planilha(negocios_csv, sheets.COLUNAS_NEGOCIOS):
+            divergencias += 1
+            print(f"❌ Negócios do ano diferentes lendo do {fonte}.")
+        if linhas_da_planilha(lead_times, sheets.COLUNAS_LEAD_TIME) != linhas_da_planilha(lead_times_csv, sheets.COLUNAS_LEAD_TIME):
+            divergencias += 1
+            print(f"❌ Lead times diferentes lendo do {fonte}.")
+    return divergencias
+
+
+def le_snapshot(nome: str) -> pd.DataFrame:
+    import pyarrow.dataset
+
+    colunas = [coluna for coluna in pyarrow.dataset.dataset(snapshots.caminho_dataset(nome), format="parquet", partitioning="hive").schema.names if coluna not in snapshots.COLUNAS_PARTICAO]
+    df = snapshots.le_dataset(nome, colunas=colunas)
+    return df.sort_values(colunas[0], kind="stable").reset_index(drop=True)
+
+
+def arquivos_por_particao(nome: str) -> dict:
+    raiz = snapshots.caminho_dataset(nome)
+    return {
+        os.path.relpath(pasta, raiz): sorted(arquivos)
+        for pasta, _, arquivos in os.walk(raiz)
+        if os.path.basename(pasta).startswith("mes=")
+    }
+
+
+def verifica_incremental(rng: random.Random) -> int:
+    """
+    Uma sincronização que altera poucos negócios só regrava as partições deles; até lá o snapshot
+    fica desatualizado (os leitores vão ao banco), e um upsert sem mudança não mexe em nada.
+    """
+    divergencias = 0
+    conn = armazenamento.conecta()
+    with contextlib.redirect_stdout(io.StringIO()):
+        gera_snapshots()
+    versao = armazenamento.versao(conn, "negocios")
+    repetidos = [json.loads(dados) for (dados,) in conn.execute("SELECT dados FROM negocios LIMIT 50")]
+    armazenamento.upsert(conn, "negocios", repetidos)
+    conn.commit()
+    if armazenamento.versao(conn, "negocios") != versao or armazenamento.le_particoes_pendentes(conn, "negocios") or not snapshots.atualizado("negocios"):
+        divergencias += 1
+        print("❌ Upsert sem mudança trocou a versão do banco ou marcou partições.")
+
+    # Sincronização pequena: 3 negócios mudam de data e um novo entra
+    ids = [linha[0] for linha in conn.execute("SELECT id FROM negocios WHERE data IS NOT NULL ORDER BY id LIMIT 3")]
+    anteriores = {linha[0] for linha in conn.execute("SELECT substr(data, 1, 7) FROM negocios WHERE id IN (?, ?, ?)", ids)}
+    alterados = [{"ID do registro.": negocio_id, "Data de criação": f"2021-0{i + 1}-15 10:00"} for i, negocio_id in enumerate(ids)]
+    novo = novo_negocio(rng, "99999999999")
+    novo["Data de criação"] = "2021-04-20 09:30"
+    antes = arquivos_por_particao("negocios")
+    with contextlib.redirect_stdout(io.StringIO()):
+        armazenamento.upsert(conn, "negocios", alterados + [novo])
+        conn.commit()
+        conn.close()
+    if snapshots.atualizado("negocios") or snapshots.le_dataset("negocios") is not None:
+        divergencias += 1
+        print("❌ Snapshot de uma versão anterior do banco ainda usado pelos leitores.")
+    with contextlib.redirect_stdout(io.StringIO()):
+        gera_snapshots()
+    depois = arquivos_por_particao("negocios")
+    regravadas = {pasta for pasta in set(antes) | set(depois) if antes.get(pasta) != depois.get(pasta)}
+    esperadas = {f"ano={int(mes[:4])}/mes={int(mes[5:])}" for mes in anteriores} | {f"ano=2021/mes={mes}" for mes in (1, 2, 3, 4)}
+    if regravadas != esperadas:
+        divergencias += 1
+        print(f"❌ Partições regravadas {sorted(regravadas)}, esperadas {sorted(esperadas)}.")
+
+    incremental = le_snapshot("negocios")
+    with contextlib.redirect_stdout(io.StringIO()):
+        apaga_snapshots()
+        gera_snapshots()
+    if not incremental.equals(le_snapshot("negocios")):
+        divergencias += 1
+        print("❌ Snapshot atualizado por partição diferente do regravado inteiro.")
+    return divergencias
+
+
+def mede(funcao, repeticoes: int = 3) -> float:
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def benchmark():
+    with contextlib.redirect_stdout(io.StringIO()):
+        merge.main(completo=True)
+    leituras = {
+        "negócios do ano (Sheets)": lambda: sheets.le_negocios_do_ano(),
+        "lead times (Sheets)": lambda: sheets.le_lead_times(),
+        "negócios (merge)": lambda: merge.le_negocios(),
+        "chamadas (merge)": lambda: merge.le_chamadas(),
+    }
+    tempos_parquet = {nome: mede(leitura) for nome, leitura in leituras.items()}
+    apaga_snapshots()
+    tempos_banco = {nome: mede(leitura) for nome, leitura in leituras.items()}
+    with sem_banco():
+        tempos_csv = {nome: mede(leitura) for nome, leitura in leituras.items()}
+    for nome in leituras:
+        print(f"⏱️  {nome}: CSV {tempos_csv[nome]:.3f}s | banco {tempos_banco[nome]:.3f}s | Parquet {tempos_parquet[nome]:.3f}s ({tempos_csv[nome] / tempos_parquet[nome]:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Confere que merge e Sheets leem o mesmo dos snapshots Parquet, do banco e dos CSVs.")
+    parser.add_argument("--negocios", type=int, default=5000)
+    parser.add_argument("--chamadas", type=int, default=20000)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--benchmark", action="store_true", help="Mede as leituras de cada estágio (CSV, banco e Parquet).")
+    args = parser.parse_args()
+
+    if not snapshots.disponivel():
+        raise SystemExit("❌ pyarrow não instalado.")
+    pasta = tempfile.mkdtemp(prefix="snapshots_")
+    prepara_pasta(pasta)
+    with contextlib.redirect_stdout(io.StringIO()):
+        gera_dados(random.Random(args.semente), args.negocios, args.chamadas)
+
+    divergencias = verifica() + verifica_incremental(random.Random(args.semente))
+    if divergencias:
+        raise SystemExit(f"❌ {divergencias} divergências.")
+    print("✅ Merge e leituras do Sheets iguais a partir dos CSVs, do banco e dos snapshots Parquet; só as partições alteradas são regravadas.")
+
+    if args.benchmark:
+        benchmark()
@@ -0,0 +1,172 @@
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from app.api import escritor_sheets
+from app.api import exportar_para_sheets as sheets
+from app.services import armazenamento, snapshots
+from app.testes.benchmark_exportacao import gera_dados
+from app.testes.planilha_falsa import PlanilhaFalsa
+
+CABECALHO = [
+    "ID do registro.", "Nome do negócio", "Etapa do negócio", "Data de criação", "Semana de criação", "Mês de criação",
+    "status_cadastro", "Momento de Compra", "Proprietário do negócio", "Horário Comercial", "Data da primeira chamada",
+    "Lead time (min)",
+]
+COLUNAS_CHAMADA = [CABECALHO.index("Data da primeira chamada"), CABECALHO.index("Lead time (min)")]
+
+
+def nova_linha(rng: random.Random, negocio_id: int) -> list:
+    return [
+        str(negocio_id), f"Cliente {negocio_id}", rng.choice(["Fila de atendimento", "FUP docs", "Ganho"]),
+        f"2025-{rng.randint(1, 12):02}-{rng.randint(1, 28):02} {rng.randint(0, 23):02}:{rng.randint(0, 59):02}",
+        "", "", rng.choice(["completo", "incompleto", ""]), rng.choice(["Imediato", "Até 3 meses", ""]),
+        rng.choice(["Ana", "Bia", "Caio"]), rng.choice(["Dentro do Horário Comercial", "Fora do Horário Comercial"]),
+        "", "",
+    ]
+
+
+def preenche_chamada(rng: random.Random, linha: list):
+    linha[COLUNAS_CHAMADA[0]] = f"2025-{rng.randint(1, 12):02}-{rng.randint(1, 28):02} {rng.randint(0, 23):02}:{rng.randint(0, 59):02}"
+    linha[COLUNAS_CHAMADA[1]] = rng.choice([rng.randint(0, 5000), float(rng.randint(0, 5000))])
+
+
+def como_texto(valores: list) -> list:
+    return [[PlanilhaFalsa._texto(valor) for valor in linha] for linha in valores]
+
+
+def sincroniza(planilha: PlanilhaFalsa, valores: list) -> int:
+    antes = planilha.celulas_escritas
+    with contextlib.redirect_stdout(io.StringIO()):
+        sheets.sincroniza_planilha(planilha, valores)
+    return planilha.celulas_escritas - antes
+
+
+def verifica(rng: random.Random, total: int, rodadas: int) -> int:
+    """
+    Rodadas com negócios novos inseridos no topo (como o insere_novos_negocios faz) e lead times
+    alterados: depois de cada sincronização a aba tem de ficar igual aos valores enviados, com o
+    diff escrevendo só as células alteradas. Aba reordenada por fora e diff grande reescrevem tudo.
+    """
+    divergencias = 0
+    proximo_id = 10**10
+    valores = [list(CABECALHO)]
+    for _ in range(total):
+        linha = nova_linha(rng, proximo_id)
+        proximo_id += 1
+        if rng.random() < 0.7:
+            preenche_chamada(rng, linha)
+        valores.append(linha)
+    planilha = PlanilhaFalsa(valores)
+    sincroniza(planilha, valores)
+
+    for rodada in range(rodadas):
+        if rodada == rodadas - 2:
+            # Linhas trocadas de lugar por fora do pipeline: a cópia local não serve mais
+            i, j = rng.sample(range(1, len(planilha.linhas)), 2)
+            planilha.linhas[i], planilha.linhas[j] = planilha.linhas[j], planilha.linhas[i]
+            valores[i], valores[j] = valores[j], valores[i]
+        novas = [nova_linha(rng, proximo_id + i) for i in range(rng.randint(0, 20))]
+        proximo_id += len(novas)
+        if novas:
+            planilha.insert_rows([list(linha) for linha in reversed(novas)], 2)
+            valores[1:1] = list(reversed(novas))
+
+        alteradas = len(valores) - 1 if rodada == rodadas - 1 else rng.randint(0, 50)
+        for linha in rng.sample(valores[1:], alteradas):
+            preenche_chamada(rng, linha)
+        for linha in novas:
+            preenche_chamada(rng, linha)
+        if rodada == rodadas - 1:
+            # Etapas renomeadas em todos os negócios: diff acima do LIMITE_DIFF
+            for linha in valores[1:]:
+                for coluna in ("Etapa do negócio", "status_cadastro", "Proprietário do negócio"):
+                    linha[CABECALHO.index(coluna)] += " (revisado)"
+
+        escritas = sincroniza(planilha, valores)
+        celulas_aba = (len(valores) - 1) * len(CABECALHO)
+        esperado_completo = rodada >= rodadas - 2
+        if como_texto(valores) != planilha.get_all_values():
+            divergencias += 1
+            print(f"❌ Rodada {rodada}: aba diferente dos valores enviados.")
+        elif esperado_completo and escritas < celulas_aba:
+            divergencias += 1
+            print(f"❌ Rodada {rodada}: esperava reescrita completa, {escritas} células escritas.")
+        elif not esperado_completo and escritas > (len(novas) + alteradas) * len(CABECALHO):
+            divergencias += 1
+            print(f"❌ Rodada {rodada}: {escritas} células escritas para {len(novas)} novas e {alteradas} alteradas.")
+        else:
+            print(f"Rodada {rodada}: {escritas} de {celulas_aba} células escritas ({len(novas)} negócios novos, {alteradas} alterados).")
+    return divergencias
+
+
+def atualiza_planilha_anterior(worksheet):
+    """
+    Sequência anterior do main (referência, sem os sleeps): lê, insere, lê de novo, reescreve a
+    aba inteira, lê de novo para contar as linhas, limpa E/F e escreve as fórmulas uma a uma.
+    """
+    df_sheets = pd.DataFrame(worksheet.get_all_records())
+    novas_linhas = sheets.monta_novas_linhas(sheets.le_negocios_do_ano(), df_sheets)
+    if novas_linhas:
+        worksheet.insert_rows(novas_linhas, 2)
+    df_sheets = sheets.aplica_lead_times(pd.DataFrame(worksheet.get_all_records()), sheets.le_lead_times())
+    sheets.preenche_horario_comercial(df_sheets)
+    df_sheets = df_sheets.replace([np.inf, -np.inf], np.nan).fillna('')
+    worksheet.update('A1', [df_sheets.columns.tolist()] + df_sheets.values.tolist())
+    total_linhas = len(worksheet.get_all_values())
+    if total_linhas > 2:
+        worksheet.batch_clear([f"E3:E{total_linhas}", f"F3:F{total_linhas}"])
+    worksheet.update_acell('F2', '''=ARRAYFORMULA(SE(D2:D<>""; MÊS(D2:D); ""))''')
+    worksheet.update_acell('E2', '''=ARRAYFORMULA(SE(D2:D<>""; ISOWEEKNUM(D2:D); ""))''')
+
+
+def verifica_execucao(pasta: str, total: int, semente: int) -> int:
+    """
+    Execução completa do estágio contra a sequência anterior, em duas abas falsas iguais: mesma aba
+    no final, com uma leitura, uma inserção e uma escrita em lote.
+    """
+    df_negocios, df_sheets, df_lead = gera_dados(total, 0.05, semente)
+    snapshots.PASTA_PARQUET = os.path.join(pasta, "parquet")
+    armazenamento.CAMINHO_BANCO = os.path.join(pasta, "hubspot.sqlite3")  # sem banco: negócios lidos do CSV
+    sheets.NEGOCIOS_CSV_PATH = os.path.join(pasta, "negocios.csv")
+    sheets.NEGOCIOS_CHAMADAS_CSV_PATH = os.path.join(pasta, "negocios-chamadas")
+    df_negocios.assign(**{"Data de criação": df_negocios["Data de criação"].dt.strftime("%Y-%m-%d %H:%M")}).to_csv(sheets.NEGOCIOS_CSV_PATH, index=False)
+
+    valores = [df_sheets.columns.tolist()] + df_sheets.values.tolist()
+    anterior, atual = PlanilhaFalsa(valores), PlanilhaFalsa(valores)
+    with contextlib.redirect_stdout(io.StringIO()):
+        df_lead.to_csv(sheets.NEGOCIOS_CHAMADAS_CSV_PATH, index=False)
+        atualiza_planilha_anterior(anterior)
+        df_lead.to_csv(sheets.NEGOCIOS_CHAMADAS_CSV_PATH, index=False)
+        sheets.atualiza_planilha(atual)
+
+    if anterior.get_all_values() != atual.get_all_values():
+        print("❌ Execução: aba diferente da sequência anterior.")
+        return 1
+    # get_all_values das duas comparações acima também contam
+    print(f"Execução com {total} negócios: {atual.requisicoes - 1} requisições (antes: {anterior.requisicoes - 1}).")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Confere a sincronização por diferença da aba do Sheets contra uma aba falsa.")
+    parser.add_argument("--negocios", type=int, default=2000)
+    parser.add_argument("--rodadas", type=int, default=6)
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    pasta = tempfile.mkdtemp(prefix="sync_planilha_")
+    sheets.PLANILHA_ENVIADA_PATH = os.path.join(pasta, "planilha-enviada.json")
+    escritor_sheets.CAMINHO_PROGRESSO = os.path.join(pasta, "planilha-progresso.json")
+    divergencias = verifica(random.Random(args.semente), args.negocios, max(args.rodadas, 3))
+    os.remove(sheets.PLANILHA_ENVIADA_PATH)
+    divergencias += verifica_execucao(pasta, args.negocios, args.semente)
+    if divergencias:
+        raise SystemExit(f"❌ {divergencias} divergências.")
+    print("✅ Aba igual aos valores enviados em todas as rodadas, escrevendo só as células alteradas.")